@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Benchmarks of the protocol and analysis hot paths of production_test_auto.py: frame building, frame decoding,
+# response routing, csi dump reassembly, amplitude conversion, flatness inspection and spectrogram queueing.
+# Traffic is the synthetic board traffic of dut_emulator.py, csi dumps optionally from a recorded .csirec file.
+# Per benchmark: ops/s (best of the repeats), allocated bytes per op and gc objects left per op with the
+# collector off (reference cycles or growth). Allocated bytes: tracemalloc peak on python 3, python 2 has no
+# tracemalloc, there it is the sys.getsizeof() total of the gc tracked objects left (containers only).
+# Results are stored per revision and compared against an earlier revision, slower than the regression ratio:
+# exit code 1.
+#     python benchmark_hot_path.py [--csi-record <record file>] [--compare <revision>] [--bench <name> ...]
+
+import argparse
+import collections
+import gc
+import logging
+import os
+import random
+import subprocess
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import csi_dump_record
+import dut_emulator
+from monotonic_clock import monotonic_time
+import production_test_auto
+from protocol_schema import DictCommandSpec
+import spectrogram_render
+
+BenchResult = collections.namedtuple("BenchResult", ["bench", "ops_per_s", "alloc_bytes", "gc_objects"])
+
+result_folder = "log_benchmark"
+# requests of one board run: (command name, call parameters)
+ListBoardRequest = [
+    ("vendor_id_get", ()), ("chip_code_get", ()), ("module_type_get", ()), ("chip_mmid_get", ()),
+    ("chip_info_get", ()), ("fw_ver_get", ()), ("noise_floor_scan", ()), ("noise_floor_scan", ()),
+    ("noise_floor_scan", ()), ("global_nid_set", (1,)),
+    ("dtest_txrx", (1, 0)), ("dtest_txrx", (2, 0)), ("dtest_txrx", (3, 0)),
+    ("gpio_level_set", (23, 0)), ("dtest_flatness", (1,)), ("dtest_flatness", (2,)), ("dtest_flatness", (3,)),
+    ("gpio_level_set", (23, 1)), ("dtest_flatness", (1,)), ("dtest_flatness", (2,)), ("dtest_flatness", (3,)),
+    ("dtest_sen_csr", (1, 4, 0)), ("dtest_sen_csr", (1, 18, 0)), ("gpio_level_set", (32, 0)),
+    ("gpio_level_set", (33, 0)), ("zero_cross_get", ()), ("gpio_rst_enable", (0,)),
+    ("tdsb_charge_voltage_get", (2, 10)), ("tdsb_charge_voltage_get", (3, 10)),
+]
+
+
+class BenchPort(object):
+    # write sink of the dispatcher, nothing is read
+    port = "bench"
+
+    def write(self, data):
+        return len(data)
+
+
+class BenchTraffic(object):
+    """Request frames, response stream and csi dumps the benchmarks run on."""
+
+    def __init__(self, csi_record_path=None):
+        virtual_dut = dut_emulator.VirtualDut(0, dut_emulator.EmulatorConfig(0, 0, 0, 0, 0, 0, 0,
+                                                                             "KL-K%s-11.0.0.1", 0))
+        virtual_dut.mode = "test"
+        self.request_list = [(DictCommandSpec[cmd_name], param) for cmd_name, param in ListBoardRequest]
+        response_list = []
+        for cmd_spec, param in self.request_list:
+            response_list += [output_str for delay_flag, output_str in
+                              virtual_dut.input_feed(cmd_spec.build(*param))]
+        self.response_stream = "".join(response_list)
+        decoder = production_test_auto.FrameDecoder()
+        decoder.feed(self.response_stream)
+        self.frame_list = list(iter(decoder.frame_pop, None))
+
+        # csi dump: iq bytes of the first record or a synthetic dump, cut into packets as the dut sends them
+        if csi_record_path is None:
+            csi_iq_str = "".join(production_test_auto.response_data_get(frame_decode(each_frame_str))[:-8]
+                                 for each_frame_str in dut_emulator.csi_dump_build(0, random.Random(0))[1:])
+            tone_start, tone_end = dut_emulator.csi_tone_start, dut_emulator.csi_tone_end
+        else:
+            csi_record = next(csi_dump_record.csi_record_read(csi_record_path))
+            csi_iq_str, tone_start, tone_end = csi_record.iq_bytes, csi_record.start_tone, csi_record.end_tone
+        self.csi_iq_str, self.csi_tone_start, self.csi_tone_end = csi_iq_str, tone_start, tone_end
+        self.csi_packet_list = [production_test_auto.response_data_get(frame_decode(each_frame_str))
+                                for each_frame_str in dut_emulator.csi_packet_frame_list(csi_iq_str, tone_start,
+                                                                                         tone_end)[1:]]
+        self.csi_amp_array = production_test_auto.csi_amplitude_calc(csi_iq_str)
+
+
+def frame_decode(frame_str):
+    decoder = production_test_auto.FrameDecoder()
+    decoder.feed(frame_str)
+    return decoder.frame_pop()
+
+
+def bench_frame_build(bench_traffic):
+    request_list = bench_traffic.request_list
+
+    def bench_op():
+        for cmd_spec, param in request_list:
+            cmd_spec.build(*param)
+    return bench_op, len(request_list)
+
+
+def bench_frame_decode(bench_traffic, read_size=64):
+    # stream fed in serial read sized chunks, as the dispatcher reader does
+    response_stream = bench_traffic.response_stream
+    chunk_list = [response_stream[i:i + read_size] for i in range(0, len(response_stream), read_size)]
+    frame_cnt = len(bench_traffic.frame_list)
+
+    def bench_op():
+        decoder = production_test_auto.FrameDecoder()
+        for each_chunk in chunk_list:
+            decoder.feed(each_chunk)
+            r_frame = decoder.frame_pop()
+            while r_frame is not None:
+                r_frame = decoder.frame_pop()
+    return bench_op, frame_cnt
+
+
+def bench_response_match(bench_traffic):
+    # a waiter per response frame, routed to it by cmd id as for cmd_send / flatness_test
+    dispatcher = production_test_auto.SerialDispatcher(BenchPort())
+    frame_list = bench_traffic.frame_list
+
+    def bench_op():
+        for r_frame in frame_list:
+            r_waiter = dispatcher.waiter_add(r_frame.cmd_id)
+            dispatcher.frame_dispatch(r_frame)
+            r_waiter.frame_queue.get_nowait()
+    return bench_op, len(frame_list)
+
+
+def bench_csi_reassembly(bench_traffic):
+    packet_list = bench_traffic.csi_packet_list
+
+    def bench_op():
+        production_test_auto.dump_data_str, production_test_auto.cur_gain_cnt = '', 0
+        for each_packet in packet_list:
+            production_test_auto.csi_dump_data_collect(each_packet)
+    return bench_op, 1
+
+
+def bench_csi_amplitude(bench_traffic):
+    csi_iq_str = bench_traffic.csi_iq_str
+
+    def bench_op():
+        production_test_auto.csi_amplitude_calc(csi_iq_str)
+    return bench_op, 1
+
+
+def bench_filter_inspection(bench_traffic):
+    logger_printer = logging.getLogger("benchmark")
+    logger_printer.addHandler(logging.NullHandler())
+    logger_printer.propagate = False
+    logger_printer.setLevel(logging.INFO)
+    amp_array = bench_traffic.csi_amp_array
+    tone_start, tone_end = bench_traffic.csi_tone_start, bench_traffic.csi_tone_end
+    spur_tone_list = [tone_start + 20, tone_start + 60]
+
+    def bench_op():
+        production_test_auto.dict_filter_data_info = collections.OrderedDict()
+        production_test_auto.filter_data_inspection(amp_array, tone_start, tone_end, 0, len(spur_tone_list),
+                                                    spur_tone_list, logger_printer, 8, 2)
+    return bench_op, 1
+
+
+def bench_spectrogram_queue(bench_traffic):
+    # data_matplot_diagram only queues the curve, the picture is drawn off the test path
+    amp_array = bench_traffic.csi_amp_array
+    tone_start, tone_end = bench_traffic.csi_tone_start, bench_traffic.csi_tone_end
+
+    def bench_op():
+        production_test_auto.data_matplot_diagram(amp_array, tone_start, tone_end, "bench", 0, "A", "bench")
+        spectrogram_render.dict_pending_picture.clear()
+    return bench_op, 1
+
+
+def bench_spectrogram_draw(bench_traffic):
+    # the picture itself, drawn by the render process; ImportError without matplotlib
+    import matplotlib.figure
+    amp_array = bench_traffic.csi_amp_array
+    curve_list = [(each_phase, bench_traffic.csi_tone_start, bench_traffic.csi_tone_end, amp_array)
+                  for each_phase in "ABC"]
+    pic_path = os.path.join(result_folder, "bench_spectrogram.png")
+
+    def bench_op():
+        spectrogram_render.spectrogram_draw(pic_path, curve_list)
+    return bench_op, 1
+
+
+# name -> setup(bench_traffic) returning (op function, ops per call)
+DictBench = collections.OrderedDict()
+DictBench["frame_build"] = bench_frame_build
+DictBench["frame_decode"] = bench_frame_decode
+DictBench["response_match"] = bench_response_match
+DictBench["csi_reassembly"] = bench_csi_reassembly
+DictBench["csi_amplitude"] = bench_csi_amplitude
+DictBench["filter_inspection"] = bench_filter_inspection
+DictBench["spectrogram_queue"] = bench_spectrogram_queue
+DictBench["spectrogram_draw"] = bench_spectrogram_draw
+
+
+def bench_time(bench_op, call_cnt):
+    time_start = monotonic_time()
+    for i in xrange(call_cnt):
+        bench_op()
+    return monotonic_time() - time_start
+
+
+def bench_alloc(bench_op, call_cnt):
+    # (allocated bytes per call, gc tracked objects left per call)
+    gc.collect()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        # objects alive before stay referenced, the id of a new object never matches one of them
+        base_object_list = gc.get_objects()
+        base_id_set = set(id(each_object) for each_object in base_object_list)
+        if tracemalloc is not None:
+            tracemalloc.start()
+        for i in xrange(call_cnt):
+            bench_op()
+        if tracemalloc is not None:
+            alloc_bytes = tracemalloc.get_traced_memory()[1] / float(call_cnt)
+            tracemalloc.stop()
+        new_object_list = [each_object for each_object in gc.get_objects()
+                           if id(each_object) not in base_id_set and each_object is not base_id_set and
+                           each_object is not base_object_list]
+        if tracemalloc is None:
+            alloc_bytes = sum(sys.getsizeof(each_object) for each_object in new_object_list) / float(call_cnt)
+        gc_objects = len(new_object_list) / float(call_cnt)
+        del base_object_list, new_object_list
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return alloc_bytes, gc_objects
+
+
+def bench_run(bench_name, bench_traffic, time_min=0.5, repeat_cnt=5):
+    # None: benchmark skipped, an optional module is missing
+    try:
+        bench_op, op_cnt = DictBench[bench_name](bench_traffic)
+    except ImportError, e_info:
+        print ("%s skipped: %s" % (bench_name, str(e_info)))
+        return None
+    bench_op()  # warm up, lazy imports and caches
+    call_cnt = 1
+    while bench_time(bench_op, call_cnt) < time_min / 10:
+        call_cnt *= 10
+    call_cnt = max(int(call_cnt * time_min / max(bench_time(bench_op, call_cnt), 1e-6)), 1)
+    best_time = min(bench_time(bench_op, call_cnt) for i in range(repeat_cnt))
+    alloc_bytes, gc_objects = bench_alloc(bench_op, min(call_cnt, 100))
+    return BenchResult(bench_name, op_cnt * call_cnt / best_time, alloc_bytes / op_cnt, gc_objects / op_cnt)
+
+
+def revision_get():
+    try:
+        git_output = subprocess.Popen(["git", "rev-parse", "--short", "HEAD"], stdout=subprocess.PIPE,
+                                      stderr=subprocess.PIPE).communicate()[0]
+    except OSError:
+        return "local"
+    return git_output.strip() or "local"
+
+
+def result_path_get(revision):
+    return os.path.join(result_folder, "bench_%s.csv" % revision)
+
+
+def result_write(result_path, bench_result_list):
+    if not os.path.exists(result_folder):
+        os.makedirs(result_folder)
+    with open(result_path, "w") as f_result:
+        f_result.write("bench,ops_per_s,alloc_bytes,gc_objects\n")
+        for bench_result in bench_result_list:
+            f_result.write("%s,%.1f,%s,%.3f\n" % (bench_result.bench, bench_result.ops_per_s,
+                                                   "" if bench_result.alloc_bytes is None else
+                                                   "%.1f" % bench_result.alloc_bytes, bench_result.gc_objects))
+
+
+def result_read(result_path):
+    dict_result = collections.OrderedDict()
+    with open(result_path) as f_result:
+        f_result.readline()
+        for each_line in f_result:
+            bench_name, ops_per_s, alloc_bytes, gc_objects = each_line.strip().split(",")
+            dict_result[bench_name] = BenchResult(bench_name, float(ops_per_s),
+                                                  float(alloc_bytes) if alloc_bytes else None, float(gc_objects))
+    return dict_result
+
+
+def result_print(bench_result_list, dict_base_result=None, regression_ratio=0.9):
+    # returns the names of benchmarks slower than regression_ratio of the base
+    regression_list = []
+    print ("%-20s %14s %12s %10s %14s" % ("bench", "ops/s", "alloc B/op", "gc obj/op", "vs base"))
+    for bench_result in bench_result_list:
+        compare_str = ""
+        base_result = (dict_base_result or {}).get(bench_result.bench)
+        if base_result is not None:
+            speed_ratio = bench_result.ops_per_s / base_result.ops_per_s
+            compare_str = "x%.2f" % speed_ratio
+            if speed_ratio < regression_ratio:
+                compare_str += " SLOWER"
+                regression_list.append(bench_result.bench)
+        print ("%-20s %14.1f %12s %10.3f %14s" %
+               (bench_result.bench, bench_result.ops_per_s,
+                "-" if bench_result.alloc_bytes is None else "%.1f" % bench_result.alloc_bytes,
+                bench_result.gc_objects, compare_str))
+    if tracemalloc is None:
+        print ("alloc B/op: python 2, sys.getsizeof() of the gc tracked objects left, not the bytes allocated")
+    return regression_list
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Benchmarks of the protocol and analysis hot paths")
+    arg_parser.add_argument("--bench", nargs="+", choices=DictBench.keys(), help="benchmarks to run, default all")
+    arg_parser.add_argument("--csi-record", help="csi dump record file (.csirec) of recorded csi traffic")
+    arg_parser.add_argument("--time", type=float, default=0.5, help="minimum time of one repeat, s")
+    arg_parser.add_argument("--revision", help="name the results are stored as, default git revision")
+    arg_parser.add_argument("--compare", help="revision (or result csv) to compare with")
+    arg_parser.add_argument("--regression", type=float, default=0.9, help="slower than this ratio: regression")
+    arg_value = arg_parser.parse_args()
+
+    production_test_auto.optional_module_import(1)
+    main_traffic = BenchTraffic(arg_value.csi_record)
+    main_result_list = [bench_run(each_bench, main_traffic, arg_value.time)
+                        for each_bench in (arg_value.bench or DictBench.keys())]
+    main_result_list = [each_result for each_result in main_result_list if each_result is not None]
+
+    main_dict_base = None
+    if arg_value.compare:
+        main_base_path = arg_value.compare if arg_value.compare.endswith(".csv") else \
+            result_path_get(arg_value.compare)
+        main_dict_base = result_read(main_base_path)
+    main_regression_list = result_print(main_result_list, main_dict_base, arg_value.regression)
+
+    main_result_path = result_path_get(arg_value.revision or revision_get())
+    result_write(main_result_path, main_result_list)
+    print ("Results saved: %s" % main_result_path)
+    if main_regression_list:
+        print ("Regression: %s" % ", ".join(main_regression_list))
+        sys.exit(1)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Test plan of one board: enabled test cases registered as nodes with prerequisites and dut state
+# requirements, run one at a time over the dut serial port by a list scheduler.
+#   prerequisites: nodes that must have finished first, a skipped or fatally failed prerequisite skips the node
+#   requires_state: dut states that must hold, eg. "test_mode", "nid_set", provides_state: states set on pass
+#   consumes_state: states lost by running the node (eg. psram test leaves test mode), it runs after every
+#                   other node needing them
+#   resources / settle_time: the node keeps its resources busy settle_time seconds after it ends, nodes on
+#                   other resources run in the gap instead of sleeping, eg. the fixed rf settle times after
+#                   the rf tests ([wait config] rf_settle_time), the dut has no rf state to poll;
+#                   settle_time as {resource: seconds}: only the listed resources settle, the others are free
+#                   when the node ends
+#   ready_time: callable, monotonic time before which the node does not start, other nodes run meanwhile
+# node_call: callable running a node, eg. to time it, returns the node result
+# Node function returns 0 (Err_ok) on pass, anything else is a failure.
+
+import time
+
+from monotonic_clock import monotonic_time
+
+node_pending = "pending"
+node_pass = "pass"
+node_fail = "fail"
+node_skip = "skip"
+
+
+class PlanNode(object):
+    __slots__ = ("name", "func", "args", "prerequisites", "requires_state", "provides_state", "consumes_state",
+                 "resources", "settle_time", "ready_time", "fatal", "status", "result", "time_start", "time_cost")
+
+    def __init__(self, name, func, args=(), prerequisites=(), requires_state=(), provides_state=(),
+                 consumes_state=(), resources=(), settle_time=0, ready_time=None, fatal=False):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.prerequisites = tuple(prerequisites)
+        self.requires_state = tuple(requires_state)
+        self.provides_state = tuple(provides_state)
+        self.consumes_state = tuple(consumes_state)
+        self.resources = tuple(resources)
+        self.settle_time = settle_time
+        self.ready_time = ready_time
+        self.fatal = fatal
+        self.status = node_pending
+        self.result = None
+        self.time_start = None
+        self.time_cost = None
+
+    def __repr__(self):
+        return "PlanNode(%s, %s)" % (self.name, self.status)
+
+
+class BoardPlan(object):
+    def __init__(self, dut_state=(), node_call=None):
+        self.node_call = node_call
+        self.node_list = []
+        self.dict_node = {}
+        self.dut_state = set(dut_state)
+        self.dict_resource_free_at = {}  # resource -> monotonic time it settles
+
+    def node_add(self, name, func, args=(), **node_option):
+        if name in self.dict_node:
+            raise ValueError("Test plan node %s added twice" % name)
+        for each_prerequisite in node_option.get("prerequisites", ()):
+            if each_prerequisite not in self.dict_node:
+                raise ValueError("Test plan node %s: prerequisite %s not added before" % (name, each_prerequisite))
+        plan_node = PlanNode(name, func, args, **node_option)
+        self.node_list.append(plan_node)
+        self.dict_node[name] = plan_node
+        return plan_node
+
+    def node_blocked(self, plan_node):
+        # True: can never run, a prerequisite was skipped or failed fatally, or a required state is gone for good
+        for each_prerequisite in plan_node.prerequisites:
+            prerequisite_node = self.dict_node[each_prerequisite]
+            if node_skip == prerequisite_node.status or (node_fail == prerequisite_node.status and
+                                                         prerequisite_node.fatal):
+                return True
+        for each_state in plan_node.requires_state:
+            if each_state in self.dut_state:
+                continue
+            for provider_node in self.node_list:
+                if node_pending == provider_node.status and each_state in provider_node.provides_state:
+                    break
+            else:
+                return True
+        return False
+
+    def node_wait_until(self, plan_node, time_now):
+        # None: not runnable now for a non time reason, else monotonic time it may start (<= time_now: now)
+        for each_prerequisite in plan_node.prerequisites:
+            if node_pending == self.dict_node[each_prerequisite].status:
+                return None
+        for each_state in plan_node.requires_state:
+            if each_state not in self.dut_state:
+                return None
+        for each_state in plan_node.consumes_state:
+            for other_node in self.node_list:
+                if (other_node is not plan_node and node_pending == other_node.status and
+                        each_state in other_node.requires_state):
+                    return None
+        wait_until = time_now
+        for each_resource in plan_node.resources:
+            wait_until = max(wait_until, self.dict_resource_free_at.get(each_resource, time_now))
+        if plan_node.ready_time is not None:
+            wait_until = max(wait_until, plan_node.ready_time())
+        return wait_until
+
+    def node_run(self, plan_node):
+        plan_node.time_start = monotonic_time()
+        try:
+            if self.node_call is None:
+                plan_node.result = plan_node.func(*plan_node.args)
+            else:
+                plan_node.result = self.node_call(plan_node)
+        finally:
+            time_end = monotonic_time()
+            plan_node.time_cost = time_end - plan_node.time_start
+            for each_resource in plan_node.resources:
+                if isinstance(plan_node.settle_time, dict):
+                    settle_time = plan_node.settle_time.get(each_resource, 0)
+                else:
+                    settle_time = plan_node.settle_time
+                self.dict_resource_free_at[each_resource] = time_end + settle_time
+        for each_state in plan_node.consumes_state:
+            self.dut_state.discard(each_state)
+        if 0 == plan_node.result:
+            plan_node.status = node_pass
+            self.dut_state.update(plan_node.provides_state)
+        else:
+            plan_node.status = node_fail
+
+    def run(self, skip_callback=None):
+        # runs every node once, returns the node list with status, result and time cost
+        while 1:
+            pending_list = [plan_node for plan_node in self.node_list if node_pending == plan_node.status]
+            if not pending_list:
+                return self.node_list
+
+            time_now, next_node, next_time = monotonic_time(), None, None
+            for plan_node in pending_list:
+                if self.node_blocked(plan_node):
+                    plan_node.status = node_skip
+                    if skip_callback is not None:
+                        skip_callback(plan_node)
+                    next_node, next_time = None, None
+                    break
+                wait_until = self.node_wait_until(plan_node, time_now)
+                if wait_until is None:
+                    continue
+                if wait_until <= time_now:  # first runnable node in plan order
+                    next_node, next_time = plan_node, None
+                    break
+                if next_time is None or wait_until < next_time:
+                    next_time = wait_until
+            else:
+                if next_time is None:  # nothing runnable and nothing to wait for: circular requirements
+                    for plan_node in pending_list:
+                        plan_node.status = node_skip
+                        if skip_callback is not None:
+                            skip_callback(plan_node)
+                    return self.node_list
+
+            if next_node is not None:
+                self.node_run(next_node)
+            elif next_time is not None:
+                time.sleep(max(next_time - monotonic_time(), 0))  # every runnable node is settling
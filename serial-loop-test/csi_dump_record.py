@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Raw csi dump records for volume production: flatness_test appends the int16 I/Q data of every csi dump
+# with its tone range, gain and packet info to a per lot record file instead of saving a png.
+# Pictures are rendered offline on demand:
+#     python csi_dump_record.py <record file> [picture folder] [board label]
+
+import collections
+import os
+import struct
+import sys
+import time
+
+# record: head | board label | chip id | I/Q int16 pairs
+# head: magic, I/Q byte len, board test time stamp, phase, gpio status, start tone, end tone, gain, packet info,
+#       board label len, chip id len
+RecordHead = struct.Struct("<4sIdcBHHHhBB")
+record_magic = "CSIR"
+
+CsiRecord = collections.namedtuple("CsiRecord", ["time_stamp", "board_lable", "chip_id", "phase", "gpio",
+                                                 "start_tone", "end_tone", "gain", "packet_info", "iq_bytes"])
+
+dict_record_board = {}  # record path, board label, chip id, test time stamp of the board under test
+
+
+def csi_record_path_get(lot_name, sport_num, log_root=r".\log_production_test"):
+    # one file per lot and serial port, station workers never append to the same file
+    return log_root + "\\" + lot_name + "_com" + sport_num + ".csirec"
+
+
+def csi_record_open(record_path, board_lable, chip_id_str, board_time_stamp=None):
+    record_folder = os.path.dirname(record_path)
+    if record_folder and not os.path.exists(record_folder):
+        os.makedirs(record_folder)
+    dict_record_board["record_path"] = record_path
+    dict_record_board["board_lable"] = board_lable[:255]
+    dict_record_board["chip_id"] = chip_id_str[:255]
+    dict_record_board["time_stamp"] = board_time_stamp or time.time()
+
+
+def csi_record_append(s_phase, gpio_cnt, start_tone, end_tone, gain, packet_info, iq_bytes):
+    board_lable, chip_id = dict_record_board["board_lable"], dict_record_board["chip_id"]
+    record_str = RecordHead.pack(record_magic, len(iq_bytes), dict_record_board["time_stamp"], s_phase, gpio_cnt,
+                                 start_tone, end_tone, gain or 0, packet_info, len(board_lable), len(chip_id))
+    with open(dict_record_board["record_path"], "ab") as f_record:
+        f_record.write(record_str + board_lable + chip_id + iq_bytes)
+
+
+def csi_record_read(record_path):
+    with open(record_path, "rb") as f_record:
+        while 1:
+            head_str = f_record.read(RecordHead.size)
+            if len(head_str) < RecordHead.size:
+                return  # end of file, a record cut by a crash is dropped
+            (magic, iq_len, time_stamp, s_phase, gpio_cnt, start_tone, end_tone, gain, packet_info,
+             lable_len, chip_id_len) = RecordHead.unpack(head_str)
+            if record_magic != magic:
+                raise ValueError("Bad csi record at offset %d of %s" % (f_record.tell() - RecordHead.size,
+                                                                        record_path))
+            body_str = f_record.read(lable_len + chip_id_len + iq_len)
+            if len(body_str) < lable_len + chip_id_len + iq_len:
+                return
+            yield CsiRecord(time_stamp, body_str[:lable_len], body_str[lable_len:lable_len + chip_id_len],
+                            s_phase, gpio_cnt, start_tone, end_tone, gain, packet_info,
+                            body_str[lable_len + chip_id_len:])
+
+
+def csi_record_render(record_path, pic_folder, board_lable=None):
+    # same pictures as the online mode: one per board and gpio status, phases overlaid
+    import spectrogram_render
+    import production_test_auto
+
+    production_test_auto.optional_module_import(1)
+    csi_amplitude_calc = production_test_auto.csi_amplitude_calc
+
+    dict_picture = collections.OrderedDict()
+    for csi_record in csi_record_read(record_path):
+        if board_lable is not None and board_lable != csi_record.board_lable:
+            continue
+        pic_name = r"csi_dump_%s_%s_%s__GPIO_%d.png" % (
+            csi_record.board_lable, csi_record.chip_id,
+            time.strftime("%Y-%m-%d-%H-%M-%S", time.localtime(csi_record.time_stamp)), csi_record.gpio)
+        curve_list = dict_picture.setdefault(os.path.join(pic_folder, pic_name), [])
+        curve_list.append((csi_record.phase, csi_record.start_tone, csi_record.end_tone,
+                           csi_amplitude_calc(csi_record.iq_bytes)))
+
+    for pic_path, curve_list in dict_picture.items():
+        spectrogram_render.spectrogram_draw(pic_path, curve_list)
+        print ("Spectrogram saved: %s" % pic_path)
+    return len(dict_picture)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print ("Usage: python csi_dump_record.py <record file> [picture folder] [board label]")
+        sys.exit()
+    arg_record_path = sys.argv[1]
+    arg_pic_folder = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(arg_record_path)[0]
+    arg_board_lable = sys.argv[3] if len(sys.argv) > 3 else None
+    print ("%d spectrogram rendered." % csi_record_render(arg_record_path, arg_pic_folder, arg_board_lable))
@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Virtual duts for offline runs and station load tests: every dut is a pseudo terminal speaking the production
+# test protocol, the sbl cli bring-up, test mode frames of the dut (module 3) and the power board (module 4) and
+# the memtest xmodem load of the psram check. Latency, jitter, line speed and faults are configurable.
+# production_test_auto.py opens the ptys through [serial config] serial_port_format, eg. 24 duts from port 47:
+#   python dut_emulator.py -n 24 --first-port 47 --latency 5 --jitter 2
+#   serial_port_num = 47, 48, ..., 70 | serial_port_format = /tmp/ttyDUT%s
+# Linux only (pty, termios).
+
+import argparse
+import binascii
+import collections
+import math
+import os
+import random
+import select
+import struct
+import sys
+import threading
+import time
+import tty
+
+from monotonic_clock import monotonic_time
+from protocol_schema import FrameHead, CommandDataHead, frame_tail
+
+XMODEM_SOH = "\x01"
+XMODEM_STX = "\x02"
+XMODEM_EOT = "\x04"
+XMODEM_ACK = "\x06"
+XMODEM_NAK = "\x15"
+
+# latency, jitter: ms | baud: 0 no line speed limit | drop, corrupt, noise: fault rate per response frame
+EmulatorConfig = collections.namedtuple("EmulatorConfig", ["latency", "jitter", "baud", "drop_rate", "corrupt_rate",
+                                                           "noise_rate", "device_type", "fw_ver", "seed"])
+
+# 0: STA / 1: IIC / 2: 13_CCO / 3: 09_CCO / 4: Triple_Phase, same as production_test_auto.py
+DictDeviceName = {0: "STA", 1: "IIC", 2: "CCO", 3: "CCO", 4: "3PS"}
+DictModuleTypeNum = {0: 0x00, 1: 0x02, 2: 0x01, 3: 0x01, 4: 0x04}
+DictFilterGpio = {0: 23, 1: 28, 2: 2, 3: 2, 4: 23}
+
+ListLowVoltagePin = [10, 28, 36, 48]  # dut gpio driven by the power board low voltage pins
+DictGpaDutGpio = {4: 23, 7: 28, 5: 36}  # power board GPA index -> dut gpio, ktj fixture
+DictKtjAdcValue = {0: 43, 1: 87, 2: 43, 3: 87, 5: 47}  # adc channel -> adc value, volts = value * 3.2 / 512
+ListChannelVoltageMv = [10600, 3220, 1200, 0]
+
+txrx_record = "AB\xff\x20\x60\xfb\x02\x00\x34\x01\x20\x60\x1d\x00\x35\x03\x00"
+csi_tone_start, csi_tone_end, csi_packet_tone_cnt = 32, 120, 32
+# band amplitude (db) of the csi dump by filter gpio level, 0: 700K filter, 1: 2M filter
+DictCsiBandAmp = {0: ((40, 40.0), (79, 43.0), (120, 50.0)),
+                  1: ((40, 30.0), (79, 45.0), (120, 60.0))}
+tdsb_adc_start, tdsb_adc_done = 100, 200
+tdsb_charge_tolerance = 0.1  # s, the test side times the charge from before its request
+memtest_time = 0.2  # s from the end of the image load to the test result
+
+
+def frame_pack(module_id, msg_id, payload):
+    return FrameHead.pack("\x23\x23", "\x00" * 12, module_id, 0, msg_id, len(payload)) + payload + frame_tail
+
+
+def response_pack(module_id, cmd_id, data):
+    return frame_pack(module_id, 1, CommandDataHead.pack(cmd_id, len(data), len(data)) + data)
+
+
+def csi_amp_get(tone_num, gpio_level, noise_rand):
+    for band_end, band_amp in DictCsiBandAmp[gpio_level]:
+        if tone_num <= band_end:
+            return band_amp + noise_rand.uniform(-0.5, 0.5)
+
+
+def csi_packet_frame_list(iq_str, tone_start, tone_end, gain=1, packet_info=0):
+    # spur info, then csi packets: intermediate packets with start == end == 0, the last with the tone range
+    frame_list = [response_pack(3, 0x04, struct.pack("<10H", *([0] * 10)))]
+    packet_len = csi_packet_tone_cnt * 4
+    for data_index in range(0, len(iq_str), packet_len):
+        if data_index + packet_len < len(iq_str):
+            batch_info = struct.pack("<4H", 0, 0, gain, 0)
+        else:
+            batch_info = struct.pack("<HHHh", tone_start, tone_end, gain, packet_info)
+        frame_list.append(response_pack(3, 0x04, iq_str[data_index:data_index + packet_len] + batch_info))
+    return frame_list
+
+
+def csi_dump_build(gpio_level, noise_rand):
+    iq_str = "".join(struct.pack("<hh", int(round(math.sqrt(10 ** (csi_amp_get(tone_num, gpio_level,
+                                                                                  noise_rand) / 10.0)))), 0)
+                     for tone_num in range(csi_tone_start, csi_tone_end + 1))
+    return csi_packet_frame_list(iq_str, csi_tone_start, csi_tone_end)
+
+
+class VirtualDut(object):
+    """One dut with its power board: input bytes in, response bytes out, no port handling."""
+
+    def __init__(self, dut_index, emu_config):
+        self.dut_index = dut_index
+        self.emu_config = emu_config
+        self.fault_rand = random.Random(emu_config.seed + dut_index)
+        self.mode = "cli"  # off | cli: sbl cli and frames | test: frames | xmodem: memtest image load
+        self.rx_buffer = ""
+        self.chip_info = struct.pack(">I", 0x10000 + dut_index)[1:] + "\x05\x02"
+        self.mac_addr = "\x00" * 6
+        self.vendor_id = "TH"
+        self.dict_gpio_level = {}
+        self.tdsb_charge_start = None
+        self.tdsb_charge_timespan = 0
+        self.xmodem_block_cnt = 0
+
+    def input_feed(self, data):
+        # returns [(delay_flag, bytes), ...], delay_flag: response of a frame, sent after latency and jitter
+        self.rx_buffer += data
+        output_list = []
+        while self.rx_buffer:
+            if "off" == self.mode:
+                output_list += self.frame_process(power_only=True)
+            elif "xmodem" == self.mode:
+                output_list += self.xmodem_process()
+            else:
+                output_list += self.frame_process()
+            if not self.input_pending():
+                break
+        return output_list
+
+    def input_pending(self):
+        # more to process right away: a complete frame or xmodem block still in the buffer
+        if "xmodem" == self.mode:
+            if not self.rx_buffer:
+                return False
+            if XMODEM_STX == self.rx_buffer[0]:
+                return len(self.rx_buffer) >= 1024 + 5
+            return XMODEM_SOH != self.rx_buffer[0] or len(self.rx_buffer) >= 128 + 5
+        head_pos = self.rx_buffer.find("\x23\x23")
+        if head_pos < 0 or len(self.rx_buffer) < head_pos + FrameHead.size:
+            return False
+        frame_len = struct.unpack("<I", self.rx_buffer[head_pos + 22:head_pos + 26])[0]
+        return len(self.rx_buffer) >= head_pos + FrameHead.size + frame_len + 2
+
+    def frame_process(self, power_only=False):
+        output_list = []
+        head_pos = self.rx_buffer.find("\x23\x23")
+        text_str = self.rx_buffer if head_pos < 0 else self.rx_buffer[:head_pos]
+        if text_str and not power_only:
+            output_list += self.text_process(text_str)
+        if head_pos < 0:
+            # text without a keyword yet: keep its end, a keyword may be split between reads
+            self.rx_buffer = "" if output_list or power_only else self.rx_buffer[-16:]
+            return output_list
+        self.rx_buffer = self.rx_buffer[head_pos:]
+        if len(self.rx_buffer) < FrameHead.size:
+            return output_list
+        frame_mark, frame_addr, module_id, frame_crc, msg_id, frame_len = \
+            FrameHead.unpack(self.rx_buffer[:FrameHead.size])
+        frame_end = FrameHead.size + frame_len
+        if len(self.rx_buffer) < frame_end + 2:
+            return output_list
+        payload = self.rx_buffer[FrameHead.size:frame_end]
+        if self.rx_buffer[frame_end:frame_end + 2] != frame_tail:
+            self.rx_buffer = self.rx_buffer[2:]  # no frame here, look for the next frame head
+            return output_list
+        self.rx_buffer = self.rx_buffer[frame_end + 2:]
+
+        if 4 == module_id:
+            output_list += self.power_board_process(msg_id, payload)
+        elif 3 == module_id and not power_only and len(payload) >= CommandDataHead.size:
+            cmd_id, total_len, data_len = CommandDataHead.unpack(payload[:CommandDataHead.size])
+            rsp_list = self.dut_command_process(cmd_id, payload[CommandDataHead.size:])
+            output_list += [(True, each_rsp) for each_rsp in rsp_list]
+        return output_list
+
+    def text_process(self, text_str):
+        if "WQKL" in text_str:
+            self.mode, self.xmodem_block_cnt = "xmodem", 0
+            self.rx_buffer = ""
+            return [(True, "C")]
+        if "entry_sbl_cli" in text_str:
+            self.mode = "cli"
+            return [(True, "\r\nkunlun v1.0 >")]
+        if "bootm fw_mode=1" in text_str and "cli" == self.mode:
+            self.mode = "test"
+            return [(True, response_pack(3, 0x2c, "\x00" * 6))]
+        return []
+
+    def xmodem_process(self):
+        block_head = self.rx_buffer[0]
+        if XMODEM_EOT == block_head:
+            self.rx_buffer, self.mode = self.rx_buffer[1:], "cli"
+            return [(True, XMODEM_ACK), (False, "memtest: %d blocks\r\n" % self.xmodem_block_cnt),
+                    (memtest_time, "memtest test passed\r\n")]
+        if block_head not in (XMODEM_SOH, XMODEM_STX):
+            self.rx_buffer = self.rx_buffer[1:]  # repeated "WQKL" or line noise before the first block
+            return []
+        block_size = 1024 if XMODEM_STX == block_head else 128
+        if len(self.rx_buffer) < block_size + 5:
+            return []
+        block_str, self.rx_buffer = self.rx_buffer[:block_size + 5], self.rx_buffer[block_size + 5:]
+        block_data = block_str[3:3 + block_size]
+        if struct.pack(">H", binascii.crc_hqx(block_data, 0)) != block_str[3 + block_size:]:
+            return [(True, XMODEM_NAK)]
+        self.xmodem_block_cnt += 1
+        return [(True, XMODEM_ACK)]
+
+    def power_board_process(self, msg_id, data):
+        if msg_id in (0x00, 0x04):  # power down, reset low
+            self.mode, self.rx_buffer = "off", ""
+            self.dict_gpio_level.clear()
+            self.tdsb_charge_start = None
+        elif msg_id in (0x01, 0x03):  # power up, reset high
+            if "off" == self.mode:
+                self.mode = "cli"
+        elif 0x0a == msg_id:
+            return [(True, response_pack(4, 0x10, struct.pack("<4H", *ListChannelVoltageMv)))]
+        elif 0x0b == msg_id and len(data) >= 2:
+            for each_gpio in ListLowVoltagePin:
+                self.dict_gpio_level[each_gpio] = ord(data[1])
+            return [(True, response_pack(4, 0x0b, data[:2]))]
+        elif 0x0c == msg_id and len(data) >= 2:
+            dut_gpio = DictGpaDutGpio.get(ord(data[0])) if 1 == ord(data[1]) else None
+            return [(True, response_pack(4, 0x0c, chr(self.dict_gpio_level.get(dut_gpio, 0))))]
+        return []
+
+    def dut_command_process(self, cmd_id, data):
+        # response frames of one dut command, [] for unknown commands
+        device_type = self.emu_config.device_type
+        if 0x04 == cmd_id and len(data) >= 5:
+            dtest_type = ord(data[4])
+            if 0x02 == dtest_type:
+                return [response_pack(3, cmd_id, txrx_record)]
+            if 0x03 == dtest_type:
+                gpio_level = self.dict_gpio_level.get(DictFilterGpio[device_type], 0)
+                return csi_dump_build(1 if gpio_level else 0, self.fault_rand)
+            if 0x04 == dtest_type:
+                return [response_pack(3, cmd_id, chr(100))]
+            return []
+        if 0x21 == cmd_id and len(data) >= 2:
+            self.dict_gpio_level[ord(data[0])] = ord(data[1])
+            return [response_pack(3, cmd_id, data[:2])]
+        if 0x22 == cmd_id:
+            return [response_pack(3, cmd_id, "".join(each_gpio + chr(self.dict_gpio_level.get(ord(each_gpio), 0))
+                                                     for each_gpio in data))]
+        if 0x27 == cmd_id and len(data) >= 6:
+            self.mac_addr = data[:6]
+            return [response_pack(3, cmd_id, self.mac_addr)]
+        if 0x31 == cmd_id and len(data) >= 2:
+            self.vendor_id = data[:2]
+            return [response_pack(3, cmd_id, "\x00")]
+        if 0x35 == cmd_id and data:
+            return [response_pack(3, cmd_id, data[:1])]
+        if 0x3a == cmd_id and data:
+            return [response_pack(3, cmd_id, data[:1])]
+        if 0x3b == cmd_id and len(data) >= 2:
+            return [response_pack(3, cmd_id, self.tdsb_charge_get(ord(data[0]), ord(data[1])))]
+        if 0x42 == cmd_id and len(data) >= 4:
+            return [response_pack(3, cmd_id, struct.pack("<i", DictKtjAdcValue.get(struct.unpack("<I", data[:4])[0],
+                                                                                   0)))]
+
+        if 0x02 == cmd_id:
+            rsp_data = struct.pack("<I", 0x12345678)
+        elif 0x0a == cmd_id:
+            rsp_data = chr(30)
+        elif 0x25 == cmd_id:
+            rsp_data = self.chip_info
+        elif 0x26 == cmd_id:
+            rsp_data = self.emu_config.fw_ver % DictDeviceName[device_type]
+        elif 0x2b == cmd_id:
+            rsp_data = self.mac_addr
+        elif 0x2d == cmd_id:
+            rsp_data = "\x00"
+        elif 0x30 == cmd_id:
+            rsp_data = chr(DictModuleTypeNum[device_type])
+        elif 0x33 == cmd_id:
+            rsp_data = "AB"
+        elif 0x37 == cmd_id:
+            rsp_data = self.vendor_id
+        elif 0x38 == cmd_id:
+            rsp_data = self.chip_info * 4 + "\x00" * 4
+        elif 0x39 == cmd_id:
+            rsp_data = "\x01"
+        else:
+            return []
+        return [response_pack(3, cmd_id, rsp_data)]
+
+    def tdsb_charge_get(self, charge_mode, charge_timespan):
+        # charge mode 2: start, status 0 | 3: voltage after charge_timespan, status 1 done, 0 still charging
+        if 2 == charge_mode or self.tdsb_charge_start is None:
+            self.tdsb_charge_start, self.tdsb_charge_timespan = monotonic_time(), charge_timespan
+            return struct.pack("<iB", tdsb_adc_start, 0)
+        if monotonic_time() - self.tdsb_charge_start >= self.tdsb_charge_timespan - tdsb_charge_tolerance:
+            return struct.pack("<iB", tdsb_adc_done, 1)
+        return struct.pack("<iB", tdsb_adc_start, 0)
+
+    def fault_apply(self, rsp_str):
+        # None: response dropped
+        emu_config = self.emu_config
+        if emu_config.drop_rate and self.fault_rand.random() < emu_config.drop_rate:
+            return None
+        if emu_config.corrupt_rate and self.fault_rand.random() < emu_config.corrupt_rate:
+            corrupt_index = self.fault_rand.randrange(len(rsp_str))
+            rsp_str = rsp_str[:corrupt_index] + chr(ord(rsp_str[corrupt_index]) ^ 0xff) + rsp_str[corrupt_index + 1:]
+        if emu_config.noise_rate and self.fault_rand.random() < emu_config.noise_rate:
+            rsp_str = "".join(chr(self.fault_rand.randrange(256)) for i in range(8)) + rsp_str
+        return rsp_str
+
+    def response_delay(self):
+        emu_config = self.emu_config
+        return max(emu_config.latency + self.fault_rand.uniform(-emu_config.jitter, emu_config.jitter), 0) / 1000.0
+
+
+class PtyDut(object):
+    """Pseudo terminal of one virtual dut, served by its own thread."""
+
+    def __init__(self, virtual_dut, link_path=None):
+        self.virtual_dut = virtual_dut
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)  # pyserial sets raw mode too, until then no echo or line editing
+        self.slave_name = os.ttyname(self.slave_fd)
+        self.link_path = link_path
+        if link_path is not None:
+            if os.path.islink(link_path):
+                os.remove(link_path)
+            os.symlink(self.slave_name, link_path)
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, name="dut_%d" % virtual_dut.dut_index)
+        self.thread.daemon = True
+
+    def output_write(self, output_str):
+        baud = self.virtual_dut.emu_config.baud
+        if baud:
+            time.sleep(len(output_str) * 10.0 / baud)  # 8N1: 10 bits per byte
+        os.write(self.master_fd, output_str)
+
+    def serve(self):
+        # the slave fd stays open here, a closed port on the test side does not end the pty
+        virtual_dut = self.virtual_dut
+        while self.running:
+            read_list = select.select([self.master_fd], [], [], 0.2)[0]
+            if not read_list:
+                continue
+            try:
+                input_str = os.read(self.master_fd, 4096)
+            except OSError:
+                continue
+            for delay_value, output_str in virtual_dut.input_feed(input_str):
+                if delay_value is True:
+                    output_str = virtual_dut.fault_apply(output_str)
+                    if output_str is None:
+                        continue
+                    time.sleep(virtual_dut.response_delay())
+                elif delay_value:
+                    time.sleep(delay_value)
+                self.output_write(output_str)
+
+    def close(self):
+        self.running = False
+        self.thread.join(1)
+        if self.link_path is not None and os.path.islink(self.link_path):
+            os.remove(self.link_path)
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+
+def emulator_start(dut_cnt, emu_config, first_port=47, link_format=None):
+    # returns [PtyDut, ...], dut i linked as link_format % (first_port + i)
+    pty_dut_list = []
+    for dut_index in range(dut_cnt):
+        link_path = None if link_format is None else link_format % (first_port + dut_index)
+        pty_dut = PtyDut(VirtualDut(dut_index, emu_config), link_path)
+        pty_dut.thread.start()
+        pty_dut_list.append(pty_dut)
+    return pty_dut_list
+
+
+def emulator_stop(pty_dut_list):
+    for pty_dut in pty_dut_list:
+        pty_dut.close()
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Virtual duts on pseudo terminals")
+    arg_parser.add_argument("-n", "--dut-cnt", type=int, default=1, help="number of duts")
+    arg_parser.add_argument("--first-port", type=int, default=47, help="port number of the first dut")
+    arg_parser.add_argument("--link-format", default="/tmp/ttyDUT%s", help="pty link path, %%s: port number")
+    arg_parser.add_argument("--latency", type=float, default=2.0, help="response latency, ms")
+    arg_parser.add_argument("--jitter", type=float, default=0.0, help="response latency jitter, ms")
+    arg_parser.add_argument("--baud", type=int, default=115200, help="line speed, 0: no limit")
+    arg_parser.add_argument("--drop", type=float, default=0.0, help="rate of dropped responses")
+    arg_parser.add_argument("--corrupt", type=float, default=0.0, help="rate of responses with a corrupted byte")
+    arg_parser.add_argument("--noise", type=float, default=0.0, help="rate of responses after line noise")
+    arg_parser.add_argument("--device-type", type=int, default=0, choices=sorted(DictDeviceName.keys()))
+    arg_parser.add_argument("--fw-ver", default="KL-K%s-11.0.0.1", help="fw version, %%s: device name")
+    arg_parser.add_argument("--seed", type=int, default=0, help="random seed of jitter, noise and faults")
+    arg_value = arg_parser.parse_args()
+
+    main_emu_config = EmulatorConfig(arg_value.latency, arg_value.jitter, arg_value.baud, arg_value.drop,
+                                     arg_value.corrupt, arg_value.noise, arg_value.device_type, arg_value.fw_ver,
+                                     arg_value.seed)
+    main_pty_dut_list = emulator_start(arg_value.dut_cnt, main_emu_config, arg_value.first_port,
+                                       arg_value.link_format)
+    for main_pty_dut in main_pty_dut_list:
+        print ("dut %d: %s -> %s" % (main_pty_dut.virtual_dut.dut_index, main_pty_dut.link_path,
+                                     main_pty_dut.slave_name))
+    print ("serial_port_num = %s" % ", ".join(str(arg_value.first_port + each_index)
+                                              for each_index in range(arg_value.dut_cnt)))
+    print ("serial_port_format = %s" % arg_value.link_format)
+    print ("Press <Ctrl-C> to stop...")
+    try:
+        while 1:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    emulator_stop(main_pty_dut_list)
+    sys.exit()
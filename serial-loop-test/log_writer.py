@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Board logging off the test path.
+# The test thread only queues log records, one writer thread per process formats them and writes the log file
+# and the console, so a disk or console stall on the shop pc does not run into a command timeout.
+# Messages are formatted by the writer: pass the values as logging args, HexDump for bytes, and the hex string
+# is built only for records of an enabled level.
+
+import binascii
+import logging
+import Queue
+import threading
+
+log_queue = Queue.Queue()  # (handler list, record) or (None, event set once written up to here)
+log_writer_thread = None  # created on first use
+log_writer_lock = threading.Lock()
+
+
+class HexDump(object):
+    """bytes logged as hex, converted when the writer formats the record."""
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return binascii.b2a_hex(self.data)
+
+
+class QueueHandler(logging.Handler):
+    """Puts records of its logger into the writer queue, the wrapped handlers format and write them."""
+
+    def __init__(self, handler_list):
+        logging.Handler.__init__(self, min(handler.level for handler in handler_list))
+        self.handler_list = list(handler_list)
+        log_writer_start()
+
+    def emit(self, record):
+        log_queue.put((self.handler_list, record))
+
+    def flush(self, time_out=5):
+        # wait until the writer has written every record queued so far
+        if log_writer_thread is None or not log_writer_thread.is_alive():
+            return
+        flush_event = threading.Event()
+        log_queue.put((None, flush_event))
+        flush_event.wait(time_out)
+
+    def close(self):
+        self.flush()
+        for handler in self.handler_list:
+            handler.close()
+        logging.Handler.close(self)
+
+
+def log_writer_loop():
+    while 1:
+        handler_list, record = log_queue.get()
+        if handler_list is None:
+            record.set()
+            continue
+        for handler in handler_list:
+            if record.levelno >= handler.level:
+                handler.handle(record)  # errors go to handler.handleError()
+
+
+def log_writer_start():
+    global log_writer_thread
+    with log_writer_lock:
+        if log_writer_thread is None or not log_writer_thread.is_alive():
+            log_writer_thread = threading.Thread(target=log_writer_loop, name="log_writer")
+            log_writer_thread.daemon = True  # records left at exit are written by logging.shutdown() -> flush()
+            log_writer_thread.start()
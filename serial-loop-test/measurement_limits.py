@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Limits of every measured value, loaded from [threshold config] / [ktj pt config] into one compiled table.
+# A measurement record (metric -> value) is evaluated in one call, per metric pass/fail and margin:
+# margin is the distance to the nearest limit, negative when the value is out of limits.
+
+import collections
+
+LimitSpec = collections.namedtuple("LimitSpec", ["metric", "lower", "upper", "unit"])
+LimitResult = collections.namedtuple("LimitResult", ["metric", "value", "lower", "upper", "passed", "margin"])
+
+# metric -> (config section, lower limit key, upper limit key, unit)
+# key None: no limit on that side, "<key>[n]": item n of a "lower, upper" range key
+DictLimitSource = collections.OrderedDict()
+
+
+def limit_define(metric, section, lower_key=None, upper_key=None, unit=""):
+    DictLimitSource[metric] = (section, lower_key, upper_key, unit)
+
+
+def limit_range_define(metric, section, range_key, unit=""):
+    limit_define(metric, section, range_key + "[0]", range_key + "[1]", unit)
+
+
+limit_define("noise_floor", "threshold config", upper_key="noise_floor_threshold")
+limit_define("tx_power", "threshold config", "tx_power_threshold")
+limit_define("rx_rssi", "threshold config", "rx_rssi_threshold")
+limit_define("dut_real_ppm", "threshold config", "dut_real_ppm_min", "dut_real_ppm_max")
+limit_define("rx_snr", "threshold config", "rx_snr_threshold")
+limit_define("tmi4_csr", "threshold config", "tmi4_csr_threshold", unit="%")
+limit_define("ext_tmi3_csr", "threshold config", "ext_tmi3_csr_threshold", unit="%")
+limit_define("charge_voltage_rise", "threshold config", "charge_voltage_threshold", unit="V")
+# flatness: avg 80-120 minus avg 32-40 and var 80-120 of the csi dump, dB
+limit_define("filter_700k_band_delta", "threshold config", "hpf_700k_threshold", "hpf_2m_threshold")
+limit_define("filter_2m_band_delta", "threshold config", "hpf_2m_threshold")
+limit_define("filter_band_var", "threshold config", upper_key="hpf_flat_threshold")
+limit_range_define("ch0_voltage", "threshold config", "channel_0_range", unit="V")
+limit_range_define("ch1_voltage", "threshold config", "channel_1_range", unit="V")
+limit_range_define("ch2_voltage", "threshold config", "channel_2_range", unit="V")
+limit_range_define("ch3_voltage", "threshold config", "channel_3_range", unit="V")
+limit_range_define("ktj_channel_0_voltage", "ktj pt config", "ktj_channel_0_range", unit="V")
+limit_range_define("ktj_channel_1_voltage", "ktj pt config", "ktj_channel_1_range", unit="V")
+limit_range_define("ktj_channel_2_voltage", "ktj pt config", "ktj_channel_2_range", unit="V")
+limit_range_define("ktj_channel_3_voltage", "ktj pt config", "ktj_channel_3_range", unit="V")
+limit_range_define("ktj_channel_5_voltage", "ktj pt config", "ktj_channel_5_range", unit="V")
+
+
+def limit_config_value(config_section, limit_key):
+    if limit_key is None:
+        return None
+    if limit_key.endswith("]"):
+        range_key, range_index = limit_key[:-1].split("[")
+        range_value = config_section[range_key]
+        if not isinstance(range_value, (list, tuple)) or 2 != len(range_value):
+            raise ValueError("%s should be: lower, upper" % range_key)
+        return float(range_value[int(range_index)])
+    return float(config_section[limit_key])
+
+
+def limit_table_compile(config_handler):
+    # config_handler: ConfigObj or any dict of sections, returns metric -> LimitSpec
+    limit_table = collections.OrderedDict()
+    for metric, (section, lower_key, upper_key, unit) in DictLimitSource.items():
+        limit_table[metric] = LimitSpec(metric, limit_config_value(config_handler[section], lower_key),
+                                        limit_config_value(config_handler[section], upper_key), unit)
+    return limit_table
+
+
+def limit_value_check(limit_table, metric, value):
+    limit_spec = limit_table[metric]
+    margin = None
+    if limit_spec.lower is not None:
+        margin = value - limit_spec.lower
+    if limit_spec.upper is not None and (margin is None or limit_spec.upper - value < margin):
+        margin = limit_spec.upper - value
+    return LimitResult(metric, value, limit_spec.lower, limit_spec.upper, margin is None or margin >= 0, margin)
+
+
+def limit_evaluate(limit_table, measure_record):
+    # measure_record: dict or (metric, value) list, returns metric -> LimitResult in record order
+    measure_items = measure_record.items() if hasattr(measure_record, "items") else measure_record
+    dict_limit_result = collections.OrderedDict()
+    for metric, value in measure_items:
+        dict_limit_result[metric] = limit_value_check(limit_table, metric, value)
+    return dict_limit_result
+
+
+def limit_batch_evaluate(limit_table, measure_record_list):
+    # re-evaluate stored measurement records, eg. after a limit change
+    return [limit_evaluate(limit_table, measure_record) for measure_record in measure_record_list]
+
+
+def limit_all_passed(dict_limit_result):
+    for limit_result in dict_limit_result.itervalues():
+        if not limit_result.passed:
+            return False
+    return True
+
+
+def limit_result_info(limit_result, unit=""):
+    value_str = "%s(%g%s)" % (limit_result.metric, limit_result.value, unit)
+    if limit_result.passed:
+        return "%s pass, margin %g%s" % (value_str, 0 if limit_result.margin is None else limit_result.margin, unit)
+    if limit_result.lower is not None and limit_result.upper is not None:
+        return "%s is beyond range[%g%s : %g%s]" % (value_str, limit_result.lower, unit, limit_result.upper, unit)
+    if limit_result.lower is not None:
+        return "%s is less than %g%s" % (value_str, limit_result.lower, unit)
+    return "%s is larger than %g%s" % (value_str, limit_result.upper, unit)
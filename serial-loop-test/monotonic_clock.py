@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Monotonic clock of every deadline, plan ready time and step timing, a clock adjustment of the station pc
+# (ntp, daylight saving) must not fire or stall a timeout.
+# Python 2.7 has no time.monotonic(): QueryPerformanceCounter on windows, clock_gettime(CLOCK_MONOTONIC)
+# elsewhere, through ctypes.
+
+import ctypes
+import ctypes.util
+import os
+import sys
+import time
+
+
+def qpc_clock_get():
+    kernel32 = ctypes.windll.kernel32
+    perf_frequency = ctypes.c_int64()
+    if not kernel32.QueryPerformanceFrequency(ctypes.byref(perf_frequency)):
+        raise OSError("QueryPerformanceFrequency failed")
+    frequency = float(perf_frequency.value)
+
+    def qpc_time():
+        perf_counter = ctypes.c_int64()
+        kernel32.QueryPerformanceCounter(ctypes.byref(perf_counter))
+        return perf_counter.value / frequency
+    return qpc_time
+
+
+class Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+def clock_gettime_get():
+    clock_monotonic = 6 if "darwin" == sys.platform else 1
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    clock_gettime = getattr(libc, "clock_gettime", None)
+    if clock_gettime is None:  # glibc < 2.17
+        clock_gettime = ctypes.CDLL(ctypes.util.find_library("rt") or "librt.so.1", use_errno=True).clock_gettime
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(Timespec)]
+
+    def clock_gettime_time():
+        t_spec = Timespec()
+        if clock_gettime(clock_monotonic, ctypes.byref(t_spec)):
+            raise OSError(ctypes.get_errno(), "clock_gettime failed")
+        return t_spec.tv_sec + t_spec.tv_nsec * 1e-9
+    clock_gettime_time()  # fails here, not in a deadline
+    return clock_gettime_time
+
+
+def monotonic_clock_get():
+    if hasattr(time, "monotonic"):
+        return time.monotonic
+    try:
+        if "nt" == os.name:
+            return qpc_clock_get()
+        return clock_gettime_get()
+    except (AttributeError, OSError), e_info:
+        print ("Monotonic clock not available (%s), deadlines follow the wall clock" % str(e_info))
+        return time.time
+
+
+monotonic_time = monotonic_clock_get()
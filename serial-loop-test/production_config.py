@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Typed production test config: config_production_test.ini is parsed and validated into one immutable
+# BoardConfig snapshot, limits compiled once. The file is parsed again only when its mtime or size changes,
+# every board run gets the snapshot current at its start.
+
+import collections
+import os
+
+import configobj
+
+import measurement_limits
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def config_int(value):
+    return int(float(value))
+
+
+def config_float(value):
+    return float(value)
+
+
+def config_str(value):
+    if isinstance(value, list):  # configobj splits values on comma
+        return ", ".join(value)
+    return value
+
+
+def config_str_tuple(value):
+    # single value, eg. 47 | list, eg. 47, 48, 49
+    if isinstance(value, list):
+        return tuple(value)
+    return value,
+
+
+def config_phase_tuple(value):
+    # eg. A | ABC | A, B, C
+    return tuple("".join(value) if isinstance(value, list) else value.replace(" ", ""))
+
+
+# (field name, config section, config key, converter, default value or None: key required, valid values or None)
+ListConfigField = [
+    ("sport_num_list", "serial config", "serial_port_num", config_str_tuple, None, None),
+    ("baudrate_value", "serial config", "baud_rate", config_int, None, None),
+    ("serial_port_format", "serial config", "serial_port_format", config_str, "com%s", None),
+
+    ("loop_mode", "test config", "loop_mode", config_int, None, (1, 2, 3)),
+    ("reset_mode", "test config", "reset_mode", config_str, None, ("0", "1")),
+    ("reboot_method", "test config", "reboot_method", config_str, None, ("0", "1")),
+    ("label_enable", "test config", "label_enable", config_int, None, (0, 1)),
+    ("csi_raw_data_mode", "test config", "csi_raw_data_mode", config_int, "0", (0, 1)),
+    ("csi_record_lot", "test config", "csi_record_lot", config_str, "lot", None),
+    ("uart_trace_enable", "test config", "uart_trace_enable", config_int, "0", (0, 1)),
+    ("log_debug_enable", "test config", "log_debug_enable", config_int, "1", (0, 1)),
+    ("results_db_file", "test config", "results_db_file", config_str, r".\log_production_test\production_results.db",
+     None),
+
+    ("vendor_id_enable", "test parameters config", "vendor_id_enable", config_int, None, (0, 1)),
+    ("vendor_id", "test parameters config", "vendor_id", config_str, None, None),
+    ("str_mac_addr_burn", "test parameters config", "burned_mac_address", config_str, None, None),
+    ("nf_detection_times", "test parameters config", "nf_detection_times", config_int, "3", None),
+    ("phase_list", "test parameters config", "phase", config_phase_tuple, None, None),
+    ("gold_ppm", "test parameters config", "gold_ppm", config_int, None, None),
+    ("phy_power_att", "test parameters config", "phy_power_att", config_int, None, None),
+    ("device_type", "test parameters config", "device_type", config_int, None, (0, 1, 2, 3, 4)),
+    ("software_version", "test parameters config", "software_version", config_str, None, None),
+    ("filter_type", "test parameters config", "filter_type", config_int, None, (0, 1)),
+    ("global_nid", "test parameters config", "global_nid", config_int, None, None),
+
+    ("tmi4_csr_enable", "threshold config", "tmi4_csr_enable", config_int, None, (0, 1)),
+    ("ext_tmi3_csr_enable", "threshold config", "ext_tmi3_csr_enable", config_int, None, (0, 1)),
+    ("charge_timespan", "threshold config", "charge_timespan", config_int, None, None),
+    ("spur_max_limit_cnt", "threshold config", "spur_max_limit_cnt", config_int, None, None),
+    ("spur_remove_tone_cnt", "threshold config", "spur_remove_tone_cnt", config_int, None, None),
+
+    # upper bounds of the readiness waits between steps, power off / reset low hold time, unit: s
+    ("power_hold_time", "wait config", "power_hold_time", config_float, "0.5", None),
+    ("nf_sample_wait_max", "wait config", "nf_sample_wait_max", config_float, "1", None),
+    ("nf_sample_spacing", "wait config", "nf_sample_spacing", config_float, "0.4", None),
+    ("rf_settle_time", "wait config", "rf_settle_time", config_float, "1", None),
+    ("led_gpio_wait_max", "wait config", "led_gpio_wait_max", config_float, "0.5", None),
+    ("csr_retry_settle_time", "wait config", "csr_retry_settle_time", config_float, "0.5", None),
+    ("mac_burn_wait_max", "wait config", "mac_burn_wait_max", config_float, "1", None),
+
+    ("ktj_gpio_check_enable", "ktj pt config", "ktj_gpio_check_enable", config_int, None, (0, 1)),
+    ("ktj_channel_voltage_check_enable", "ktj pt config", "ktj_channel_voltage_check_enable", config_int, None,
+     (0, 1)),
+]
+for each_flag_name in ["read_fw_ver_flag", "read_chip_id_flag", "read_mac_address_flag", "burned_mac_address_flag",
+                       "noise_floor_detection_flag", "tx_rx_loopback_detection_flag", "flatness_detection_flag",
+                       "sen_csr_detection_flag", "led_control_flag", "zero_cross_detection_flag",
+                       "channel_voltage_detection_flag", "gpio_status_detection_flag", "tdsb_voltage_detection_flag",
+                       "psram_mem_detection_flag"]:
+    ListConfigField.append((each_flag_name, "test case flag config", each_flag_name, config_int, None, (0, 1)))
+
+BoardConfig = collections.namedtuple("BoardConfig", [each_field[0] for each_field in ListConfigField] +
+                                     ["limit_table", "config_file"])
+
+dict_config_cache = {}  # config file -> ((mtime, size), BoardConfig)
+
+
+def config_parse(config_handler, config_file=""):
+    field_value_list = []
+    for field_name, section, key, converter, default_value, valid_values in ListConfigField:
+        if section in config_handler and key in config_handler[section]:
+            raw_value = config_handler[section][key]
+        elif default_value is not None:
+            raw_value = default_value
+        else:
+            raise ConfigError("%s: [%s] %s missing" % (config_file, section, key))
+        try:
+            value = converter(raw_value)
+        except (TypeError, ValueError):
+            raise ConfigError("%s: [%s] %s = %s is not a valid value" % (config_file, section, key, str(raw_value)))
+        if valid_values is not None and value not in valid_values:
+            raise ConfigError("%s: [%s] %s = %s not in %s" % (config_file, section, key, str(value),
+                                                              str(valid_values)))
+        field_value_list.append(value)
+    board_config = BoardConfig._make(field_value_list + [None, config_file])
+
+    for each_phase in board_config.phase_list:
+        if each_phase not in "ABC":
+            raise ConfigError("%s: [test parameters config] phase %s not in A, B, C" % (config_file, each_phase))
+    try:
+        limit_table = measurement_limits.limit_table_compile(config_handler)
+    except (KeyError, IndexError, TypeError, ValueError), e_info:
+        raise ConfigError("%s: threshold limits invalid <%s>" % (config_file, str(e_info)))
+    return board_config._replace(limit_table=limit_table)
+
+
+def config_snapshot_get(config_file=r"config_production_test.ini"):
+    # stat only while the file is unchanged, parse again on change
+    try:
+        file_stat = os.stat(config_file)
+    except OSError, e_info:
+        raise ConfigError("%s: %s" % (config_file, str(e_info)))
+    file_version = (file_stat.st_mtime, file_stat.st_size)
+    config_cache = dict_config_cache.get(config_file)
+    if config_cache is not None and file_version == config_cache[0]:
+        return config_cache[1]
+
+    try:
+        config_handler = configobj.ConfigObj(config_file, file_error=True)
+    except (IOError, configobj.ConfigObjError), e_info:
+        raise ConfigError("%s: %s" % (config_file, str(e_info)))
+    board_config = config_parse(config_handler, config_file)
+    dict_config_cache[config_file] = (file_version, board_config)
+    return board_config
@@ -1,13 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import time
+time_script_start = time.time()  # startup time, logged at debug level by the first board
+
 import binascii
-import configobj
 import collections
-from ctypes import *
-import datetime
 import logging
-import math
+import multiprocessing
 import os
 import Queue
 import re
@@ -15,11 +15,20 @@ import sys
 import signal
 import serial
 import struct
-import time
 import threading
-import xmodem
-import numpy as np
-import matplotlib.pyplot as plt
+
+import board_plan
+import csi_dump_record
+import log_writer
+import measurement_limits
+from monotonic_clock import monotonic_time
+import production_config
+from protocol_schema import CommandDataHead, DictCommandSpec, response_decode
+import results_store
+import spectrogram_render
+import step_timing
+import uart_trace
+import xmodem_transfer
 
 
 # Return Code:
@@ -28,39 +37,13 @@ Err_fail = -1
 Err_timeout = -2
 
 
-class _tx_rx_loopback(Structure):  # 17 bytes
-    _pack_ = 1
-    _fields_ = [('w_character', c_ubyte),
-                ('q_character', c_ubyte),
-                ('accurate_indication', c_ubyte),
-                ('tx_gain', c_ubyte),
-                ('tx_adc_power', c_ubyte),
-                ('tx_dc', c_int8),
-                ('tx_ppm', c_int16),
-                ('tx_snr', c_int8),
-                ('rx_phase', c_ubyte),
-                ('rx_gain', c_ubyte),
-                ('rx_adc_power', c_ubyte),
-                ('rx_dc', c_int8, 5),  # little endian: LSB
-                ('reserver', c_int8, 3),
-                ('rx_ppm', c_int8),
-                ('rx_snr', c_int8),
-                ('dut_real_ppm', c_int16)
-                ]
-
-
-class _chip_info(Structure):  # 5 bytes
-    _pack_ = 1
-    _fields_ = [("mac_addr_1", c_ubyte),
-                ("mac_addr_2", c_ubyte),
-                ("mac_addr_3", c_ubyte),
-                ("ver_pkg_flash", c_ubyte, 1),
-                ("ver_pkg_lic", c_ubyte, 1),
-                ("ver_pkg_bumping", c_ubyte, 2),
-                ("ver_reserved", c_ubyte, 4),
-                ("ver_wafer", c_ubyte, 4),
-                ("not_used_4bits", c_ubyte, 4)
-                ]
+# dtest tx/rx loopback accurate indication -> failure reason
+DictTxrxIndicationError = {
+    0x00: r"Error: real ppm value over range!",
+    0x01: r"Error: golden unit is not online!",
+    0x02: r"Error: snr check failed!",
+    0x03: r"Error: ppm calibration burned failed!"
+}
 
 
 DictGpioSetLevel = {
@@ -139,37 +122,13 @@ DictKTJGPIOMapping = {
 
 
 ListKTJVoltageChannel = [0, 1, 2, 3, 5]
+voltage_factor = (3.2 / 512)  # dut adc value to voltage(V)
 
 
 DictPhase = {
-    "A": "01",  # Phase A
-    "B": "02",  # Phase B
-    "C": "03"  # Phase C
-}
-
-
-DictEndianType = {
-    "<": "little-endian",
-    ">": "big_endian"
-}
-
-
-DictStructDataFormat = {
-    "x": "pad_byte",
-    "c": "char",
-    "b": "signed_char",
-    "B": "unsigned_char",
-    "?": "_bool",
-    "h": "short",
-    "H": "unsigned_short",
-    "i": "int",
-    "I": "unsigned_int",
-    "l": "long",
-    "L": "unsigned_long",
-    "q": "long_long",
-    "Q": "unsigned_long_long",
-    "f": "float",
-    "d": "double"
+    "A": 0x01,  # Phase A
+    "B": 0x02,  # Phase B
+    "C": 0x03  # Phase C
 }
 
 
@@ -229,11 +188,14 @@ DictChipInfo = {
 }
 
 
-DictStructChannelVoltage = collections.OrderedDict()
-DictStructChannelVoltage["channel_0_ADC_12V"] = 'H'
-DictStructChannelVoltage["channel_1_ADC_3.3V"] = 'H'
-DictStructChannelVoltage["channel_2_ADC_1.2V"] = 'H'
-DictStructChannelVoltage["channel_3_ADC_5V"] = 'H'
+# flatness inspection bands: name -> (start tone, end tone), both tones included
+DictFlatnessBand = collections.OrderedDict()
+DictFlatnessBand["32_40"] = (32, 40)
+DictFlatnessBand["40_80"] = (41, 79)
+DictFlatnessBand["80_120"] = (80, 120)
+
+FlatnessBandResult = collections.namedtuple("FlatnessBandResult",
+                                            ["tone_start", "tone_end", "avg", "var", "calc_tone_cnt"])
 
 
 def signal_exit(sig_num, sig_frame):
@@ -242,218 +204,461 @@ def signal_exit(sig_num, sig_frame):
     sys.exit()
 
 
-time_out_queue = Queue.Queue(maxsize=10)
+np = None  # numpy: flatness detection only, see optional_module_import()
+optional_import_time = None  # seconds spent in optional imports, None: not done yet
 
 
-def timeout_set(time_interval, to_queue):
-    def wrapper(func):
-        def time_out():
-            to_queue.put(1)
-            print ("Timeout Error: function not responded in %d seconds, exit automatically!" % time_interval)
+def optional_module_import(numpy_flag):
+    # heavy modules are imported only when an enabled test case needs them
+    global np, optional_import_time
+    import_start = time.time()
+    if numpy_flag and np is None:
+        import numpy as np
+    optional_import_time = (optional_import_time or 0) + time.time() - import_start
+
+
+
+class Deadline(object):
+    """Point in monotonic time a request has to complete by."""
+    def __init__(self, time_interval):
+        self.time_interval = time_interval
+        self.expire_at = monotonic_time() + time_interval
+
+    def remaining(self):
+        return max(0.0, self.expire_at - monotonic_time())
+
+    def expired(self):
+        return monotonic_time() >= self.expire_at
+
+
+deadline_local = threading.local()  # per thread stack of active deadlines
+
 
+def deadline_current():
+    d_stack = getattr(deadline_local, "stack", None)
+    if d_stack:
+        return d_stack[-1]
+    return None
+
+
+def timeout_set(time_interval, step_name=None):
+    # the call must complete in time_interval seconds, a nested call never outlives its caller
+    # every call is a timed step, named after the function unless step_name is given
+    def wrapper(func):
         def deco(*args, **kwargs):
-            timer = threading.Timer(time_interval, time_out)
-            timer.start()
-            res = func(*args, **kwargs)
-            timer.cancel()
-            to_queue.queue.clear()
+            d_stack = getattr(deadline_local, "stack", None)
+            if d_stack is None:
+                d_stack = deadline_local.stack = []
+            r_deadline = Deadline(time_interval)
+            if d_stack and d_stack[-1].expire_at < r_deadline.expire_at:
+                r_deadline.expire_at = d_stack[-1].expire_at
+            d_stack.append(r_deadline)
+            step_timing.step_begin(step_name or func.__name__)
+            res = None
+            try:
+                res = func(*args, **kwargs)
+            finally:
+                step_timing.step_end(res)
+                d_stack.pop()
+            if Err_timeout == res and r_deadline.expired():
+                print ("Timeout Error: function not responded in %d seconds, exit automatically!" % time_interval)
             return res
 
+        deco.__name__ = func.__name__
         return deco
     return wrapper
 
 
-def cmd_id_get(data_str):
-    m_cmd_id = re.search(r"2323(\w{24})(\w{8})(\w{8})(\w{8})(\w{4})((\w{2})+)4040", data_str)
-    if m_cmd_id:
-        str_cmd_id = m_cmd_id.group(5)  # eg. 0200
-    else:
-        str_cmd_id = None
-
-    return str_cmd_id
- 
+dict_wait_record = collections.OrderedDict()  # wait name -> [seconds each wait needed], of the current board
+board_result_record = None  # results_store.BoardRecord of the last board run, None: aborted
+
+
+def ready_poll(ready_probe, poll_interval):
+    r_deadline = deadline_current()
+    while not ready_probe():
+        if r_deadline.remaining() <= poll_interval:
+            return False
+        time.sleep(poll_interval)
+        step_timing.step_retry()
+    return True
+
+
+def ready_wait(wait_name, ready_probe, time_max, poll_interval=0.05):
+    # instead of a fixed delay: poll ready_probe() until it returns True, time_max bounds the wait and every
+    # probe command in it, how long the wait needed is recorded under wait_name
+    wait_start = monotonic_time()
+    ready_flag = timeout_set(time_max, "wait_" + wait_name)(ready_poll)(ready_probe, poll_interval)
+    dict_wait_record.setdefault(wait_name, []).append(monotonic_time() - wait_start)
+    return ready_flag
+
+
+def wait_record_log(logger_printer):
+    for wait_name, wait_time_list in dict_wait_record.items():
+        logger_printer.debug("Wait %s: %d times, total %.3fs, max %.3fs",
+                             wait_name, len(wait_time_list), sum(wait_time_list), max(wait_time_list))
+
+
+# (module_id, message_id, cmd_id, payload), cmd_id is None when payload shorter than 2 bytes
+ProtocolFrame = collections.namedtuple("ProtocolFrame", ["module_id", "msg_id", "cmd_id", "payload"])
+
+
+class FrameDecoder(object):
+    # 2323 | address 12B | module_id 2B | crc 2B | message_id 4B | length 4B | payload | 4040
+    frame_head = "\x23\x23"
+    frame_tail = "\x40\x40"
+    frame_addr = "\x00" * 12
+    head_struct = struct.Struct("<HHII")
+    head_len = 26
+    tail_len = 2
+    payload_len_max = 0x400  # largest response: csi packet, cmd head 6B + 89 tones * 4B + batch info 8B
+    cmd_id_struct = struct.Struct("<H")
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        self.buffer.extend(data)
+
+    def reset(self):
+        del self.buffer[:]
+
+    def frame_pop(self):
+        """Return the next complete frame in the buffer, or None if more bytes are needed."""
+        buf = self.buffer
+        while 1:
+            head_pos = buf.find(self.frame_head)
+            if head_pos < 0:
+                # keep a trailing 0x23, it may be the first half of a frame head
+                keep_len = 1 if buf[-1:] == self.frame_head[0] else 0
+                del buf[:len(buf) - keep_len]
+                return None
+            if head_pos:
+                del buf[:head_pos]  # text output or broken frame before the head
+
+            if len(buf) < self.head_len:
+                return None
+            if buf[2:14] != self.frame_addr:
+                del buf[:1]  # not a frame head, resync
+                continue
+
+            module_id, crc, msg_id, payload_len = self.head_struct.unpack_from(buf, 14)
+            if payload_len > self.payload_len_max:
+                del buf[:1]
+                continue
+
+            frame_len = self.head_len + payload_len + self.tail_len
+            if len(buf) < frame_len:
+                if self.inner_frame_find(buf, frame_len):
+                    del buf[:1]  # a complete frame inside the payload: bad length field, resync
+                    continue
+                return None
+            if buf[frame_len - self.tail_len:frame_len] != self.frame_tail:
+                del buf[:1]
+                continue
+
+            payload = bytes(buf[self.head_len:self.head_len + payload_len])
+            del buf[:frame_len]
+            if payload_len >= 2:
+                cmd_id = self.cmd_id_struct.unpack_from(payload)[0]
+            else:
+                cmd_id = None
+            return ProtocolFrame(module_id, msg_id, cmd_id, payload)
+
+    def inner_frame_find(self, buf, frame_len):
+        # True if a complete frame starts after the head of a frame still waiting for bytes
+        inner_head = self.frame_head + self.frame_addr
+        inner_pos = buf.find(inner_head, self.head_len, frame_len)
+        while 0 <= inner_pos and inner_pos + self.head_len <= len(buf):
+            inner_len = self.head_len + self.head_struct.unpack_from(buf, inner_pos + 14)[3] + self.tail_len
+            inner_end = inner_pos + inner_len
+            if inner_len - self.head_len - self.tail_len <= self.payload_len_max and inner_end <= len(buf) \
+                    and buf[inner_end - self.tail_len:inner_end] == self.frame_tail:
+                return True
+            inner_pos = buf.find(inner_head, inner_pos + 1, frame_len)
+        return False
+
+
+def serial_bytes_read(pser):
+    read_bytes = pser.read(1)
+    bytes2read = pser.inWaiting()
+    if bytes2read:
+        read_bytes += pser.read(bytes2read)
+    return read_bytes
+
+
+def serial_bytes_read_deadline(pser):
+    # direct read of a port not owned by a dispatcher: block no longer than the current deadline allows
+    r_deadline = deadline_current()
+    port_timeout = pser.timeout
+    if r_deadline is None or port_timeout is None or r_deadline.remaining() >= port_timeout:
+        return serial_bytes_read(pser)
+    pser.timeout = r_deadline.remaining()
+    try:
+        return serial_bytes_read(pser)
+    finally:
+        pser.timeout = port_timeout
+
+
+class ResponseWaiter(object):
+    # frame_cnt: number of response frames expected, None: until cancel()
+    def __init__(self, dispatcher, cmd_id, frame_cnt=1):
+        self.dispatcher = dispatcher
+        self.cmd_id = cmd_id
+        self.frame_cnt = frame_cnt
+        self.frame_queue = Queue.Queue()
+        # monotonic time: write start / end, first byte read after the write, first response frame
+        self.time_write_start = None
+        self.time_write_end = None
+        self.time_first_byte = None
+        self.time_frame = None
+
+    def cancel(self):
+        self.dispatcher.waiter_remove(self)
+
+
+class SerialDispatcher(object):
+    """Background reader of one serial port, routes response frames to waiters by cmd id."""
+
+    def __init__(self, pser, pre_read_bytes=''):
+        self.pser = pser
+        self.decoder = FrameDecoder()
+        self.decoder.feed(pre_read_bytes)
+        self.waiter_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.dict_waiter = {}  # cmd_id -> [ResponseWaiter, ...] in request order
+        self.running = False
+        self.reader_thread = None
+
+    def start(self):
+        self.running = True
+        self.reader_thread = threading.Thread(target=self.reader_loop, name="serial_reader_%s" % self.pser.port)
+        self.reader_thread.setDaemon(True)
+        self.reader_thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.reader_thread is not None and self.reader_thread is not threading.currentThread():
+            self.reader_thread.join()
+
+    def reader_loop(self):
+        while self.running:
+            try:
+                read_bytes = serial_bytes_read(self.pser)
+            except Exception, e_info:
+                print ("Serial reader of %s stopped: %s" % (self.pser.port, str(e_info)))
+                self.running = False
+                break
+            if not read_bytes:
+                continue
+            self.first_byte_mark(monotonic_time())
+            self.decoder.feed(read_bytes)
+            r_frame = self.decoder.frame_pop()
+            while r_frame is not None:
+                self.frame_dispatch(r_frame)
+                r_frame = self.decoder.frame_pop()
+
+    def first_byte_mark(self, time_read):
+        with self.waiter_lock:
+            for waiter_list in self.dict_waiter.itervalues():
+                for r_waiter in waiter_list:
+                    if r_waiter.time_first_byte is None and r_waiter.time_write_end is not None:
+                        r_waiter.time_first_byte = time_read
+
+    def frame_dispatch(self, r_frame):
+        # only response frames (message id 1) are routed, the oldest waiter of the cmd id gets the frame
+        if 1 != r_frame.msg_id:
+            return
+        with self.waiter_lock:
+            waiter_list = self.dict_waiter.get(r_frame.cmd_id)
+            if not waiter_list:
+                return  # nobody waits for it: late response of a timed out command
+            r_waiter = waiter_list[0]
+            if r_waiter.time_frame is None:
+                r_waiter.time_frame = monotonic_time()
+            r_waiter.frame_queue.put(r_frame)
+            if r_waiter.frame_cnt is not None:
+                r_waiter.frame_cnt -= 1
+                if r_waiter.frame_cnt <= 0:
+                    waiter_list.pop(0)
+
+    def waiter_add(self, cmd_id, frame_cnt=1):
+        r_waiter = ResponseWaiter(self, cmd_id, frame_cnt)
+        with self.waiter_lock:
+            self.dict_waiter.setdefault(cmd_id, []).append(r_waiter)
+        return r_waiter
+
+    def waiter_remove(self, r_waiter):
+        with self.waiter_lock:
+            waiter_list = self.dict_waiter.get(r_waiter.cmd_id, [])
+            if r_waiter in waiter_list:
+                waiter_list.remove(r_waiter)
+
+    def request(self, cmd_bytes, cmd_id, frame_cnt=1):
+        # register before write, the response may come back before write() returns
+        r_waiter = self.waiter_add(cmd_id, frame_cnt)
+        with self.write_lock:
+            r_waiter.time_write_start = monotonic_time()
+            self.pser.write(cmd_bytes)
+            r_waiter.time_write_end = monotonic_time()
+        step_timing.step_request(r_waiter.time_write_start, r_waiter.time_write_end)
+        return r_waiter
+
+    def request_batch(self, cmd_list):
+        # cmd_list: [(cmd_bytes, cmd_id), ...], sent with a single write()
+        waiter_list = [self.waiter_add(each_cmd_id) for each_bytes, each_cmd_id in cmd_list]
+        with self.write_lock:
+            time_write_start = monotonic_time()
+            self.pser.write("".join(each_bytes for each_bytes, each_cmd_id in cmd_list))
+            time_write_end = monotonic_time()
+        for r_waiter in waiter_list:
+            r_waiter.time_write_start, r_waiter.time_write_end = time_write_start, time_write_end
+        step_timing.step_request(time_write_start, time_write_end)
+        return waiter_list
+
+
+dict_serial_dispatcher = {}
+serial_dispatcher_lock = threading.Lock()
+
+
+def serial_dispatcher_get(pser, pre_read_bytes=''):
+    # one reader per serial port, started on first use
+    with serial_dispatcher_lock:
+        if pser not in dict_serial_dispatcher:
+            s_dispatcher = SerialDispatcher(pser, pre_read_bytes)
+            s_dispatcher.start()
+            dict_serial_dispatcher[pser] = s_dispatcher
+        return dict_serial_dispatcher[pser]
+
+
+def serial_dispatcher_stop(pser):
+    # hand the port back to plain read(), eg. for sbl cli or xmodem transfer
+    with serial_dispatcher_lock:
+        s_dispatcher = dict_serial_dispatcher.pop(pser, None)
+    if s_dispatcher is not None:
+        s_dispatcher.stop()
+
+
+def command_request(pser, cmd_bytes, cmd_id, frame_cnt=1):
+    return serial_dispatcher_get(pser).request(cmd_bytes, cmd_id, frame_cnt)
+
+
+def response_frame_wait(r_waiter, data_len=None):
+    # response frame: message id 1, payload = cmd_id 2B | total len 2B | data len 2B | data
+    # blocks for the time left until the deadline of the calling command
+    r_deadline = deadline_current()
+    while 1:
+        try:
+            if r_deadline is None:
+                r_frame = r_waiter.frame_queue.get(timeout=1)
+            else:
+                r_frame = r_waiter.frame_queue.get(timeout=r_deadline.remaining())
+        except Queue.Empty:
+            if r_deadline is not None:
+                r_waiter.cancel()
+                return Err_timeout
+            continue
+        if data_len is None or 6 + data_len == len(r_frame.payload):
+            step_timing.step_response(r_waiter.time_write_start, r_waiter.time_first_byte, r_waiter.time_frame)
+            return r_frame
 
-@timeout_set(3, time_out_queue)
-def cmd_send(pser, cmd_str, info_q, logger_p, to_queue):
-    cmd_id_str = cmd_id_get(cmd_str)
-    pser.write(binascii.a2b_hex(cmd_str))
-    cs_info = ''
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}[0-9a-fA-F]{8}" + cmd_id_str + r"(\w{2})+?4040")
+def response_data_get(r_frame):
+    return r_frame.payload[6:]
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            logger_p.debug("cmd_send receive return info: %s" % m_tt.group(0))
-            raw_data_str = m_tt.group(0).decode("hex")
-            info_q.put(raw_data_str[32:-2])
-            return Err_ok
 
-        if not to_queue.empty():
-            info_q.put(Err_timeout)
-            return Err_timeout
+def command_spec_request(pser, cmd_name, *param):
+    cmd_spec = DictCommandSpec[cmd_name]
+    return command_request(pser, cmd_spec.build(*param), cmd_spec.rsp_cmd_id)
 
 
-def command_line_build(cli_data_field_str):
-    str_head = r"2323" + r"00" * 12
-    str_moduleid = r"03000000"
-    str_messageid = r"04000000"
-    str_tail = r"4040"
-    
-    len_total_data = len(cli_data_field_str) / 2  # length unit: byte
-    totallen_str = struct.pack('<I', len_total_data).encode("hex")
-    command_line = str_head + str_moduleid + str_messageid + totallen_str + cli_data_field_str + str_tail
-
-    return command_line
-
-
-def return_list_from_structure(struct_name, raw_data_str):
-    s = struct_name()
-    memmove(addressof(s), raw_data_str, sizeof(s))
-    return_list, return_info = [], ''
-    for e_info in s._fields_:
-        dstr = r"hex(s." + e_info[0] + r")"
-        return_info = eval(dstr)
-        return_list.append((e_info[0], return_info))
-
-    return return_list
-
-
-def command_foramt_convert(obj_value, obj_endian, obj_format):
-    if (isinstance(obj_value, int) and
-            (obj_endian in DictEndianType.keys()) and
-            (obj_format in DictStructDataFormat.keys())):
-        obj_struct = struct.pack((r"%s%s" % (obj_endian, obj_format)), obj_value).encode("hex")
-        temp_str, temp_index = '', 0
-        for each_l in obj_struct:
-            temp_index += 1
-            if 2 == temp_index:
-                temp_str += each_l + " "
-                temp_index = 0
-            else:
-                temp_str += each_l
-        return temp_str.strip()
-    else:
-        return Err_fail
+def command_spec_response_wait(pser, cmd_name, *param):
+    # one request, one response frame of the registered data length
+    cmd_spec = DictCommandSpec[cmd_name]
+    r_waiter = command_request(pser, cmd_spec.build(*param), cmd_spec.rsp_cmd_id)
+    return response_frame_wait(r_waiter, cmd_spec.rsp_data_len)
 
 
-def structure_info_parse_bytes(obj_struct_dict, raw_data_str, lb_endian):
-    structure_parameters = obj_struct_dict.keys()
-    structure_data_form = ''.join(obj_struct_dict.values())
-    parse_format = struct.Struct(lb_endian + structure_data_form)
-    parse_size = struct.calcsize(lb_endian + structure_data_form)
+@timeout_set(3)
+def cmd_send(pser, cmd_bytes, cmd_id, info_q, logger_p):
+    r_waiter = command_request(pser, cmd_bytes, cmd_id)
 
-    if parse_size == len(raw_data_str):
-        pass
-    elif parse_size < len(raw_data_str):
-        raw_data_str = raw_data_str[0: parse_size]
-    else:  # parse_size > len(raw_data_str)
-        padding_str = "00".decode("hex")
-        raw_data_str += padding_str * (parse_size - len(raw_data_str))
+    r_frame = response_frame_wait(r_waiter)
+    if Err_timeout == r_frame:
+        info_q.put(Err_timeout)
+        return Err_timeout
 
-    parse_results_list = list(parse_format.unpack(raw_data_str))
-    return_list = zip(structure_parameters, parse_results_list)
+    logger_p.debug("cmd_send receive return info: %s", log_writer.HexDump(r_frame.payload))
+    info_q.put(response_data_get(r_frame))
+    return Err_ok
 
-    return return_list
 
+def limit_check(limit_table, measure_record, logger_printer, measure_item=""):
+    # evaluate a measurement record against the board limit table, failed metrics logged, all of them stored
+    return_value = Err_ok
+    for limit_result in measurement_limits.limit_evaluate(limit_table, measure_record).itervalues():
+        results_store.measure_limit_add(limit_result, measure_item)
+        limit_info = measurement_limits.limit_result_info(limit_result, limit_table[limit_result.metric].unit)
+        if limit_result.passed:
+            logger_printer.debug(limit_info)
+        else:
+            logger_printer.info(limit_info)
+            return_value = Err_fail
+    return return_value
 
-def power_down_up(pser):
-    str_power_down = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 04 00 00 00 00 00 00 00 00 00 00 00 40 40"
-    str_power_up = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 04 00 00 00 01 00 00 00 00 00 00 00 40 40"
-    command_str_power_down = str_power_down.replace(" ", "")
-    command_str_power_up = str_power_up.replace(" ", "")
 
-    time.sleep(0.5)
+# power board commands have no response: only the power off / reset low hold is timed, the boot itself is
+# awaited by the caller polling for the boot prompt (enter_test_mode, init_send)
+def power_down_up(pser, hold_time=0.5):
     print "Chip power down..."
-    pser.write(binascii.a2b_hex(command_str_power_down))
-    time.sleep(0.5)
+    pser.write(DictCommandSpec["power_down"].build())
+    pser.flush()
+    time.sleep(hold_time)
+    dict_wait_record.setdefault("power_off_hold", []).append(hold_time)
 
     print "Chip power up..."
-    pser.write(binascii.a2b_hex(command_str_power_up))
-    time.sleep(0.5)
-
+    pser.write(DictCommandSpec["power_up"].build())
+    pser.flush()
 
-def rst_low_high(pser):
-    str_rst_low = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 04 00 00 00 04 00 00 00 00 00 00 00 40 40"
-    str_rst_high = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 04 00 00 00 03 00 00 00 00 00 00 00 40 40"
-    command_str_rst_low = str_rst_low.replace(" ", "")
-    command_str_rst_high = str_rst_high.replace(" ", "")
 
-    time.sleep(0.5)
+def rst_low_high(pser, hold_time=0.5):
     print "Chip reset low..."
-    pser.write(binascii.a2b_hex(command_str_rst_low))
-    time.sleep(0.5)
+    pser.write(DictCommandSpec["rst_low"].build())
+    pser.flush()
+    time.sleep(hold_time)
+    dict_wait_record.setdefault("reset_low_hold", []).append(hold_time)
 
     print "Chip reset high..."
-    pser.write(binascii.a2b_hex(command_str_rst_high))
-    time.sleep(0.5)
+    pser.write(DictCommandSpec["rst_high"].build())
+    pser.flush()
 
 
-@timeout_set(2, time_out_queue)
-def reg_read(pser, reg_addr, to_queue):
+@timeout_set(2)
+def reg_read(pser, reg_addr):
     if not re.match(r"0x\w{8}", reg_addr):
         print ("Error: Read Reg Address Format Illegal! Please check...")
         return Err_fail
 
-    little_endian_reg_addr = struct.pack("<I", int(reg_addr, 16)).encode("hex")
-    temp_str, temp_index = '', 0
-    for each_l in little_endian_reg_addr:
-        temp_index += 1
-        if 2 == temp_index:
-            temp_str += each_l + " "
-            temp_index = 0
-        else:
-            temp_str += each_l
-    rf_little_endian_reg_addr = temp_str.strip()
-
-    str_overstress_int_flag_read = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                                   r"03 00 00 00 02 00 00 00 0c 00 00 00 02 00 06 00 06 00 " + \
-                                   rf_little_endian_reg_addr + \
-                                   r" 04 00 40 40"
-    command_str_overstress_int_flag_read = str_overstress_int_flag_read.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_overstress_int_flag_read)
-    pser.write(binascii.a2b_hex(command_str_overstress_int_flag_read))
-    return_value, cs_info = 0, ''
-
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"04000400(\w{8})4040")
+    r_frame = command_spec_response_wait(pser, "reg_read", int(reg_addr, 16))
+    if Err_timeout == r_frame:
+        return Err_timeout
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            little_endian_hex_str = m_tt.group(1)
-            format_return_value = struct.Struct('<I')
-            unpack_tuple = format_return_value.unpack(little_endian_hex_str.decode("hex"))
-            dec_value = unpack_tuple[0]
-            bin_value_str = bin(dec_value)
-            return bin_value_str
-
-        if not to_queue.empty():
-            return Err_timeout
+    bin_value_str = bin(response_decode("reg_read", response_data_get(r_frame)).reg_value)
+    return bin_value_str
 
 
-@timeout_set(15, time_out_queue)
-def enter_test_mode(serp, ini_str, enter_str, to_queue):
+@timeout_set(15)
+def enter_test_mode(serp, ini_str, enter_str):
     s_info = ''
+    serial_dispatcher_stop(serp)  # sbl cli output is plain text, read it directly
 
     m_sbl_comp = re.compile(r"kunlun v1.0 >")
-    m_init_done_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}0c[0]{6}2c0006000600[0]{12}4040")
 
+    r_deadline = deadline_current()
     while 1:
+        if s_info:
+            step_timing.step_retry()  # no sbl prompt in the output yet
         serp.write(ini_str)
-        s_info += serp.read(1)
-        bytes2read = serp.inWaiting()
-        tmp = serp.read(bytes2read)
-        s_info += tmp
+        s_info += serial_bytes_read_deadline(serp)
 
         m_sbl = m_sbl_comp.search(s_info)
 
@@ -463,433 +668,216 @@ def enter_test_mode(serp, ini_str, enter_str, to_queue):
             s_info = s_info.replace(match_sbl_str, "")
             break
 
-    serp.write("\n")
-    serp.write(enter_str)
+        if r_deadline.expired():
+            return Err_timeout
 
+    # init done frame: cmd id 0x2c with 6 bytes zero data, bytes after the sbl prompt may hold part of it
+    r_waiter = serial_dispatcher_get(serp, s_info).request("\n" + enter_str, 0x2c, None)
     while 1:
-        s_info += serp.read(1)
-        bytes2read = serp.inWaiting()
-        tmp = serp.read(bytes2read)
-        s_info += tmp
-
-        m_init_done = m_init_done_comp.search(s_info.encode("hex"))
+        r_frame = response_frame_wait(r_waiter, 6)
+        if Err_timeout == r_frame:
+            return Err_timeout
 
-        if m_init_done:
+        if "\x00" * 6 == response_data_get(r_frame):
+            r_waiter.cancel()
             print "Test Mode Entered and Initial completes...\r\n"
             return Err_ok
 
-        if not to_queue.empty():
-            return Err_timeout
-
-
-@timeout_set(2, time_out_queue)
-def efuse_prog_bit_lock(pser, to_queue):
-    str_efuse_lock = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                     r"03 00 00 00 2d 00 00 00 06 00 00 00 2d 00 00 00 00 00 40 40"
-    command_str_efuse_lock = str_efuse_lock.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_efuse_lock)
-    pser.write(binascii.a2b_hex(command_str_efuse_lock))
-    return_str, cs_info = '', ''
-
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"01000100(\w{2})4040")
-
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
 
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            return_str = m_tt.group(1)
-            return return_str
+@timeout_set(2)
+def efuse_prog_bit_lock(pser):
+    r_frame = command_spec_response_wait(pser, "efuse_prog_bit_lock")
+    if Err_timeout == r_frame:
+        return Err_timeout
 
-        if not to_queue.empty():
-            return Err_timeout
+    return_str = binascii.b2a_hex(response_data_get(r_frame))
+    return return_str
 
 
-@timeout_set(2, time_out_queue)
-def vendor_id_set(pser, v_id_str, to_queue):
-    ascii_vid_str = binascii.b2a_hex(v_id_str)
-    if 4 == len(ascii_vid_str):
-        tmp_vid_str = ''
-        for each_l in ascii_vid_str:
-            tmp_vid_str += each_l
-            if 2 == len(tmp_vid_str):
-                tmp_vid_str += " "
-    else:
+@timeout_set(2)
+def vendor_id_set(pser, v_id_str):
+    if 2 != len(v_id_str):
         return Err_fail
-    str_vendor_id_set = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                        r"03 00 00 00 31 00 00 00 08 00 00 00 " \
-                        r"31 00 02 00 02 00 " + tmp_vid_str + r" 40 40"
-    command_str_vendor_id_set = str_vendor_id_set.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_vendor_id_set)
-    pser.write(binascii.a2b_hex(command_str_vendor_id_set))
-    return_str, cs_info = '', ''
-
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"01000100(\w{2})4040")
-
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            return_str = m_tt.group(1)
-            return return_str
-
-        if not to_queue.empty():
-            return Err_timeout
-
+    r_frame = command_spec_response_wait(pser, "vendor_id_set", v_id_str)
+    if Err_timeout == r_frame:
+        return Err_timeout
 
-@timeout_set(2, time_out_queue)
-def vendor_id_get(pser, to_queue):
-    str_vendor_id_get = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                        r"03 00 00 00 37 00 00 00 06 00 00 00 37 00 00 00 00 00 40 40"
-    command_str_vendor_id_get = str_vendor_id_get.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_vendor_id_get)
-    pser.write(binascii.a2b_hex(command_str_vendor_id_get))
-    return_str, cs_info = '', ''
+    return_str = binascii.b2a_hex(response_data_get(r_frame))
+    return return_str
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"02000200(\w{4})4040")
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
+def vendor_id_parse(r_data):
+    return r_data  # eg. 54 48 ---> TH
 
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            return_str = m_tt.group(1)
-            return return_str.decode("hex")  # eg. 54 48 ---> TH
 
-        if not to_queue.empty():
-            return Err_timeout
+def chip_code_parse(r_data):
+    return binascii.b2a_hex(r_data)
 
 
-@timeout_set(2, time_out_queue)
-def chip_code_get(pser, to_queue):
-    str_chip_code_get = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                        r"03 00 00 00 33 00 00 00 06 00 00 00 33 00 00 00 00 00 40 40"
-    command_str_chip_code_get = str_chip_code_get.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_chip_code_get)
-    pser.write(binascii.a2b_hex(command_str_chip_code_get))
-    return_str, cs_info = '', ''
+def module_type_parse(r_data):
+    return binascii.b2a_hex(r_data)
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"02000200(\w{4})4040")
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
+def chip_mmid_parse(r_data):
+    return binascii.b2a_hex(r_data[::-1])  # mmid bytes reversed
 
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            return_str = m_tt.group(1)
-            return return_str
 
-        if not to_queue.empty():
-            return Err_timeout
+def chip_info_parse(r_data):
+    chip_info_str = binascii.b2a_hex(r_data)
+    s = response_decode("chip_info_get", r_data)
+    chip_info_dict_str = (str(s.ver_wafer) + str(s.ver_reserved) + str(s.ver_pkg_bumping) +
+                          str(s.ver_pkg_lic) + str(s.ver_pkg_flash))
 
+    chip_id_str_new = "-".join(binascii.b2a_hex(each_byte) for each_byte in r_data[0:3])
 
-@timeout_set(2, time_out_queue)
-def module_type_get(pser, to_queue):
-    str_module_type_get = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                          r"03 00 00 00 30 00 00 00 06 00 00 00 30 00 00 00 00 00 40 40"
-    command_str_module_type_get = str_module_type_get.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_module_type_get)
-    pser.write(binascii.a2b_hex(command_str_module_type_get))
-    return_str, cs_info = '', ''
+    return_list = []
+    if chip_info_dict_str in DictChipInfo.keys():
+        str_chip_type = DictChipInfo[chip_info_dict_str]
+        return_list.append(("chip type", str_chip_type))
+        return_list.append(("chip id", chip_id_str_new))
+        return_list.append(("ver_wafer", "0b" + (bin(s.ver_wafer)[2:]).zfill(4)))
+        return_list.append(("ver_reserved", "0b" + (bin(s.ver_reserved)[2:]).zfill(4)))
+        return_list.append(("ver_pkg_bumping", "0b" + (bin(s.ver_pkg_bumping)[2:]).zfill(2)))
+        return_list.append(("ver_pkg_lic", "0b" + (bin(s.ver_pkg_lic)[2:]).zfill(1)))
+        return_list.append(("ver_pkg_flash", "0b" + (bin(s.ver_pkg_flash)[2:]).zfill(1)))
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"01000100(\w{2})4040")
+        return return_list
+    else:
+        print ("Chip Info Dismatched...")
+        print ("Chip Info String: %s and Chip Info ID: %s" % (chip_info_str, chip_info_dict_str))
+        return Err_fail
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
 
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            return_str = m_tt.group(1)
-            return return_str
+def fw_ver_parse(r_data):
+    return r_data
 
-        if not to_queue.empty():
-            return Err_timeout
 
+def mac_addr_parse(r_data):
+    return ":".join(binascii.b2a_hex(each_byte) for each_byte in r_data)
 
-@timeout_set(2, time_out_queue)
-def chip_mmid_get(pser, to_queue):
-    str_chip_mmid_get = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                        r"03 00 00 00 38 00 00 00 06 00 00 00 38 00 00 00 00 00 40 40"
-    command_str_chip_mmid_get = str_chip_mmid_get.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_chip_mmid_get)
-    pser.write(binascii.a2b_hex(command_str_chip_mmid_get))
-    return_str, cs_info, tmp_str, return_list = '', '', '', []
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"18001800(\w{48})4040")
+# id info name -> (command name, response data parser)
+DictIdInfoCommand = collections.OrderedDict()
+DictIdInfoCommand["vendor_id"] = ("vendor_id_get", vendor_id_parse)
+DictIdInfoCommand["chip_code"] = ("chip_code_get", chip_code_parse)
+DictIdInfoCommand["module_type"] = ("module_type_get", module_type_parse)
+DictIdInfoCommand["chip_mmid"] = ("chip_mmid_get", chip_mmid_parse)
+DictIdInfoCommand["chip_info"] = ("chip_info_get", chip_info_parse)
+DictIdInfoCommand["fw_ver"] = ("fw_ver_get", fw_ver_parse)
+DictIdInfoCommand["mac_addr"] = ("mac_addr_get", mac_addr_parse)
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            return_str = m_tt.group(1)
-            for each_letter in return_str:
-                tmp_str += each_letter
-                if 2 == len(tmp_str):
-                    return_list.append(tmp_str)
-                    tmp_str = ''
-            return_list.reverse()
-            return "".join(return_list)
-
-        if not to_queue.empty():
-            return Err_timeout
 
+def id_info_read(pser, info_name):
+    cmd_name, parse_func = DictIdInfoCommand[info_name]
+    r_frame = command_spec_response_wait(pser, cmd_name)
+    if Err_timeout == r_frame:
+        return Err_timeout
 
-@timeout_set(2, time_out_queue)
-def read_chip_info(pser, to_queue):
-    str_read_chip_id = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                               r"03 00 00 00 25 00 00 00 06 00 00 00 25 00 00 00 00 00 40 40"
-    command_str_read_chip_id = str_read_chip_id.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_read_chip_id)
-    pser.write(binascii.a2b_hex(command_str_read_chip_id))
-    return_list, cs_info = [], ''
+    return parse_func(response_data_get(r_frame))
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"05000500(\w{10})4040")
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            chip_info_str = m_tt.group(1)
-            raw_data_str = chip_info_str.decode("hex")
-            s = _chip_info()
-            memmove(addressof(s), raw_data_str, sizeof(s))
-            chip_info_dict_str = (str(s.ver_wafer) + str(s.ver_reserved) + str(s.ver_pkg_bumping) +
-                                  str(s.ver_pkg_lic) + str(s.ver_pkg_flash))
-
-            cid_str = m_tt.group(1)[0:6]
-            chip_id_str_new, letter_index = '', 0
-            for each_letter in cid_str:
-                chip_id_str_new += each_letter
-                letter_index += 1
-                if letter_index == 2:
-                    chip_id_str_new += "-"
-                    letter_index = 0
-
-            if chip_info_dict_str in DictChipInfo.keys():
-                str_chip_type = DictChipInfo[chip_info_dict_str]
-                return_list.append(("chip type", str_chip_type))
-                return_list.append(("chip id", chip_id_str_new[0:-1]))
-                return_list.append(("ver_wafer", "0b" + (bin(s.ver_wafer)[2:]).zfill(4)))
-                return_list.append(("ver_reserved", "0b" + (bin(s.ver_reserved)[2:]).zfill(4)))
-                return_list.append(("ver_pkg_bumping", "0b" + (bin(s.ver_pkg_bumping)[2:]).zfill(2)))
-                return_list.append(("ver_pkg_lic", "0b" + (bin(s.ver_pkg_lic)[2:]).zfill(1)))
-                return_list.append(("ver_pkg_flash", "0b" + (bin(s.ver_pkg_flash)[2:]).zfill(1)))
+@timeout_set(2)
+def id_info_batch_read(pser, info_name_list):
+    # all request frames go out in one write, responses are collected as they come back
+    cmd_spec_list = [DictCommandSpec[DictIdInfoCommand[each_name][0]] for each_name in info_name_list]
+    waiter_list = serial_dispatcher_get(pser).request_batch([(each_spec.build(), each_spec.rsp_cmd_id)
+                                                             for each_spec in cmd_spec_list])
 
-                return return_list
-            else:
-                print ("Chip Info Dismatched...")
-                print ("Chip Info String: %s and Chip Info ID: %s" % (chip_info_str, chip_info_dict_str))
-                return Err_fail
+    return_dict = collections.OrderedDict()
+    for each_name, each_spec, r_waiter in zip(info_name_list, cmd_spec_list, waiter_list):
+        parse_func = DictIdInfoCommand[each_name][1]
+        r_frame = response_frame_wait(r_waiter, each_spec.rsp_data_len)
+        if Err_timeout == r_frame:
+            return_dict[each_name] = Err_timeout
+        else:
+            return_dict[each_name] = parse_func(response_data_get(r_frame))
 
-        if not to_queue.empty():
-            return Err_timeout
+    return return_dict
 
 
-@timeout_set(2, time_out_queue)
-def read_fw_ver(pser, to_queue):
-    str_read_chip_id = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                       r"03 00 00 00 26 00 00 00 06 00 00 00 26 00 00 00 00 00 40 40"
-    command_str_read_chip_id = str_read_chip_id.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_read_chip_id)
-    pser.write(binascii.a2b_hex(command_str_read_chip_id))
-    return_str, cs_info = '', ''
+@timeout_set(2)
+def vendor_id_get(pser):
+    return id_info_read(pser, "vendor_id")
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"\w{4}\w{4}((\w{2})+?)4040")
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
+@timeout_set(2)
+def chip_code_get(pser):
+    return id_info_read(pser, "chip_code")
 
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            fw_ver_str = m_tt.group(1)
-            return fw_ver_str.decode("hex")
 
-        if not to_queue.empty():
-            return Err_timeout
+@timeout_set(2)
+def module_type_get(pser):
+    return id_info_read(pser, "module_type")
 
 
-@timeout_set(2, time_out_queue)
-def mac_addr_burn(pser, str_mac_addr, to_queue):
-    str_burn_mac_addr_base = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                             r"03 00 00 00 27 00 00 00 0c 00 00 00 27 00 06 00 06 00 "
-    burn_mac_addr_command_str = (str_burn_mac_addr_base + str_mac_addr.replace(":", " ") + r" 40 40").replace(" ", "")
-    cmd_id_str = cmd_id_get(burn_mac_addr_command_str)
-    pser.write(binascii.a2b_hex(burn_mac_addr_command_str))
-    cs_info = ''
+@timeout_set(2)
+def chip_mmid_get(pser):
+    return id_info_read(pser, "chip_mmid")
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"06000600(\w{12})4040")
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
+@timeout_set(2)
+def read_fw_ver(pser):
+    return id_info_read(pser, "fw_ver")
 
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            return str_mac_addr
 
-        if not to_queue.empty():
-            return Err_timeout
+@timeout_set(2)
+def mac_addr_burn(pser, str_mac_addr):
+    r_frame = command_spec_response_wait(pser, "mac_addr_burn", binascii.a2b_hex(str_mac_addr.replace(":", "")))
+    if Err_timeout == r_frame:
+        return Err_timeout
 
+    return str_mac_addr
 
-@timeout_set(2, time_out_queue)
-def mac_addr_read(pser, to_queue):
-    str_read_mac_addr = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                        r"03 00 00 00 2b 00 00 00 06 00 00 00 2b 00 00 00 00 00 40 40"
-    command_str_read_mac_addr = str_read_mac_addr.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_read_mac_addr)
-    pser.write(binascii.a2b_hex(command_str_read_mac_addr))
-    return_str, cs_info, letter_index = '', '', 0
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"06000600(\w{12})4040")
+@timeout_set(2)
+def mac_addr_read(pser):
+    return id_info_read(pser, "mac_addr")
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            return_mac_addr_str = m_tt.group(1)
-            for each_l in return_mac_addr_str:
-                letter_index += 1
-                return_str += each_l
-                if letter_index == 2:
-                    return_str += ":"
-                    letter_index = 0
-            return return_str[0:-1]
-
-        if not to_queue.empty():
-            return Err_timeout
 
+@timeout_set(2)
+def calc_noise_floor(pser):
+    r_frame = command_spec_response_wait(pser, "noise_floor_scan")
+    if Err_timeout == r_frame:
+        return Err_timeout
 
-@timeout_set(2, time_out_queue)
-def calc_noise_floor(pser, to_queue):
-    str_scan_nf = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                  r"03 00 00 00 0a 00 00 00 08 00 00 00 0a 00 02 00 02 00 08 0e 40 40"
-    command_str_scan_nf = str_scan_nf.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_scan_nf)
-    pser.write(binascii.a2b_hex(command_str_scan_nf))
-    cs_info = ''
+    dec_nf_value = ord(response_data_get(r_frame))
+    return dec_nf_value
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"01000100(\w{2})4040")
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            str_nf_value = m_tt.group(1)
-            dec_nf_value = int("0x" + str_nf_value, 16)
-            return dec_nf_value
-
-        if not to_queue.empty():
-            return Err_timeout
+def noise_floor_sample(pser, wait_max):
+    # scanned again right away while the value is not valid yet (0), up to wait_max
+    nf_value_list = []
 
+    def nf_value_probe():
+        nf_value_list.append(calc_noise_floor(pser))
+        return 0 != nf_value_list[-1]
+    ready_wait("noise_floor_sample", nf_value_probe, wait_max)
+    return nf_value_list[-1] if nf_value_list else Err_timeout
 
-@timeout_set(2, time_out_queue)
-def global_nid_set(pser, obj_nid, to_queue):
-    obj_nid_parameter_str = struct.pack("<B", obj_nid).encode("hex")
-    str_glb_nid = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                  r"03 00 00 00 35 00 00 00 07 00 00 00 35 00 01 00 01 00 " + obj_nid_parameter_str + r" 40 40"
-    command_str_glb_nid = str_glb_nid.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_glb_nid)
-    pser.write(binascii.a2b_hex(command_str_glb_nid))
-    cs_info = ''
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"01000100(\w{2})4040")
+@timeout_set(2)
+def global_nid_set(pser, obj_nid):
+    r_frame = command_spec_response_wait(pser, "global_nid_set", obj_nid)
+    if Err_timeout == r_frame:
+        return Err_timeout
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            str_nid_value = m_tt.group(1)
-            dec_nid_value = int("0x" + str_nid_value, 16)
-            return dec_nid_value
-
-        if not to_queue.empty():
-            return Err_timeout
+    dec_nid_value = ord(response_data_get(r_frame))
+    return dec_nid_value
 
 
-def data_matplot_diagram(data_list, x_name, y_name, s_label, gpio_cnt, s_phase, test_loop_cnt, f_log):
-    dict_line_shape = {
-        "A": 'b-',
-        "B": 'r--',
-        "C": 'c-.'
-    }
-    pic_folder = f_log + r".\rx_filter_spectrogram"
-    if not os.path.exists(pic_folder):
-        os.makedirs(pic_folder)
-
-    x_lim_start = data_list[-4]
-    x_lim_end = data_list[-3]
-    real_data_list = data_list[0:-4]
-    data_x = np.array(range(x_lim_start, x_lim_end + 1))
-    data_y = np.array(real_data_list)
-
-    pic_num = (test_loop_cnt << 1) + gpio_cnt
-    plt.figure(num=pic_num, figsize=(10, 10), dpi=150)
-    plt.xlabel(x_name)
-    plt.ylabel(y_name)
-    # plt.xlim(x_lim_start, y_lim_start)
-    plt.ylim(0, 100)
-    title_name = 'CSI Flatness Dump Spectrogram'
-    pic_legend_str = "Channel: %s | Max : %s , Min : %s , Var : %s " % \
-                     (s_phase, str(max(data_y)), str(min(data_y)), str(np.var(data_y)))
-    plt.title(title_name)
-    plt.plot(data_x, data_y, dict_line_shape[s_phase], label=pic_legend_str)
-    plt.legend(loc='upper left')
-    plt.grid()
-    plt.savefig(pic_folder + "\\" + r"csi_dump_" + s_label + "_" + r"_GPIO_" + str(gpio_cnt) + r".png")
-
-    return_var = np.var(data_y)
-    del data_x, data_y
-    
-    return return_var
+def data_matplot_diagram(amp_array, x_lim_start, x_lim_end, s_label, gpio_cnt, s_phase, f_log):
+    # drawn later by the background renderer, phases of one gpio status share a picture
+    pic_path = spectrogram_render.spectrogram_picture_path(f_log, s_label, gpio_cnt)
+    spectrogram_render.spectrogram_curve_add(pic_path, s_phase, x_lim_start, x_lim_end, amp_array)
+    return np.var(amp_array)
 
 
 def phase_filter_gpio_control(pser, switch_flag, fgpio_num, logger_printer):
     # GPIO STA: 23 / IIC: 28 / CCO: 2
     if switch_flag:
-        return_gpio_set = gpio_level_set(pser, fgpio_num, 1, time_out_queue)
+        return_gpio_set = gpio_level_set(pser, fgpio_num, 1)
     else:
-        return_gpio_set = gpio_level_set(pser, fgpio_num, 0, time_out_queue)
+        return_gpio_set = gpio_level_set(pser, fgpio_num, 0)
 
     if not return_gpio_set:
         logger_info = r"GPIO %d set level %d successfully" % (fgpio_num, switch_flag)
@@ -901,18 +889,35 @@ def phase_filter_gpio_control(pser, switch_flag, fgpio_num, logger_printer):
         return Err_fail
 
 
+# flatness responses, unpacked for every received frame
+CsiBatchInfoShort = struct.Struct("<3B")  # start tone, end tone, gain entry
+CsiBatchInfo = struct.Struct("<4H")  # start tone, end tone, gain entry, packet info
+CsiLastBatchInfo = struct.Struct("<HHHh")  # packet info of the last packet is signed
+SpurInfo = struct.Struct("<10H")  # spur info: uint16 x 10, [1] spur count, [2:] spur tones
+
+
+def csi_amplitude_calc(csi_iq_bytes):
+    # csi dump: int16 I, int16 Q per tone, amplitude 10 * log10(I^2 + Q^2) in db, 0 for I == Q == 0
+    csi_iq = np.frombuffer(csi_iq_bytes, dtype='<i2').reshape(-1, 2)
+    csi_iq_f = csi_iq.astype(np.float64)  # int16 squares overflow
+    csi_power = np.einsum('ij,ij->i', csi_iq_f, csi_iq_f)
+    csi_amp = np.zeros(csi_power.shape)
+    np.log10(csi_power, out=csi_amp, where=csi_power > 0)
+    csi_amp *= 10
+    return csi_amp
+
+
 def csi_dump_data_collect(pdata_msg):
     global dump_data_str
     global cur_gain_cnt
     global first_cur_gain
 
     if 3 == len(pdata_msg):
-        csi_batch_info_len, fmt_csi_batch_info = 3, "3B"
+        fs_csi_batch_info = CsiBatchInfoShort
     else:
-        csi_batch_info_len, fmt_csi_batch_info = 8, "4H"
-    csi_batch_info_str = pdata_msg[-csi_batch_info_len:]
-    csi_dump_data_str = pdata_msg[0:-csi_batch_info_len]
-    fs_csi_batch_info = struct.Struct('<' + fmt_csi_batch_info)
+        fs_csi_batch_info = CsiBatchInfo
+    csi_batch_info_str = pdata_msg[-fs_csi_batch_info.size:]
+    csi_dump_data_str = pdata_msg[0:-fs_csi_batch_info.size]
     csi_batch_info = (fs_csi_batch_info.unpack(csi_batch_info_str))
     start_tone_num = csi_batch_info[0]
     end_tone_num = csi_batch_info[1]
@@ -934,285 +939,180 @@ def csi_dump_data_collect(pdata_msg):
         return return_str
 
 
-def filter_data_recalculation(obj_value_list, obj_remove_tone_list, obj_tone_start, obj_tone_end, obj_func_name):
-    return_val = None
-    tmp_remain_tone_index_list, tmp_calculate_data_list = [], []
-    tmp_cur_tone_list = list(range(obj_tone_start, obj_tone_end))
+def spur_tone_mask_build(tone_array, spur_tone_list, remove_tone_cnt):
+    # True: tone used for calculation, False: within remove_tone_cnt tones of a spur
+    if not len(spur_tone_list):
+        return np.ones(tone_array.shape, dtype=bool)
+    spur_array = np.asarray(spur_tone_list)
+    return np.abs(tone_array[:, np.newaxis] - spur_array[np.newaxis, :]).min(axis=1) > remove_tone_cnt
 
-    for each_tone in tmp_cur_tone_list:
-        if each_tone in obj_remove_tone_list:
-            pass
-        else:
-            tmp_remain_tone_index_list.append(each_tone - obj_tone_start)
 
-    if len(tmp_remain_tone_index_list):
-        for each_remain_index in tmp_remain_tone_index_list:
-            tmp_calculate_data_list.append(obj_value_list[each_remain_index])
-    else:
-        tmp_calculate_data_list = obj_value_list
+def filter_data_recalculation(amp_array, tone_array, keep_mask, dict_band=DictFlatnessBand):
+    # all bands in one pass: (bands, tones) mask matrix, band without any tone kept falls back to all its tones
+    band_start = np.array([tone_range[0] for tone_range in dict_band.values()])[:, np.newaxis]
+    band_end = np.array([tone_range[1] for tone_range in dict_band.values()])[:, np.newaxis]
+    band_mask = (tone_array >= band_start) & (tone_array <= band_end)
+    calc_mask = band_mask & keep_mask
+    empty_band = ~calc_mask.any(axis=1)
+    calc_mask[empty_band] = band_mask[empty_band]
 
-    if "avg" == obj_func_name:
-        return_val = sum(tmp_calculate_data_list) / float(len(tmp_calculate_data_list))
-    elif "var" == obj_func_name:
-        return_val = np.var(np.array(tmp_calculate_data_list))
-    else:
-        pass
+    calc_weight = calc_mask.astype(np.float64)
+    calc_cnt = calc_weight.sum(axis=1)
+    band_avg = calc_weight.dot(amp_array) / calc_cnt
+    band_var = calc_weight.dot(amp_array * amp_array) / calc_cnt - band_avg * band_avg
 
-    return return_val
+    dict_band_result = collections.OrderedDict()
+    for band_index, band_name in enumerate(dict_band.keys()):
+        tone_start, tone_end = dict_band[band_name]
+        dict_band_result[band_name] = FlatnessBandResult(tone_start, tone_end, band_avg[band_index],
+                                                         max(band_var[band_index], 0.0), int(calc_cnt[band_index]))
+    return dict_band_result
 
 
-def filter_data_inspection(obj_data_list, obj_x_start, obj_x_end,
-                           obj_gpio_value, obj_cur_spur_cnt, obj_cur_spur_list, obj_logger_printer):
+def filter_data_inspection(obj_data_array, obj_x_start, obj_x_end,
+                           obj_gpio_value, obj_cur_spur_cnt, obj_cur_spur_list, obj_logger_printer,
+                           obj_spur_max_limit_cnt, obj_spur_remove_tone_cnt, obj_dict_band=DictFlatnessBand):
     global dict_filter_data_info
 
-    spur_tone_list, all_remove_tone_list = [], []
-
-    real_y_axis_data_list = obj_data_list
-    read_x_axis_data_list = range(obj_x_start, obj_x_end + 1)
+    spur_tone_list = []
+    tone_array = np.arange(obj_x_start, obj_x_end + 1)
 
-    if len(read_x_axis_data_list) == len(real_y_axis_data_list):
+    if len(tone_array) == len(obj_data_array):
         pass
     else:
         obj_logger_printer.info(r"Error: Fileter(Csi Dump) Data length mismatched, please check...")
         return Err_fail
 
-    # 9 tones: 32...40
-    y_axis_value_list_32_40 = real_y_axis_data_list[0:9]
-    # 39 tones: 41...79
-    y_axis_value_list_40_80 = real_y_axis_data_list[9:48]
-    # 41 tones: 80...120
-    y_axis_value_list_80_120 = real_y_axis_data_list[48:]
-
-    avg_32_40 = sum(y_axis_value_list_32_40) / float(len(y_axis_value_list_32_40))
-    avg_40_80 = sum(y_axis_value_list_40_80) / float(len(y_axis_value_list_40_80))
-    avg_80_120 = sum(y_axis_value_list_80_120) / float(len(y_axis_value_list_80_120))
-    var_80_120 = np.var(np.array(y_axis_value_list_80_120))
-
     # check spur tone, must be in range start tone and end tone
     if 0 == obj_cur_spur_cnt:
         pass
-    elif 0 < obj_cur_spur_cnt <= spur_max_limit_cnt:
+    elif 0 < obj_cur_spur_cnt <= obj_spur_max_limit_cnt:
         for each_spur_tone in obj_cur_spur_list:
             if obj_x_start <= each_spur_tone <= obj_x_end:
                 spur_tone_list.append(each_spur_tone)
     else:
         obj_logger_printer.info("Error: Spur detected %s tones position more than thd %d tones range, please check." %
-                                (obj_cur_spur_cnt, spur_max_limit_cnt))
+                                (obj_cur_spur_cnt, obj_spur_max_limit_cnt))
         return Err_fail
 
     # remove spur tone for calculation
     spur_tone_list.sort()
+    keep_mask = spur_tone_mask_build(tone_array, spur_tone_list, obj_spur_remove_tone_cnt)
     if len(spur_tone_list):
         obj_logger_printer.info("Spur detected %d tone range at: %s." % (len(spur_tone_list), str(spur_tone_list)))
+        obj_logger_printer.info("Auto remove tone num: %s." % str(tone_array[~keep_mask].tolist()))
+
+    dict_band_result = filter_data_recalculation(obj_data_array, tone_array, keep_mask, obj_dict_band)
 
-        for each_remove_tone in spur_tone_list:
-            all_remove_tone_list.extend(range(each_remove_tone - spur_remove_tone_cnt,
-                                              each_remove_tone + spur_remove_tone_cnt + 1))
-        uniq_all_remove_tone_list = list(set(all_remove_tone_list))
-        uniq_all_remove_tone_list.sort()
-        obj_logger_printer.info("Auto remove tone num: %s." % str(uniq_all_remove_tone_list))
-
-        # re-calculate data
-        # parameters range number is [x, y]: including x without y
-        avg_32_40 = filter_data_recalculation(y_axis_value_list_32_40, uniq_all_remove_tone_list, 32, 41, "avg")
-        avg_40_80 = filter_data_recalculation(y_axis_value_list_40_80, uniq_all_remove_tone_list, 41, 80, "avg")
-        avg_80_120 = filter_data_recalculation(y_axis_value_list_80_120, uniq_all_remove_tone_list, 80, 121, "avg")
-        var_80_120 = filter_data_recalculation(y_axis_value_list_80_120, uniq_all_remove_tone_list, 80, 121, "var")
-
-    obj_logger_printer.info(r"var_80_120: %f." % var_80_120)
-    obj_logger_printer.info(r"avg_32_40: %f, avg_40_80: %f, avg_80_120: %f." % (avg_32_40, avg_40_80, avg_80_120))
-    dict_filter_data_info[obj_gpio_value] = (var_80_120, avg_32_40, avg_40_80, avg_80_120)
+    for band_name, band_result in dict_band_result.items():
+        obj_logger_printer.info(r"band %s (tone %d-%d): avg %f, var %f, %d tones." %
+                                (band_name, band_result.tone_start, band_result.tone_end,
+                                 band_result.avg, band_result.var, band_result.calc_tone_cnt))
+    dict_filter_data_info[obj_gpio_value] = dict_band_result
     return Err_ok
 
 
-@timeout_set(5, time_out_queue)
-def flatness_test(pser, phase_s, p_str, label_str, v_gpio,
-                  logger_printer, loop_cnt, to_queue, log_fold):
-    global first_cur_gain
-    str_tx_psg_sof_3_a = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                         r"03 00 00 00 04 00 00 00 0f 00 00 00 04 00 09 00 09 00 " + \
-                         p_str + r" 10 01 00 03 00 00 00 10 40 40"
-    command_str_tx_psg_sof_3_a = str_tx_psg_sof_3_a.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_tx_psg_sof_3_a)
-    pser.write(binascii.a2b_hex(command_str_tx_psg_sof_3_a))
-    return_list, cs_info = [], ''
+@timeout_set(5)
+def flatness_test(pser, phase_s, p_num, label_str, v_gpio,
+                  logger_printer, log_fold, board_config):
+    cmd_spec = DictCommandSpec["dtest_flatness"]
+    r_waiter = command_request(pser, cmd_spec.build(p_num), cmd_spec.rsp_cmd_id, None)
+    return_list = []
     cur_spur_cnt, cur_spur_list = 0, []
 
-    m_spur_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"14001400(\w{40})4040")
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"\w{4}\w{4}((\w{2})+?)4040")
+    try:
+        while 1:
+            r_frame = response_frame_wait(r_waiter)
+            if Err_timeout == r_frame:
+                return Err_timeout
+            if 3 != r_frame.module_id:
+                continue
+
+            rid, tlen, dlen = CommandDataHead.unpack_from(r_frame.payload)
+            data_msg = response_data_get(r_frame)
+
+            if SpurInfo.size == tlen == dlen:
+                undata_spur = SpurInfo.unpack(data_msg)
+                cur_spur_cnt = undata_spur[1]
+                cur_spur_list = list(undata_spur[2:])
+                if cur_spur_cnt:
+                    logger_printer.info("Spur detected, cnt: %d, pos: %s..." % (cur_spur_cnt, str(cur_spur_list)))
+                else:
+                    logger_printer.info("No spur detected...")
+                continue
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_spur = m_spur_comp.search(cs_info.encode("hex"))
-        if m_spur:
-            spur_data_raw_info = m_spur.group(1)
-            spur_data_info = spur_data_raw_info.decode("hex")
-            data_fmt = '10H'
-            ss = struct.Struct(data_fmt)
-            undata_spur = ss.unpack(spur_data_info)
-            cur_spur_cnt = undata_spur[1]
-            cur_spur_list = list(undata_spur[2:])
-            if cur_spur_cnt:
-                logger_printer.info("Spur detected, cnt: %d, pos: %s..." % (cur_spur_cnt, str(cur_spur_list)))
-            else:
-                logger_printer.info("No spur detected...")
-
-            cs_info = cs_info.replace(m_spur.group(0).decode("hex"), "")
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            qinfo = m_tt.group(0)
-            sinfo = qinfo.decode("hex")
-            total_data = sinfo[2:-2]
-            head_fmt = '6B6B2H2I'  # 24
-            len_head_fmt = struct.calcsize(head_fmt)
-            data_head = total_data[0:len_head_fmt]
-            ss = struct.Struct(head_fmt)
-            undata_head = ss.unpack(data_head)
-            # (addr_1, addr_2, addr_3, addr_4, addr_5, addr_6, addr_1, addr_2, addr_3, addr_4, addr_5, addr_6,
-            #  module_id, crc_2bytes, message_id, length)
-
-            r_module_id = undata_head[-4]
-            r_msg_id = undata_head[-2]
-            if (r_module_id == 3 and r_msg_id == 1):
-                r_msg_len = undata_head[-1]
-                data_msg = total_data[-r_msg_len:]
-
-                base_msg = data_msg[0:6]
-                b_fmt = struct.Struct('<HHH')
-                r_base_msg = b_fmt.unpack(base_msg)
-                rid = r_base_msg[0]
-                tlen = r_base_msg[1]
-                dlen = r_base_msg[2]
-
-                if (rid == 0x04 and tlen == dlen):
-                    try:
-                        pure_data_msg = data_msg[6:]
-                        csi_data_collect_return_str = csi_dump_data_collect(pure_data_msg)
-                        if Err_fail == csi_data_collect_return_str:
-                            logger_printer.info(r"Collecting CSI Dump Data Error, please check...")
-                            return Err_fail
-                        elif not csi_data_collect_return_str:
-                            logger_printer.info("Collecting CSI Dump Data, please wait...")
-                            cs_info = cs_info.replace(m_tt.group(0).decode("hex"), "")
-                            continue
-                        else:
-                            logger_printer.info("Collecting CSI Dump Data Completes...")
-                            csi_dump_data_str_len = len(csi_data_collect_return_str)
-                            fmt_scan_csi = str(csi_dump_data_str_len / 2) + 'H'
-                            fs_scan_csi = struct.Struct('<' + fmt_scan_csi)
-                            undata_msg = fs_scan_csi.unpack(csi_data_collect_return_str)
-                            csi_dump_info_i, csi_dump_info_q, csi_dump_info_amp_avg, i_index = 0, 0, 0, 0
-                            csi_dump_amp_avg_info_list = []
-                            while 1:
-                                csi_dump_info_i = c_int16(undata_msg[i_index]).value  # signed number
-                                i_index += 1
-                                csi_dump_info_q = c_int16(undata_msg[i_index]).value  # signed number
-                                i_index += 1
-                                if csi_dump_info_i == csi_dump_info_q == 0:
-                                    csi_dump_info_amp_avg = 0
-                                else:
-                                    csi_dump_info_amp_avg = 10 * math.log10(csi_dump_info_i ** 2 +
-                                                                            csi_dump_info_q ** 2)
-
-                                csi_dump_amp_avg_info_list.append(csi_dump_info_amp_avg)
-                                if i_index == len(undata_msg) - 4:
-                                    csi_dump_amp_avg_info_list.append(undata_msg[-4])  # start tone
-                                    csi_dump_amp_avg_info_list.append(undata_msg[-3])  # end tone
-                                    csi_dump_amp_avg_info_list.append(first_cur_gain)  # gain value
-                                    csi_dump_amp_avg_info_list.append(c_int16(undata_msg[-1]).value)  # packet info
-                                    return_list.append(c_int16(undata_msg[-1]).value)
-                                    break
-
-                        return_filter_check_value = filter_data_inspection(csi_dump_amp_avg_info_list[0: -4],
-                                                                           undata_msg[-4],
-                                                                           undata_msg[-3],
-                                                                           v_gpio,
-                                                                           cur_spur_cnt, cur_spur_list,
-                                                                           logger_printer)
-
-                        var_dump_value = data_matplot_diagram(csi_dump_amp_avg_info_list,
-                                                              "Tone_number", "Amp_avg(db)",
-                                                              label_str, v_gpio, phase_s, loop_cnt, log_fold)
-                        return_list.append(var_dump_value)
-                        logger_printer.info("Matplot complete, please check the diagram!")
-
-                        if Err_fail == return_filter_check_value:
-                            logger_printer.info("Error: Csi Dump Data Inspection Failed...")
-                            return Err_fail
-
-                        return return_list
-                    except Exception, e:
-                        print str(e)
-                        print ("Error in flatness detection, skip this test!")
-                        return Err_fail
+            if tlen != dlen:
+                continue
 
-        if not to_queue.empty():
-            return Err_timeout
+            try:
+                csi_data_collect_return_str = csi_dump_data_collect(data_msg)
+                if Err_fail == csi_data_collect_return_str:
+                    logger_printer.info(r"Collecting CSI Dump Data Error, please check...")
+                    return Err_fail
+                elif not csi_data_collect_return_str:
+                    logger_printer.info("Collecting CSI Dump Data, please wait...")
+                    continue
+                else:
+                    logger_printer.info("Collecting CSI Dump Data Completes...")
+                    # last packet batch info: start tone, end tone, gain, packet info(int16)
+                    csi_start_tone, csi_end_tone, csi_gain, csi_packet_info = \
+                        CsiLastBatchInfo.unpack(csi_data_collect_return_str[-CsiLastBatchInfo.size:])
+                    csi_iq_bytes = csi_data_collect_return_str[:-CsiLastBatchInfo.size]
+                    csi_amp_array = csi_amplitude_calc(csi_iq_bytes)
+                    return_list.append(csi_packet_info)
+
+                return_filter_check_value = filter_data_inspection(csi_amp_array,
+                                                                   csi_start_tone,
+                                                                   csi_end_tone,
+                                                                   v_gpio,
+                                                                   cur_spur_cnt, cur_spur_list,
+                                                                   logger_printer,
+                                                                   board_config.spur_max_limit_cnt,
+                                                                   board_config.spur_remove_tone_cnt)
+
+                if board_config.csi_raw_data_mode:  # raw data only, render offline with csi_dump_record.py
+                    csi_dump_record.csi_record_append(phase_s, v_gpio, csi_start_tone, csi_end_tone,
+                                                      first_cur_gain, csi_packet_info, csi_iq_bytes)
+                    var_dump_value = np.var(csi_amp_array)
+                    logger_printer.info("Csi dump data recorded.")
+                else:
+                    var_dump_value = data_matplot_diagram(csi_amp_array, csi_start_tone, csi_end_tone,
+                                                          label_str, v_gpio, phase_s, log_fold)
+                    logger_printer.info("Spectrogram queued, it is saved at the end of the board test.")
+                return_list.append(var_dump_value)
 
+                if Err_fail == return_filter_check_value:
+                    logger_printer.info("Error: Csi Dump Data Inspection Failed...")
+                    return Err_fail
 
-@timeout_set(4, time_out_queue)
-def sen_csr_detection(pser, p_str, tmi_num, pwr_att, to_queue):
-    hex_tmi = (struct.pack('<B', tmi_num)).encode("hex")
-    hex_pwr_att = (struct.pack('<B', pwr_att)).encode("hex")
-    str_sen_csr = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                  r"03 00 00 00 04 00 00 00 10 00 00 00 04 00 0a 00 0a 00 " + \
-                  p_str + r" 10 01 00 04 00 00 00 " + hex_tmi + " " + hex_pwr_att + r" 40 40"
-    command_str_sen_csr = str_sen_csr.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_sen_csr)
-    pser.write(binascii.a2b_hex(command_str_sen_csr))
-    return_value, cs_info = 0, ''
+                return return_list
+            except Exception, e:
+                print str(e)
+                print ("Error in flatness detection, skip this test!")
+                return Err_fail
+    finally:
+        r_waiter.cancel()  # stop routing csi dump packets to this call
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"01000100(\w{2})4040")
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            hex_str = r"0x" + m_tt.group(1)
-            return_value = int(hex_str, 16)
-            return return_value
-
-        if not to_queue.empty():
-            return Err_timeout
+@timeout_set(4)
+def sen_csr_detection(pser, p_num, tmi_num, pwr_att):
+    r_frame = command_spec_response_wait(pser, "dtest_sen_csr", p_num, tmi_num, pwr_att)
+    if Err_timeout == r_frame:
+        return Err_timeout
 
+    return_value = ord(response_data_get(r_frame))
+    return return_value
 
-@timeout_set(4, time_out_queue)
-def txrx_process(p_str, dt_queue, g_ppm, logger_printer, to_queue):
-    global tx_power_threshold
-    global rx_rssi_threshold
-    global dut_real_ppm_max
-    global dut_real_ppm_min
-    global rx_snr_threshold
-
-    # golden ppm(int16_t) format: parameter
-    little_endian_g_ppm = struct.pack("<h", g_ppm).encode("hex")
-    temp_str, temp_index = '', 0
-    for each_l in little_endian_g_ppm:
-        temp_index += 1
-        if 2 == temp_index:
-            temp_str += each_l + " "
-            temp_index = 0
-        else:
-            temp_str += each_l
-    rf_little_endian_g_ppm = temp_str.strip()
 
-    # dtest tx psg sof 2 a/b/c 0 : data field info
-    str_cli_data_field = r"04 00 0b 00 0b 00 " + p_str + " 10 01 00 02 00 00 00 10 " + rf_little_endian_g_ppm
-    str_cli_data_field = str_cli_data_field.replace(" ", '')
-    command_str = command_line_build(str_cli_data_field)
-    logger_printer.debug("Command Line str: %s" % command_str)
+@timeout_set(4)
+def txrx_process(p_num, dt_queue, g_ppm, logger_printer, limit_table, measure_item=""):
+    # dtest tx psg sof 2 a/b/c 0 : phase, golden ppm(int16_t)
+    cmd_spec = DictCommandSpec["dtest_txrx"]
+    command_bytes = cmd_spec.build(p_num, g_ppm)
+    logger_printer.debug("Command Line str: %s", log_writer.HexDump(command_bytes))
 
-    cmd_send(ser, command_str, dt_queue, logger_printer, to_queue)
-    return_value, dut_real_ppm, tx_info_list, rd_info = 0, 0, [], None
+    cmd_send(ser, command_bytes, cmd_spec.rsp_cmd_id, dt_queue, logger_printer)
+    return_value, rd_info = 0, None
     try:
         rd_info = dt_queue.get()
         if Err_timeout == rd_info:
@@ -1220,103 +1120,52 @@ def txrx_process(p_str, dt_queue, g_ppm, logger_printer, to_queue):
             return Err_timeout
     except Exception:
         logger_printer.info("Error: Receving Data Time out, please check...")
-    tx_info_list = return_list_from_structure(_tx_rx_loopback, rd_info)
+        return Err_timeout
+    txrx_record = response_decode("dtest_txrx", rd_info)
+    for each_field in txrx_record._fields:
+        results_store.measure_add("txrx_" + each_field, getattr(txrx_record, each_field), measure_item)
 
-    if ('accurate_indication', '0xff') in tx_info_list or ('accurate_indication', '0x4') in tx_info_list:
+    if txrx_record.accurate_indication in (0xff, 0x04):
         logger_printer.info("TXRX loopback SUCCESSFUL!!")
-        tx_power_gain, tx_power_rmi, rx_power_gain, rx_power_rmi, = 0, 0, 0, 0
-        tx_power, rx_rssi, tx_ppm, rx_dc, rx_ppm, rx_snr = 0, 0, 0, 0, 0, 0
-        for each_info in tx_info_list:
-            if each_info[0] == "tx_gain":
-                tx_power_gain = int(each_info[1], 16)
-                logger_printer.info("tx_gain : %d" % (tx_power_gain - 24))
-            elif each_info[0] == "tx_adc_power":
-                tx_power_rmi = int(each_info[1], 16)
-                logger_printer.info("tx_adc_power : %d" % tx_power_rmi)
-                tx_power = tx_power_rmi - (tx_power_gain - 24)
-                logger_printer.info("tx_power : %s" % tx_power)
-            elif each_info[0] == "tx_dc":
-                tx_dc = int(each_info[1], 16)
-                logger_printer.info("tx_dc : %d" % tx_dc)
-            elif each_info[0] == "tx_ppm":
-                tx_ppm = int(each_info[1], 16)
-                logger_printer.info("tx_ppm : %d" % tx_ppm)
-            elif each_info[0] == "dut_real_ppm":
-                dut_real_ppm = int(each_info[1], 16)
-                if dut_real_ppm > 0:
-                    ppm_info = r"Faster than reference frequency!"
-                elif dut_real_ppm < 0:
-                    ppm_info = r"Slower than reference frequency!"
-                else:
-                    ppm_info = r"Match reference frequency!"
-                logger_printer.info("Dut_real_ppm: %d (%s)" % (dut_real_ppm, ppm_info))
-            elif each_info[0] == "rx_dc":
-                rx_dc = int(each_info[1], 16)
-                logger_printer.info("rx_dc : %d" % rx_dc)
-            elif each_info[0] == "reserver":
-                pass
-            elif each_info[0] == "rx_ppm":
-                pass
-                # rx_ppm = int(each_info[1], 16)
-                # logger_printer.info("rx_ppm : %d" % rx_ppm)
-            elif each_info[0] == "rx_snr":
-                rx_snr = int(each_info[1], 16)
-                logger_printer.info("rx_snr : %d" % rx_snr)
-            elif each_info[0] == "rx_gain":
-                rx_power_gain = int(each_info[1], 16)
-                logger_printer.info("rx_gain : %d" % (rx_power_gain - 24))
-            elif each_info[0] == "rx_adc_power":
-                rx_power_rmi = int(each_info[1], 16)
-                logger_printer.info("rx_adc_power : %d" % rx_power_rmi)
-                rx_rssi = rx_power_rmi - (rx_power_gain - 24)
-                logger_printer.info("rx_rssi : %s" % rx_rssi)
-            elif each_info[0] == "accurate_indication":
-                accurate_indication = each_info[1]
-                logger_printer.info("accurate_indication : %s" % accurate_indication)
-            elif each_info[0] == "w_character":
-                w_character = int(each_info[1], 16)
-                logger_printer.info("w_character : %c" % w_character)
-            elif each_info[0] == "q_character":
-                q_character = int(each_info[1], 16)
-                logger_printer.info("q_character : %c" % q_character)
-            else:
-                tmp_printer_str = each_info[0] + r" : " + str(int(each_info[1], 16))
-                logger_printer.info(tmp_printer_str)
-
-        if(tx_power < tx_power_threshold):
-            logger_printer.info("tx_power(%d) is less than %f" % (tx_power, tx_power_threshold))
-            return_value = -1
-
-        if (rx_rssi < rx_rssi_threshold):
-            logger_printer.info("rx_rssi(%d) is less than %f" % (rx_rssi, rx_rssi_threshold))
-            return_value = -1
-
-        if(dut_real_ppm > dut_real_ppm_max):
-            logger_printer.info("DUT_real_ppm(%d) is larger than %f" % (dut_real_ppm, dut_real_ppm_max))
-            return_value = -1
-        elif(dut_real_ppm < dut_real_ppm_min):
-            logger_printer.info("DUT_real_ppm(%d) is less than %f" % (dut_real_ppm, dut_real_ppm_min))
-            return_value = -1
+        logger_printer.info("w_character : %c" % txrx_record.w_character)
+        logger_printer.info("q_character : %c" % txrx_record.q_character)
+        logger_printer.info("accurate_indication : %s" % hex(txrx_record.accurate_indication))
+        logger_printer.info("tx_gain : %d" % (txrx_record.tx_gain - 24))
+        logger_printer.info("tx_adc_power : %d" % txrx_record.tx_adc_power)
+        tx_power = txrx_record.tx_adc_power - (txrx_record.tx_gain - 24)
+        logger_printer.info("tx_power : %s" % tx_power)
+        logger_printer.info("tx_dc : %d" % txrx_record.tx_dc)
+        logger_printer.info("tx_ppm : %d" % txrx_record.tx_ppm)
+        logger_printer.info("tx_snr : %d" % txrx_record.tx_snr)
+        logger_printer.info("rx_phase : %d" % txrx_record.rx_phase)
+        logger_printer.info("rx_gain : %d" % (txrx_record.rx_gain - 24))
+        logger_printer.info("rx_adc_power : %d" % txrx_record.rx_adc_power)
+        rx_rssi = txrx_record.rx_adc_power - (txrx_record.rx_gain - 24)
+        logger_printer.info("rx_rssi : %s" % rx_rssi)
+        logger_printer.info("rx_dc : %d" % txrx_record.rx_dc)
+        rx_snr = txrx_record.rx_snr
+        logger_printer.info("rx_snr : %d" % rx_snr)
+        dut_real_ppm = txrx_record.dut_real_ppm
+        if dut_real_ppm > 0:
+            ppm_info = r"Faster than reference frequency!"
+        elif dut_real_ppm < 0:
+            ppm_info = r"Slower than reference frequency!"
+        else:
+            ppm_info = r"Match reference frequency!"
+        logger_printer.info("Dut_real_ppm: %d (%s)" % (dut_real_ppm, ppm_info))
 
-        if(rx_snr < rx_snr_threshold):
-            logger_printer.info("rx_snr(%d) is less than %f" % (rx_snr, rx_snr_threshold))
+        if Err_fail == limit_check(limit_table, [("tx_power", tx_power), ("rx_rssi", rx_rssi),
+                                                 ("dut_real_ppm", dut_real_ppm), ("rx_snr", rx_snr)], logger_printer,
+                                   measure_item):
             return_value = -1
 
     else:
         logger_printer.info("TXRX loopback FAIL!")
         logger_printer.info("Response as below: ")
-        for each_tx_info in tx_info_list[0:3]:
-            logger_printer.info(each_tx_info)
-        if ('accurate_indication', '0x0') in tx_info_list:
-            logger_printer.info(r"Error: real ppm value over range!")
-        elif ('accurate_indication', '0x1') in tx_info_list:
-            logger_printer.info(r"Error: golden unit is not online!")
-        elif ('accurate_indication', '0x2') in tx_info_list:
-            logger_printer.info(r"Error: snr check failed!")
-        elif ('accurate_indication', '0x3') in tx_info_list:
-            logger_printer.info(r"Error: ppm calibration burned failed!")
-        else:
-            pass
+        for each_field in txrx_record._fields[0:3]:
+            logger_printer.info((each_field, hex(getattr(txrx_record, each_field))))
+        if txrx_record.accurate_indication in DictTxrxIndicationError:
+            logger_printer.info(DictTxrxIndicationError[txrx_record.accurate_indication])
         return_value = -1
 
     if -1 == return_value:
@@ -1327,329 +1176,150 @@ def txrx_process(p_str, dt_queue, g_ppm, logger_printer, to_queue):
     return return_value
 
 
-@timeout_set(2, time_out_queue)
-def gpio_level_set(pser, obj_gpio_num, obj_set_level, to_queue):
-    cmd_gpio_num_str = command_foramt_convert(obj_gpio_num, "<", "B")
-    cmd_set_level_str = command_foramt_convert(obj_set_level, "<", "B")
-    str_gpio_level_set = (r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 "
-                          r"03 00 00 00 21 00 00 00 08 00 00 00 21 00 02 00 02 00 %s %s 40 40" %
-                          (cmd_gpio_num_str, cmd_set_level_str))
-    command_str_gpio_level_set = str_gpio_level_set.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_gpio_level_set)
-    pser.write(binascii.a2b_hex(command_str_gpio_level_set))
-    return_value, cs_info = 0, ''
-
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"02000200%s%s4040" %
-                           (cmd_gpio_num_str, cmd_set_level_str))
+@timeout_set(2)
+def gpio_level_set(pser, obj_gpio_num, obj_set_level):
+    cmd_spec = DictCommandSpec["gpio_level_set"]
+    r_waiter = command_request(pser, cmd_spec.build(obj_gpio_num, obj_set_level), cmd_spec.rsp_cmd_id, None)
+    expect_data_str = struct.pack("<BB", obj_gpio_num, obj_set_level)
 
     while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-
-        if m_tt:
-            return Err_ok
-
-        if not to_queue.empty():
+        r_frame = response_frame_wait(r_waiter, 2)
+        if Err_timeout == r_frame:
             return Err_timeout
 
+        if expect_data_str == response_data_get(r_frame):
+            r_waiter.cancel()
+            return Err_ok
 
-@timeout_set(2, time_out_queue)
-def gpio_level_get(pser, obj_gpio_list, to_queue):
-    cs_info, return_dict = '', {}
-    len_gpio_list = len(obj_gpio_list)
-    total_cmd_len = len_gpio_list + 6
-    cmd_len_gpio_list_str = command_foramt_convert(len_gpio_list, "<", "H")
-    cmd_total_len_str = command_foramt_convert(total_cmd_len, "<", "I")
-    cmd_gpio_set_data_str = r"%s %s" % (cmd_len_gpio_list_str, cmd_len_gpio_list_str)
-    for each_gpio_num in obj_gpio_list:
-        cmd_gpio_set_data_str += " "
-        cmd_gpio_set_data_str += command_foramt_convert(each_gpio_num, "<", "B")
-    str_gpio_level_get = (r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 "
-                          r"03 00 00 00 22 00 00 00 %s 22 00 %s 40 40" % (cmd_total_len_str, cmd_gpio_set_data_str))
-    command_str_gpio_level_get = str_gpio_level_get.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_gpio_level_get)
-    pser.write(binascii.a2b_hex(command_str_gpio_level_get))
-
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"\w{4}\w{4}(\w+)4040")
-
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-
-        if m_tt:
-            return_str = m_tt.group(1)
-            reformat_str, obj_cnt = '', 0
-            for each_i in return_str:
-                obj_cnt += 1
-                reformat_str += each_i
-                if 2 == obj_cnt:
-                    reformat_str += " "
-                    obj_cnt = 0
-            reformat_str = reformat_str.strip()
-            return_list = reformat_str.split(" ")
-            len_return_list = len(return_list)
-            if 0 == len_return_list % 2:  # even number
-                for each_index in range(len_return_list / 2):
-                    # dict: gpio num -> gpio status string
-                    return_dict[int(return_list[2 * each_index], 16)] = str(
-                        int(return_list[2 * each_index + 1], 16)
-                    )
-                return return_dict
-            else:  # odd number
-                return Err_fail
 
-        if not to_queue.empty():
-            return Err_timeout
+@timeout_set(2)
+def gpio_level_get(pser, obj_gpio_list):
+    return_dict = {}
+    cmd_spec = DictCommandSpec["gpio_level_get"]
+    # data: gpio num list only, total len and data len both carry the gpio count
+    r_waiter = command_request(pser, cmd_spec.build_data(str(bytearray(obj_gpio_list))), cmd_spec.rsp_cmd_id)
+
+    r_frame = response_frame_wait(r_waiter)
+    if Err_timeout == r_frame:
+        return Err_timeout
+
+    return_list = bytearray(response_data_get(r_frame))
+    len_return_list = len(return_list)
+    if len_return_list and 0 == len_return_list % 2:  # even number
+        for each_index in range(len_return_list / 2):
+            # dict: gpio num -> gpio status string
+            return_dict[return_list[2 * each_index]] = str(return_list[2 * each_index + 1])
+        return return_dict
+    else:  # odd number
+        return Err_fail
 
 
-def led_control(pser, logger_printer):
+def led_control(pser, logger_printer, wait_max=0.5):
     logger_info = ""
     for each_gpio_num in DictGpioSetLevel.keys():
         each_gpio_level = DictGpioSetLevel[each_gpio_num]
-        return_gpio_set = gpio_level_set(pser, each_gpio_num, 0, time_out_queue)
+        return_gpio_set = gpio_level_set(pser, each_gpio_num, 0)
         if not return_gpio_set:
             logger_info += r"GPIO %d set level %d successfully. " % (each_gpio_num, each_gpio_level)
         else:
             logger_printer.info(logger_info)
             return logger_info
-        time.sleep(0.5)
+        # next led once the level reads back
+        ready_wait("led_gpio_level", lambda: {each_gpio_num: "0"} == gpio_level_get(pser, [each_gpio_num]),
+                   wait_max)
     logger_printer.info(logger_info)
     return Err_ok
 
 
-@timeout_set(2, time_out_queue)
-def zero_cross_detection(pser, to_queue):
-    str_zero_cross = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 " \
-                     r"03 00 00 00 39 00 00 00 06 00 00 00 39 00 00 00 00 00 40 40"
-    command_str_zero_cross = str_zero_cross.replace(" ", "")
-    cmd_id_str = cmd_id_get(command_str_zero_cross)
-    pser.write(binascii.a2b_hex(command_str_zero_cross))
-    return_str, cs_info = '', ''
+@timeout_set(2)
+def zero_cross_detection(pser):
+    r_frame = command_spec_response_wait(pser, "zero_cross_get")
+    if Err_timeout == r_frame:
+        return Err_timeout
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}" + cmd_id_str + r"01000100(\w{2})4040")
+    return_str = binascii.b2a_hex(response_data_get(r_frame))
+    if "01" == return_str:
+        return Err_ok  # zero cross detection passed
+    else:
+        return Err_fail  # zero cross detection failed
+
+
+@timeout_set(2)
+def channel_voltage_detection(pser, logger_printer, limit_table):
+    r_frame = command_spec_response_wait(pser, "channel_voltage_get")
+    if Err_timeout == r_frame:
+        return Err_timeout
+
+    channel_voltage = response_decode("channel_voltage_get", response_data_get(r_frame))
+    # ChannelVoltageGetRecord(ch0_adc_12v_mv=10556, ch1_adc_3_3v_mv=3125, ch2_adc_1_2v_mv=1170, ch3_adc_5v_mv=0)
+    ch0_voltage_adc_12v = channel_voltage.ch0_adc_12v_mv / 1000.0
+    ch1_voltage_adc_3_3v = channel_voltage.ch1_adc_3_3v_mv / 1000.0
+    ch2_voltage_adc_1_2v = channel_voltage.ch2_adc_1_2v_mv / 1000.0
+    ch3_voltage_adc_5v = channel_voltage.ch3_adc_5v_mv / 1000.0
+    results_store.measure_add("ch3_voltage", ch3_voltage_adc_5v)
+
+    logger_info = (r"Voltage(V): "
+                   r"ch0_ADC_12V = %f  ch1_ADC_3.3V = %f  ch2_ADC_1.2V = %f  ch3_ADC_5V = %f" %
+                   (ch0_voltage_adc_12v,
+                    ch1_voltage_adc_3_3v,
+                    ch2_voltage_adc_1_2v,
+                    ch3_voltage_adc_5v))
+    logger_printer.info(logger_info)
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-        if m_tt:
-            return_str = m_tt.group(1)
-            if "01" == return_str:
-                return Err_ok  # zero cross detection passed
-            else:
-                return Err_fail  # zero cross detection failed
+    # ch3 ADC 5V not checked
+    return_value = limit_check(limit_table, [("ch0_voltage", ch0_voltage_adc_12v),
+                                             ("ch1_voltage", ch1_voltage_adc_3_3v),
+                                             ("ch2_voltage", ch2_voltage_adc_1_2v)], logger_printer)
+    if Err_ok == return_value:
+        logger_info = r"Channel voltage detection pass"
+    else:
+        logger_info = r"Channel voltage detection fail"
+    logger_printer.info(logger_info)
+    return return_value
 
-        if not to_queue.empty():
-            return Err_timeout
 
+@timeout_set(2)
+def k48_low_voltage_pin_status_set(pser, obj_set_level, obj_device_type):
+    cmd_spec = DictCommandSpec["low_voltage_pin_set"]
+    r_waiter = command_request(pser, cmd_spec.build(DictGPIODeviceTypeMapping[obj_device_type], obj_set_level),
+                               cmd_spec.rsp_cmd_id, None)
 
-@timeout_set(2, time_out_queue)
-def channel_voltage_detection(pser, logger_printer, to_queue):
-    global ch0_voltage_ADC_12mV
-    global ch0_voltage_lower_limit
-    global ch0_voltage_upper_limit
-    global ch1_voltage_ADC_3_3mV
-    global ch1_voltage_lower_limit
-    global ch1_voltage_upper_limit
-    global ch2_voltage_ADC_1_2mV
-    global ch2_voltage_lower_limit
-    global ch2_voltage_upper_limit
-    global ch3_voltage_ADC_5mV
-    global ch3_voltage_lower_limit
-    global ch3_voltage_upper_limit
-
-    return_str, cs_info = '', ''
-    str_voltage_check = r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 04 00 00 00 0A 00 00 00 00 00 00 00 40 40"
-    command_str_voltage_check = str_voltage_check.replace(" ", "")
-    pser.write(binascii.a2b_hex(command_str_voltage_check))
-
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}100008000800(\w{16})4040")
+    expect_data_str = struct.pack("<BB", DictGPIODeviceTypeMapping[obj_device_type], obj_set_level)
 
     while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-
-        if m_tt:
-            return_str = m_tt.group(1)
-            return_raw_data_str = return_str.decode("hex")
-            channel_voltage_list = structure_info_parse_bytes(DictStructChannelVoltage, return_raw_data_str, '<')
-            # [('channel_0_ADC_12mV', 10556),
-            #  ('channel_1_ADC_3.3mV', 3125),
-            #  ('channel_2_ADC_1.2mV', 1170),
-            #  ('channel_3_ADC_5mV', 0)]
-            ch0_voltage_ADC_12mV = channel_voltage_list[0][1]
-            ch1_voltage_ADC_3_3mV = channel_voltage_list[1][1]
-            ch2_voltage_ADC_1_2mV = channel_voltage_list[2][1]
-            ch3_voltage_ADC_5mV = channel_voltage_list[3][1]
-
-            ch0_voltage_adc_12v = ch0_voltage_ADC_12mV / 1000.0
-            ch1_voltage_adc_3_3v = ch1_voltage_ADC_3_3mV / 1000.0
-            ch2_voltage_adc_1_2v = ch2_voltage_ADC_1_2mV / 1000.0
-            ch3_voltage_adc_5v = ch3_voltage_ADC_5mV / 1000.0
-
-            logger_info = (r"Voltage(V): "
-                           r"ch0_ADC_12V = %f  ch1_ADC_3.3V = %f  ch2_ADC_1.2V = %f  ch3_ADC_5V = %f" %
-                           (ch0_voltage_adc_12v,
-                            ch1_voltage_adc_3_3v,
-                            ch2_voltage_adc_1_2v,
-                            ch3_voltage_adc_5v))
-            logger_printer.info(logger_info)
-
-            error_info = ''
-            if ch0_voltage_lower_limit <= ch0_voltage_adc_12v <= ch0_voltage_upper_limit:
-                pass
-            else:
-                error_info += (r"Channel 0 ADC 12V Voltage %fV is beyond range[%fV : %fV]   " %
-                               (ch0_voltage_adc_12v,
-                                ch0_voltage_lower_limit,
-                                ch0_voltage_upper_limit))
-
-            if ch1_voltage_lower_limit <= ch1_voltage_adc_3_3v <= ch1_voltage_upper_limit:
-                pass
-            else:
-                error_info += (r"Channel 1 ADC 3.3V Voltage %fV is beyond range[%fV : %fV]   " %
-                               (ch1_voltage_adc_3_3v,
-                                ch1_voltage_lower_limit,
-                                ch1_voltage_upper_limit))
-
-            if ch2_voltage_lower_limit <= ch2_voltage_adc_1_2v <= ch2_voltage_upper_limit:
-                pass
-            else:
-                error_info += (r"Channel 2 ADC 1.2V Voltage %fV is beyond range[%fV : %fV]   " %
-                               (ch2_voltage_adc_1_2v,
-                                ch2_voltage_lower_limit,
-                                ch2_voltage_upper_limit))
-
-            # if ch3_voltage_lower_limit <= ch3_voltage_adc_5v <= ch3_voltage_upper_limit:
-            #     pass
-            # else:
-            #     error_info += (r"Channel 3 ADC 5V Voltage %fV is beyond range[%fV : %fV]   " %
-            #                    (ch3_voltage_adc_5v,
-            #                     ch3_voltage_lower_limit,
-            #                     ch3_voltage_upper_limit))
-
-            if not error_info:
-                logger_info = r"Channel voltage detection pass"
-                logger_printer.info(logger_info)
-                return Err_ok
-            else:
-                logger_info = r"Channel voltage detection fail"
-                logger_printer.info(logger_info)
-                logger_printer.info(error_info)
-                return Err_fail
-
-        if not to_queue.empty():
+        r_frame = response_frame_wait(r_waiter, 2)
+        if Err_timeout == r_frame:
             return Err_timeout
 
-
-@timeout_set(2, time_out_queue)
-def k48_low_voltage_pin_status_set(pser, obj_set_level, to_queue):
-    global device_type
-
-    return_str, cs_info = '', ''
-    cmd_device_type_str = command_foramt_convert(DictGPIODeviceTypeMapping[device_type], "<", "B")
-    cmd_set_level_str = command_foramt_convert(obj_set_level, "<", "B")
-    str_low_voltage_pin_set = (r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 "
-                               r"04 00 00 00 0B 00 00 00 02 00 00 00 %s %s 40 40" %
-                               (cmd_device_type_str, cmd_set_level_str))
-    command_str_low_voltage_pin_set = str_low_voltage_pin_set.replace(" ", "")
-    pser.write(binascii.a2b_hex(command_str_low_voltage_pin_set))
-
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}0b0002000200%s%s4040" %
-                           (cmd_device_type_str, cmd_set_level_str))
-
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-
-        if m_tt:
+        if expect_data_str == response_data_get(r_frame):
+            r_waiter.cancel()
             return Err_ok
 
-        if not to_queue.empty():
-            return Err_timeout
-
-
-@timeout_set(2, time_out_queue)
-def k48_low_voltage_pin_status_get(pser, obj_get_gpio_num, obj_get_gpio_port, to_queue):
-    return_str, cs_info = '', ''
-    cmd_get_gpio_num_str = command_foramt_convert(obj_get_gpio_num, "<", "B")
-    cmd_get_gpio_port_str = command_foramt_convert(obj_get_gpio_port, "<", "B")
-    str_low_voltage_pin_get = (r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 "
-                               r"04 00 00 00 0C 00 00 00 02 00 00 00 %s %s 40 40" %
-                               (cmd_get_gpio_num_str, cmd_get_gpio_port_str))
-    command_str_low_voltage_pin_get = str_low_voltage_pin_get.replace(" ", "")
-    pser.write(binascii.a2b_hex(command_str_low_voltage_pin_get))
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}0c0001000100(\w{2})4040")
+@timeout_set(2)
+def k48_low_voltage_pin_status_get(pser, obj_get_gpio_num, obj_get_gpio_port):
+    r_frame = command_spec_response_wait(pser, "low_voltage_pin_get", obj_get_gpio_num, obj_get_gpio_port)
+    if Err_timeout == r_frame:
+        return Err_timeout
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-
-        if m_tt:
-            return m_tt.group(1)
-
-        if not to_queue.empty():
-            return Err_timeout
+    return binascii.b2a_hex(response_data_get(r_frame))
 
 
-@timeout_set(2, time_out_queue)
-def disable_gpio_rst(pser, en_flag, to_queue):
-    return_str, cs_info = '', ''
+@timeout_set(2)
+def disable_gpio_rst(pser, en_flag):
     # 0: disable, 1: enable
-    cmd_en_flag_str = command_foramt_convert(en_flag, "<", "B")
-    str_disable_gpio_rst = (r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 "
-                            r"03 00 00 00 3a 00 00 00 07 00 00 00 3a 00 01 00 01 00 %s 40 40" % cmd_en_flag_str)
-    command_str_disable_gpio_rst = str_disable_gpio_rst.replace(" ", "")
-    pser.write(binascii.a2b_hex(command_str_disable_gpio_rst))
+    r_frame = command_spec_response_wait(pser, "gpio_rst_enable", en_flag)
+    if Err_timeout == r_frame:
+        return Err_timeout
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}3a0001000100(\w{2})4040")
+    # 00: disable
+    return binascii.b2a_hex(response_data_get(r_frame))
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-
-        if m_tt:
-            # 00: disable
-            return m_tt.group(1)
-
-        if not to_queue.empty():
-            return Err_timeout
 
-
-def low_voltage_pin_status_detection(pser, logger_printer):
-    global device_type
-
-    if 2 == device_type:  # Dut 13 CCO only check ste0 status
+def low_voltage_pin_status_detection(pser, logger_printer, obj_device_type):
+    if 2 == obj_device_type:  # Dut 13 CCO only check ste0 status
         state0_dut_13cco_num, gpio_ex_port_a = 3, 1
-        return_status_get = k48_low_voltage_pin_status_get(pser, state0_dut_13cco_num, gpio_ex_port_a, time_out_queue)
+        return_status_get = k48_low_voltage_pin_status_get(pser, state0_dut_13cco_num, gpio_ex_port_a)
         if "00" == return_status_get:
             logger_info = r"GPIO STATE0 0 Status Detection pass"
             logger_printer.info(logger_info)
@@ -1663,7 +1333,7 @@ def low_voltage_pin_status_detection(pser, logger_printer):
             logger_printer.info(logger_info)
             return Err_timeout
     else:
-        if "00" == disable_gpio_rst(pser, 0, time_out_queue):
+        if "00" == disable_gpio_rst(pser, 0):
             logger_info = r"Disable GPIO RST pass"
             logger_printer.info(logger_info)
         else:
@@ -1673,9 +1343,9 @@ def low_voltage_pin_status_detection(pser, logger_printer):
         check_cnt = 0
         gpio_set_status_list = range(2)  # [0, 1]
         for each_status in gpio_set_status_list:
-            return_status_set = k48_low_voltage_pin_status_set(pser, each_status, time_out_queue)
+            return_status_set = k48_low_voltage_pin_status_set(pser, each_status, obj_device_type)
             if not return_status_set:  # Err_ok
-                return_level_get = gpio_level_get(pser, DictGPIOLevelSetList[device_type], time_out_queue)
+                return_level_get = gpio_level_get(pser, DictGPIOLevelSetList[obj_device_type])
                 if isinstance(return_level_get, dict) and return_level_get:
                     logger_info = (r"GPIO set status %d and get status {gpio_num: gpio_level} = %s" %
                                    (each_status, str(return_level_get)))
@@ -1700,7 +1370,7 @@ def low_voltage_pin_status_detection(pser, logger_printer):
                 logger_printer.info(logger_info)
                 return Err_timeout
 
-        if "01" == disable_gpio_rst(pser, 1, time_out_queue):
+        if "01" == disable_gpio_rst(pser, 1):
             logger_info = r"Enable GPIO RST pass"
             logger_printer.info(logger_info)
         else:
@@ -1714,97 +1384,88 @@ def low_voltage_pin_status_detection(pser, logger_printer):
             return Err_ok
 
 
-@timeout_set(2, time_out_queue)
-def dut_charge_voltage_detection(pser, logger_printer, to_queue, charge_mode=3, init_flag=1):
-    global voltage_factor
-    global charge_timespan
+def tdsb_charge_ready_time():
+    # monotonic time the charge started by charge_mode 2 has lasted charge_timespan, the collect may start
+    if tdsb_charge_deadline is None:
+        return monotonic_time()
+    return tdsb_charge_deadline.expire_at
+
+
+@timeout_set(2)
+def dut_charge_voltage_detection(pser, logger_printer, board_config, charge_mode=3, init_flag=1):
     global pre_charge_voltage
     global pro_charge_voltage
     global voltage_rise
-    global charge_voltage_threshold
-    global tdsb_charge_time_interval
+    global tdsb_charge_deadline
 
     if 3 == charge_mode:
-        tmp_tdsb_now_time_interval = datetime.datetime.now()
-        tmp_time_interval = (tmp_tdsb_now_time_interval - tdsb_charge_time_interval).seconds
-        if tmp_time_interval < charge_timespan:
-            logger_printer.info("TDSB charge time interval %ds not enough to %ds, auto sleep %ds." %
-                                (tmp_time_interval, charge_timespan, charge_timespan - tmp_time_interval))
-            time.sleep(charge_timespan - tmp_time_interval)
+        # the ready_time of the test plan node decides when to collect, a call before the deadline is not ready
+        if tdsb_charge_deadline is not None and not tdsb_charge_deadline.expired():
+            logger_printer.info("TDSB charge not ready: collected %.1fs before the charge time of %ds ends" %
+                                (tdsb_charge_deadline.remaining(), board_config.charge_timespan))
+            return Err_timeout
     elif 2 == charge_mode:
-        tdsb_charge_time_interval = datetime.datetime.now()
+        tdsb_charge_deadline = Deadline(board_config.charge_timespan)
     else:
         pass
 
-    return_str, cs_info = '', ''
-    cmd_charge_mode_str = command_foramt_convert(charge_mode, "<", "B")
-    cmd_dut_charge_timespan_str = command_foramt_convert(charge_timespan, "<", "B")
-    str_dut_charge_voltage_get = (r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 "
-                                  r"03 00 00 00 3b 00 00 00 08 00 00 00 3b 00 02 00 02 00 %s %s 40 40" %
-                                  (cmd_charge_mode_str, cmd_dut_charge_timespan_str))
-    command_str_dut_charge_voltage_get = str_dut_charge_voltage_get.replace(" ", "")
-    pser.write(binascii.a2b_hex(command_str_dut_charge_voltage_get))
+    r_frame = command_spec_response_wait(pser, "tdsb_charge_voltage_get", charge_mode,
+                                         board_config.charge_timespan)
+    if Err_timeout == r_frame:
+        return Err_timeout
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}3b0005000500(\w{10})4040")
+    # charge_status: 0=starts, 1=charging, 2=done
+    return_voltage_value, return_charge_status = response_decode("tdsb_charge_voltage_get",
+                                                                 response_data_get(r_frame))
+    actual_voltage = float(return_voltage_value * voltage_factor)
 
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-
-        if m_tt:
-            return_str = m_tt.group(1)
-            return_raw_hex_str = return_str.decode("hex")
-            unpack_format = struct.Struct("<iB")  # int32_t and uint8_t: voltage and charge_status
-            # return_charge_status: 0=starts, 1=charging, 2=done
-            return_voltage_value, return_charge_status = unpack_format.unpack(return_raw_hex_str)
-            actual_voltage = float(return_voltage_value * voltage_factor)
-
-            if not init_flag:  # function enter first time
-                pre_charge_voltage = actual_voltage
-                logger_info = (r"Dut charge %ds voltage inital %fV" % (charge_timespan, pre_charge_voltage))
+    if not init_flag:  # function enter first time
+        pre_charge_voltage = actual_voltage
+        results_store.measure_add("charge_voltage_start", pre_charge_voltage)
+        logger_info = (r"Dut charge %ds voltage inital %fV" % (board_config.charge_timespan, pre_charge_voltage))
+        logger_printer.info(logger_info)
+        return Err_ok
+    else:  # function enter next time
+        if 1 == return_charge_status:  # charge done
+            pro_charge_voltage = actual_voltage
+            results_store.measure_add("charge_voltage_end", pro_charge_voltage)
+            if pre_charge_voltage is None:  # charge start failed, nothing to compare with
+                logger_printer.info(r"Dut charge voltage %fV, no initial voltage read" % pro_charge_voltage)
+                return Err_fail
+            voltage_rise = pro_charge_voltage - pre_charge_voltage
+            rise_result = measurement_limits.limit_value_check(board_config.limit_table, "charge_voltage_rise",
+                                                              voltage_rise)
+            results_store.measure_limit_add(rise_result)
+            if rise_result.passed:
+                logger_info = (r"Dut charge %ds voltage from %fV to %fV rise %fV" %
+                               (board_config.charge_timespan, pre_charge_voltage, pro_charge_voltage, voltage_rise))
                 logger_printer.info(logger_info)
                 return Err_ok
-            else:  # function enter next time
-                if 1 == return_charge_status:  # charge done
-                    pro_charge_voltage = actual_voltage
-                    voltage_rise = pro_charge_voltage - pre_charge_voltage
-                    if charge_voltage_threshold <= voltage_rise:
-                        logger_info = (r"Dut charge %ds voltage from %fV to %fV rise %fV" %
-                                       (charge_timespan, pre_charge_voltage, pro_charge_voltage, voltage_rise))
-                        logger_printer.info(logger_info)
-                        return Err_ok
-                    else:
-                        logger_info = (r"Dut charge %ds voltage from %fV to %fV rise %fV less than %fV" %
-                                       (charge_timespan, pre_charge_voltage, pro_charge_voltage, voltage_rise,
-                                        charge_voltage_threshold))
-                        logger_printer.info(logger_info)
-                        return Err_fail
-                elif 0 == return_charge_status:  # charging
-                    logger_info = r"Dut charging TimeOut"
-                    logger_printer.info(logger_info)
-                    return Err_timeout
-                else:  # charge starts but should not be received here
-                    logger_info = r"Dut charging failed"
-                    logger_printer.info(logger_info)
-                    return Err_fail
-
-        if not to_queue.empty():
+            else:
+                logger_info = (r"Dut charge %ds voltage from %fV to %fV rise %fV less than %fV" %
+                               (board_config.charge_timespan, pre_charge_voltage, pro_charge_voltage, voltage_rise,
+                                rise_result.lower))
+                logger_printer.info(logger_info)
+                return Err_fail
+        elif 0 == return_charge_status:  # charging
+            logger_info = r"Dut charging TimeOut"
+            logger_printer.info(logger_info)
             return Err_timeout
+        else:  # charge starts but should not be received here
+            logger_info = r"Dut charging failed"
+            logger_printer.info(logger_info)
+            return Err_fail
 
 
-@timeout_set(5, time_out_queue)
-def init_send(pser, to_queue, logger_printer):
+@timeout_set(5)
+def init_send(pser, logger_printer):
     s_info = ''
+    r_deadline = deadline_current()
     while 1:
+        if s_info:
+            step_timing.step_retry()  # no "C" in the output yet
         pser.write("WQKL")
-        s_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        s_info += tmp
+        s_info += serial_bytes_read_deadline(pser)
         m_ram = re.search("C", s_info)
 
         if m_ram:
@@ -1813,50 +1474,36 @@ def init_send(pser, to_queue, logger_printer):
             logger_printer.info("Program enters transmission mode...")
             return Err_ok
 
-        if not to_queue.empty():
+        if r_deadline.expired():
             return Err_timeout
 
 
-def getc(size, timeout=1):
-    time.sleep(0.1)
-    return ser.read(size) or None
-
-
-def putc(data, timeout=1):
-    return ser.write(data) or None
-
-
-def status_update_0(total_packets, success_count, error_count):
-    if total_packets % 10 == 0:
-        print '.',
-
-
-def status_update_1(total_packets, success_count, error_count):
-    if total_packets % 10 == 0:
-        print '.',
-
-
-@timeout_set(15, time_out_queue)
-def burn_test_bin(s_port, r_file, to_queue, logger_printer):
+def burn_test_bin(s_port, r_file, logger_printer):
     logger_printer.info("Transferring %s..." % r_file)
 
     try:
-        stream = open(r_file, 'rb')
-    except Exception, e_info:
+        image_data = xmodem_transfer.image_load(r_file)  # cached across boards
+    except (IOError, OSError), e_info:
         logger_printer.info(str(e_info))
         logger_printer.info("Cannot load file, please check the file path and retry. Press <enter> to exit")
         return Err_fail
 
-    x_modem = xmodem.XMODEM(getc, putc, mode='xmodem1k')
-    xmodem_send = x_modem.send(stream, callback=status_update_0)
-    logger_printer.info("Transmit result: %s" % str(xmodem_send))
+    # init_send has already read the "C" of the receiver
+    transfer_stat = xmodem_transfer.xmodem_send(s_port, image_data, "C")
+    logger_printer.info("Transmit %s" % xmodem_transfer.transfer_stat_info(transfer_stat))
+    step_timing.step_retry(transfer_stat.retry_cnt)
+    if transfer_stat.error is not None:
+        logger_printer.info("Transmit failed: %s" % transfer_stat.error)
+        return Err_fail
+    return mem_test_result_wait(s_port, logger_printer)
 
+
+@timeout_set(15)
+def mem_test_result_wait(s_port, logger_printer):
     s_info = ''
+    r_deadline = deadline_current()
     while 1:
-        s_info += s_port.read(1)
-        bytes2read = s_port.inWaiting()
-        tmp = s_port.read(bytes2read)
-        s_info += tmp
+        s_info += serial_bytes_read_deadline(s_port)
 
         m_test_pass = re.search(r"test passed", s_info)
         m_test_fail = re.search(r"failed:(.*)", s_info)
@@ -1869,21 +1516,22 @@ def burn_test_bin(s_port, r_file, to_queue, logger_printer):
             logger_printer.info("Mem check failed: %s" % m_test_fail.group(1))
             return (Err_fail, m_test_fail.group(1))
 
-        if not to_queue.empty():
+        if r_deadline.expired():
             return Err_timeout
 
 
-def psram_mem_check(pser, to_queue, logger_printer):
+def psram_mem_check(pser, logger_printer, power_hold_time=0.5):
     test_bin = "memtest.bin"
 
-    power_down_up(pser)
-    if init_send(pser, to_queue, logger_printer):
+    serial_dispatcher_stop(pser)  # xmodem transfer owns the port from here
+    power_down_up(pser, power_hold_time)
+    if init_send(pser, logger_printer):
         logger_info = (r"Failed enter transmission mode")
         logger_printer.info(logger_info)
         return Err_fail
     logger_printer.info(r"Transmission mode enter successfully.")
 
-    return_value = burn_test_bin(pser, test_bin, to_queue, logger_printer)
+    return_value = burn_test_bin(pser, test_bin, logger_printer)
     if Err_ok == return_value:
         logger_info = (r"Psram Mem Check Pass")
         logger_printer.info(logger_info)
@@ -1899,8 +1547,8 @@ def psram_mem_check(pser, to_queue, logger_printer):
         return Err_fail
 
 
-@timeout_set(5, time_out_queue)
-def ktj_dut_gpio_check(pser, to_queue, logger_printer):
+@timeout_set(5)
+def ktj_dut_gpio_check(pser, logger_printer):
     check_done_cnt = 0
     gpio_set_status_list = range(2)  # [0, 1]
     for each_status in gpio_set_status_list:
@@ -1909,7 +1557,7 @@ def ktj_dut_gpio_check(pser, to_queue, logger_printer):
             gpio_num_list.append(each_dut_gpio)
             gpio_status_list.append(each_status)
 
-            ret_dut_gpio_set = gpio_level_set(pser, each_dut_gpio, each_status, to_queue)
+            ret_dut_gpio_set = gpio_level_set(pser, each_dut_gpio, each_status)
             if ret_dut_gpio_set:
                 logger_printer.info("Error info in ktj dut gpio set: %s" % str(ret_dut_gpio_set))
                 logger_info = (r"KTJ dut gpio %d set status %d failed" % (each_dut_gpio, each_status))
@@ -1917,7 +1565,7 @@ def ktj_dut_gpio_check(pser, to_queue, logger_printer):
                 return Err_fail
 
             each_ptk48_gpa_index = DictKTJGPIOMapping[each_dut_gpio]
-            ret_ptk48_gpio_get = k48_low_voltage_pin_status_get(pser, each_ptk48_gpa_index, 1, to_queue)
+            ret_ptk48_gpio_get = k48_low_voltage_pin_status_get(pser, each_ptk48_gpa_index, 1)
             if ret_ptk48_gpio_get not in ["00", "01"]:
                 logger_info = ("Error info in ktj ptk48 gpio get: %s" % str(ret_ptk48_gpio_get))
                 logger_printer.info(logger_info)
@@ -1942,43 +1590,21 @@ def ktj_dut_gpio_check(pser, to_queue, logger_printer):
         return Err_fail
 
 
-@timeout_set(2, time_out_queue)
-def ktj_dut_channel_voltage_adc_data_get(pser, adc_voltage_channel, to_queue):
-    return_str, cs_info = '', ''
-    cmd_ktj_dut_channel_voltage_get_str = command_foramt_convert(adc_voltage_channel, "<", "I")
-    str_ktj_dut_channel_voltage_get = (r"23 23 00 00 00 00 00 00 00 00 00 00 00 00 "
-                                       r"03 00 00 00 42 00 00 00 0a 00 00 00 42 00 04 00 04 00 %s 40 40" %
-                                       cmd_ktj_dut_channel_voltage_get_str)
-    command_str_ktj_dut_channel_voltage_get = str_ktj_dut_channel_voltage_get.replace(" ", "")
-
-    pser.write(binascii.a2b_hex(command_str_ktj_dut_channel_voltage_get))
+@timeout_set(2)
+def ktj_dut_channel_voltage_adc_data_get(pser, adc_voltage_channel):
+    r_frame = command_spec_response_wait(pser, "ktj_adc_voltage_get", adc_voltage_channel)
+    if Err_timeout == r_frame:
+        return Err_timeout
 
-    m_tt_comp = re.compile(r"2323[0]{24}\w{8}01[0]{6}\w{8}420004000400(\w{8})4040")
-
-    while 1:
-        cs_info += pser.read(1)
-        bytes2read = pser.inWaiting()
-        tmp = pser.read(bytes2read)
-        cs_info += tmp
-
-        m_tt = m_tt_comp.search(cs_info.encode("hex"))
-
-        if m_tt:
-            return_str = m_tt.group(1)
-            return_raw_hex_str = return_str.decode("hex")
-            unpack_format = struct.Struct("<i")  # int32_t
-            return_voltage_value = (unpack_format.unpack(return_raw_hex_str))[0]
-            actual_voltage = float(return_voltage_value * voltage_factor)
-            return actual_voltage
-
-        if not to_queue.empty():
-            return Err_timeout
+    return_voltage_value = response_decode("ktj_adc_voltage_get", response_data_get(r_frame)).voltage
+    actual_voltage = float(return_voltage_value * voltage_factor)
+    return actual_voltage
 
 
-def ktj_dut_channel_voltage_check(pser, to_queue, logger_printer):
-    check_done_cnt, list_channel_voltage = 0, []
+def ktj_dut_channel_voltage_check(pser, logger_printer, limit_table):
+    list_channel_voltage = []
     for each_channel_num in ListKTJVoltageChannel:
-        each_channel_voltage = ktj_dut_channel_voltage_adc_data_get(pser, each_channel_num, to_queue)
+        each_channel_voltage = ktj_dut_channel_voltage_adc_data_get(pser, each_channel_num)
         if isinstance(each_channel_voltage, float):
             list_channel_voltage.append(each_channel_voltage)
             logger_info = r"KTJ channel %d voltage get %fV" % (each_channel_num, each_channel_voltage)
@@ -1988,19 +1614,9 @@ def ktj_dut_channel_voltage_check(pser, to_queue, logger_printer):
             logger_printer.info(logger_info)
             return Err_fail
 
-    for each_index in range(len(list_channel_voltage)):
-        each_channel_voltage = list_channel_voltage[each_index]
-        each_channel_voltage_range_list = ktj_channel_range_list[each_index]
-        if each_channel_voltage_range_list[0] <= each_channel_voltage <= each_channel_voltage_range_list[1]:
-            check_done_cnt += 1
-        else:
-            logger_info = (r"KTJ channel %d voltage %fV out of range %s" %
-                           (ListKTJVoltageChannel[each_index],
-                            each_channel_voltage,
-                            str(each_channel_voltage_range_list)))
-            logger_printer.info(logger_info)
-
-    if check_done_cnt == len(ListKTJVoltageChannel):
+    measure_list = [("ktj_channel_%d_voltage" % each_channel_num, each_channel_voltage)
+                    for each_channel_num, each_channel_voltage in zip(ListKTJVoltageChannel, list_channel_voltage)]
+    if Err_ok == limit_check(limit_table, measure_list, logger_printer):
         logger_info = (r"KTJ Channel Voltage Check Pass")
         logger_printer.info(logger_info)
         return Err_ok
@@ -2050,621 +1666,860 @@ def fail_printer():
     print ("-" * 100)
 
 
-if __name__ == '__main__':
-
-    loop_times = 0
-    board_lable = ''
+def board_test_abort(info_str):
+    # a station worker has no console to wait on, it reports and ends its own process only
+    if "MainProcess" == multiprocessing.current_process().name:
+        raw_input(info_str)
+    else:
+        print (info_str)
+    sys.exit()
 
-    while 1:
 
-        signal.signal(signal.SIGINT, signal_exit)
-        signal.signal(signal.SIGTERM, signal_exit)
+# per board context handed to every test case node of the board plan
+BoardContext = collections.namedtuple("BoardContext", ["sport_num", "board_lable", "board_config", "ser", "logger",
+                                                       "log_folder", "filter_gpio_num", "data_trans_queue",
+                                                       "dict_results_summary"])
 
-        config_file = r"config_production_test.ini"
-        data_trans_queue = Queue.Queue(maxsize=10)
-        init_str = "entry_sbl_cli"
-        base_str = "bootm fw_mode=1"
-        voltage_factor = (3.2 / 512)
-        dict_filter_data_info = collections.OrderedDict()
-        dict_results_summary, dump_data_str = {}, ''
-        nf_detection_times, csr_retry_cnt, cur_gain_cnt, tdsb_charge_time_interval = 3, 3, 0, 0
-        tmi_list, ktj_channel_range_list = [], []
-        first_cur_gain, return_result = None, None
-        str_vendor_id, str_chip_code, str_module_type, str_chip_mmid = None, None, None, None
-        csr_threshold, pre_charge_voltage, pro_charge_voltage, voltage_rise = None, None, None, None
-
-        config_handler = configobj.ConfigObj(config_file)
-
-        sport_num = config_handler["serial config"]["serial_port_num"]
-        baudrate_value = int(config_handler["serial config"]["baud_rate"])
-
-        label_enable = int(config_handler["test config"]["label_enable"])
-        loop_mode = int(config_handler["test config"]["loop_mode"])
-        reset_mode = config_handler["test config"]["reset_mode"]
-        reboot_method = config_handler["test config"]["reboot_method"]
-
-        vendor_id_enable = int(config_handler["test parameters config"]["vendor_id_enable"])
-        vendor_id = config_handler["test parameters config"]["vendor_id"]
-        str_mac_addr_burn = config_handler["test parameters config"]["burned_mac_address"]
-
-        phase_list = list(config_handler["test parameters config"]["phase"])
-        gold_ppm = int(float(config_handler["test parameters config"]["gold_ppm"]))
-        phy_power_att = int(config_handler["test parameters config"]["phy_power_att"])
-        device_type = int(config_handler["test parameters config"]["device_type"])
-        filter_gpio_num = int(DictFilterGpio[device_type])
-        software_version = config_handler["test parameters config"]["software_version"]
-        filter_type = int(config_handler["test parameters config"]["filter_type"])
-        global_nid = int(config_handler["test parameters config"]["global_nid"])
-
-        noise_floor_threshold = float(config_handler["threshold config"]["noise_floor_threshold"])
-        tx_power_threshold = float(config_handler["threshold config"]["tx_power_threshold"])
-        rx_rssi_threshold = float(config_handler["threshold config"]["rx_rssi_threshold"])
-        dut_real_ppm_max = float(config_handler["threshold config"]["dut_real_ppm_max"])
-        dut_real_ppm_min = float(config_handler["threshold config"]["dut_real_ppm_min"])
-        rx_snr_threshold = float(config_handler["threshold config"]["rx_snr_threshold"])
-        hpf_700k_threshold = float(config_handler["threshold config"]["hpf_700k_threshold"])
-        hpf_2m_threshold = float(config_handler["threshold config"]["hpf_2m_threshold"])
-        hpf_flat_threshold = float(config_handler["threshold config"]["hpf_flat_threshold"])
-
-        tmi4_csr_enable = int(config_handler["threshold config"]["tmi4_csr_enable"])
-        tmi4_csr_threshold = int(config_handler["threshold config"]["tmi4_csr_threshold"])
-        ext_tmi3_csr_enable = int(config_handler["threshold config"]["ext_tmi3_csr_enable"])
-        ext_tmi3_csr_threshold = int(config_handler["threshold config"]["ext_tmi3_csr_threshold"])
-
-        charge_timespan = int(float(config_handler["threshold config"]["charge_timespan"]))
-        charge_voltage_threshold = float(config_handler["threshold config"]["charge_voltage_threshold"])
-
-        spur_max_limit_cnt = int(config_handler["threshold config"]["spur_max_limit_cnt"])
-        spur_remove_tone_cnt = int(config_handler["threshold config"]["spur_remove_tone_cnt"])
-
-        channel_0_voltage_list = config_handler["threshold config"]["channel_0_range"]
-        ch0_voltage_lower_limit = float(channel_0_voltage_list[0])
-        ch0_voltage_upper_limit = float(channel_0_voltage_list[1])
-
-        channel_1_voltage_list = config_handler["threshold config"]["channel_1_range"]
-        ch1_voltage_lower_limit = float(channel_1_voltage_list[0])
-        ch1_voltage_upper_limit = float(channel_1_voltage_list[1])
-
-        channel_2_voltage_list = config_handler["threshold config"]["channel_2_range"]
-        ch2_voltage_lower_limit = float(channel_2_voltage_list[0])
-        ch2_voltage_upper_limit = float(channel_2_voltage_list[1])
-
-        channel_3_voltage_list = config_handler["threshold config"]["channel_3_range"]
-        ch3_voltage_lower_limit = float(channel_3_voltage_list[0])
-        ch3_voltage_upper_limit = float(channel_3_voltage_list[1])
-
-        ktj_gpio_check_enable = int(float(config_handler["ktj pt config"]["ktj_gpio_check_enable"]))
-        ktj_channel_voltage_check_enable = int(float(config_handler["ktj pt config"]
-                                                     ["ktj_channel_voltage_check_enable"]))
-
-        channel_0_voltage_list = config_handler["ktj pt config"]["ktj_channel_0_range"]
-        ktj_channel_range_list.append([float(channel_0_voltage_list[0]),
-                                       float(channel_0_voltage_list[1])])
-
-        channel_1_voltage_list = config_handler["ktj pt config"]["ktj_channel_1_range"]
-        ktj_channel_range_list.append([float(channel_1_voltage_list[0]),
-                                       float(channel_1_voltage_list[1])])
-
-        channel_2_voltage_list = config_handler["ktj pt config"]["ktj_channel_2_range"]
-        ktj_channel_range_list.append([float(channel_2_voltage_list[0]),
-                                       float(channel_2_voltage_list[1])])
-
-        channel_3_voltage_list = config_handler["ktj pt config"]["ktj_channel_3_range"]
-        ktj_channel_range_list.append([float(channel_3_voltage_list[0]),
-                                       float(channel_3_voltage_list[1])])
-
-        channel_5_voltage_list = config_handler["ktj pt config"]["ktj_channel_5_range"]
-        ktj_channel_range_list.append([float(channel_5_voltage_list[0]),
-                                       float(channel_5_voltage_list[1])])
-
-        read_fw_ver_flag = int(config_handler["test case flag config"]["read_fw_ver_flag"])
-        read_chip_id_flag = int(config_handler["test case flag config"]["read_chip_id_flag"])
-        read_mac_address_flag = int(config_handler["test case flag config"]["read_mac_address_flag"])
-        burned_mac_address_flag = int(config_handler["test case flag config"]["burned_mac_address_flag"])
-        noise_floor_detection_flag = int(config_handler["test case flag config"]["noise_floor_detection_flag"])
-        tx_rx_loopback_detection_flag = int(config_handler["test case flag config"]["tx_rx_loopback_detection_flag"])
-        flatness_detection_flag = int(config_handler["test case flag config"]["flatness_detection_flag"])
-        sen_csr_detection_flag = int(config_handler["test case flag config"]["sen_csr_detection_flag"])
-        led_control_flag = int(config_handler["test case flag config"]["led_control_flag"])
-        zero_cross_detection_flag = int(config_handler["test case flag config"]["zero_cross_detection_flag"])
-        channel_voltage_detection_flag = int(config_handler["test case flag config"]["channel_voltage_detection_flag"])
-        gpio_status_detection_flag = int(config_handler["test case flag config"]["gpio_status_detection_flag"])
-        tdsb_voltage_detection_flag = int(config_handler["test case flag config"]["tdsb_voltage_detection_flag"])
-        psram_mem_detection_flag = int(config_handler["test case flag config"]["psram_mem_detection_flag"])
 
-        if 1 <= loop_times and 2 == loop_mode:  # loop mode only enable 1st time label here
-            pass
+def case_efuse_lock(board_ctx):
+    logger, dict_results_summary = board_ctx.logger, board_ctx.dict_results_summary
+    print ("\r\n" + "-" * 30 + "Efuse Lock" + r"-" * 30 + "\r\n")
+    str_efuse_prog_lock = efuse_prog_bit_lock(board_ctx.ser)
+    if Err_timeout == str_efuse_prog_lock:
+        dict_results_summary["Test: efuse_lock"] = "fail"
+        str_efuse_check_result = ("Test <efuse_lock> TimeOut...")
+    elif str_efuse_prog_lock == "00":
+        str_efuse_check_result = ("Efuse Program Done Bit already 1, Check Complete!")
+    elif str_efuse_prog_lock == "01":
+        str_efuse_check_result = ("Efuse Program Done Bit original 0, Write Bit 1, Lock Complete!")
+    else:
+        str_efuse_check_result = ("Return Value Error : %s , Please Check..." % str_efuse_prog_lock)
+    logger.info(str_efuse_check_result)
+    return Err_timeout if Err_timeout == str_efuse_prog_lock else Err_ok
+
+
+def case_tdsb_charge_start(board_ctx):
+    logger = board_ctx.logger
+    print ("\r\n" + "-" * 30 + "TDSB Voltage Detection" + r"-" * 30 + "\r\n")
+
+    # for tdsb initial charge
+    tdsb_return_value = dut_charge_voltage_detection(board_ctx.ser, logger, board_ctx.board_config, 2, 0)
+    if Err_fail == tdsb_return_value:
+        logger.info("TDSB Voltage Detection Failed")
+        board_ctx.dict_results_summary["Test: tdsb_voltage_detection"] = "fail"
+    elif Err_timeout == tdsb_return_value:
+        logger.info("TDSB Voltage Detection TimeOut")
+        board_ctx.dict_results_summary["Test: tdsb_voltage_detection"] = "fail"
+    else:
+        logger.info("TDSB Voltage Detection passed")
+    return tdsb_return_value
+
+
+def case_vendor_id_set(board_ctx):
+    vendor_id = board_ctx.board_config.vendor_id
+    print ("\r\n" + "-" * 30 + "Vendor ID Set" + r"-" * 30 + "\r\n")
+    vid_return_value = vendor_id_set(board_ctx.ser, vendor_id)
+    if Err_fail == vid_return_value:
+        board_ctx.dict_results_summary["Test: vendor_id_set"] = "fail"
+        str_vendor_id_set_result = ("Test <vendor_id_set> Failed...")
+    elif Err_timeout == vid_return_value:
+        board_ctx.dict_results_summary["Test: vendor_id_set"] = "fail"
+        str_vendor_id_set_result = ("Test <vendor_id_set> TimeOut...")
+    else:
+        str_vendor_id_set_result = ("Set vendor id: %s completes." % vendor_id)
+    board_ctx.logger.info(str_vendor_id_set_result)
+    return vid_return_value
+
+
+def id_info_name_list_get(board_config):
+    # id info read in the one batch before the test plan, chip info first: the chip id names the board log
+    # a vendor id written by the plan (vendor_id_set) is read back by case_id_info_read instead
+    id_info_name_list = ["chip_info", "chip_code", "module_type", "chip_mmid"]
+    if not board_config.vendor_id_enable:
+        id_info_name_list.append("vendor_id")
+    if board_config.read_fw_ver_flag:
+        id_info_name_list.append("fw_ver")
+    if board_config.read_mac_address_flag:
+        id_info_name_list.append("mac_addr")
+    return id_info_name_list
+
+
+def case_id_info_read(board_ctx, dict_id_info):
+    board_config, logger = board_ctx.board_config, board_ctx.logger
+    dict_results_summary = board_ctx.dict_results_summary
+    return_value = Err_ok
+    list_chip_info = dict_id_info["chip_info"]
+    try:
+        print ("\r\n" + "-" * 30 + "Read ID Info" + r"-" * 30 + "\r\n")
+        if "vendor_id" not in dict_id_info:
+            dict_id_info["vendor_id"] = vendor_id_get(board_ctx.ser)
+        str_vendor_id = dict_id_info["vendor_id"]
+        logger.info(r"Read Vendor_id: %s" % str_vendor_id)
+        str_chip_code = dict_id_info["chip_code"]
+        logger.info(r"Read Chip_code: %s" % str_chip_code)
+        str_module_type = dict_id_info["module_type"]
+        logger.info(r"Read Module_type: %s" % DictModuleType.setdefault(str_module_type, "Null"))
+        str_chip_mmid = dict_id_info["chip_mmid"]
+        logger.info(r"Read Chip_mmid: %s" % str_chip_mmid)
+        # vendor id in hex as chip code and mmid, it is 0xffff on an unprogrammed chip
+        results_store.board_info_set(vendor_id=binascii.b2a_hex(str_vendor_id)
+                                     if isinstance(str_vendor_id, str) else None, chip_code=str_chip_code,
+                                     module_type=DictModuleType[str_module_type], chip_mmid=str_chip_mmid)
+    except Exception, excp_info:
+        logger.info(str(excp_info))
+
+    if board_config.read_fw_ver_flag:
+        print ("\r\n" + "-" * 30 + "Read FW Version" + r"-" * 30 + "\r\n")
+        str_fw_ver = dict_id_info.get("fw_ver", Err_timeout)
+        if Err_timeout == str_fw_ver:
+            dict_results_summary["Test: read_fw_version"] = "fail"
+            logger.info("Test <read_fw_version> TimeOut...")
+            return_value = Err_timeout
         else:
-            if label_enable:
-                board_lable = raw_input("Test starts...\nPlease input board label: ")
+            logger.info(("fw version", str_fw_ver))
+            results_store.board_info_set(fw_ver=str_fw_ver)
+            # fw version check
+            fw_version_pattern = re.match(r"(\w+)-(\w+)-(\d+.\d+.\d+.\d+)", str_fw_ver)
+            if fw_version_pattern:
+                device_name = DictModuleType[DictDeviceTypeNumMapping[board_config.device_type]]
+                read_module_type_ver_str = fw_version_pattern.group(2)
+                read_software_ver_str = fw_version_pattern.group(3)
+                if (board_config.software_version == read_software_ver_str and
+                        read_module_type_ver_str.find(device_name) > 0):
+                    logger.info(r"Software version <%s> <%s> check complete!" %
+                                (device_name,
+                                 board_config.software_version))
+                else:
+                    logger.info(r"Software version <%s> <%s> mismatched, please check..." %
+                                (device_name,
+                                 board_config.software_version))
+                    sys.exit()
             else:
-                board_lable = "test"
-
-        time_stamp = time.strftime("%Y-%m-%d %X")
-        time_stamp = time_stamp.replace(" ", "-")
-        time_stamp = time_stamp.replace(":", "-")
+                logger.info(r"Fw version format <%s> mismatched, please check..." % str_fw_ver)
+                sys.exit()
+        print
 
-        log_folder = r".\log_production_test" + "\\" + board_lable + "_" + time_stamp
-        if not os.path.exists(log_folder):
-            os.makedirs(log_folder)
+    if board_config.read_chip_id_flag:
+        for each_chip_info in list_chip_info:
+            logger.info(each_chip_info)
+
+    # --------------------------------------------------------------------------------Read Original Mac Address
+    if board_config.read_mac_address_flag:
+        print ("\r\n" + "-"*30 + "Read Original Mac Address" + r"-"*30 + "\r\n")
+        read_origin_ma_str = dict_id_info.get("mac_addr", Err_timeout)
+        if Err_timeout == read_origin_ma_str:
+            dict_results_summary["Test: read_mac_addr_1"] = "fail"
+            logger.info("Test <read_mac_addr> TimeOut...")
+            return_value = Err_timeout
+        else:
+            logger.info("Original Mac Address %s" % read_origin_ma_str)
+            results_store.board_info_set(mac_addr=read_origin_ma_str)
+    return return_value
 
-        try:
-            ser = serial.Serial(port='com' + sport_num, baudrate=baudrate_value, timeout=0.3)
-        except Exception, ser_info:
-            print str(ser_info)
-            raw_input("Error open Serial Port COM%s!!! Press <enter> to Close it and retry..." % sport_num)
-            sys.exit()
-        print("Serial port COM%s opened, please press <RST> button on the chip..." % sport_num)
 
-        if reset_mode == "1":  # soft reset
-            if reboot_method == "1":
-                print ("Power Reboot...")
-                power_down_up(ser)
-            else:
-                print ("Soft Reset...")
-                rst_low_high(ser)
-        elif reset_mode == "0":  # hard reset
-            print ("Hard Reset, Please Press <RST> Button On The Chip To Continue The Operation...")
-        else:
-            raw_input("Please specified the reset mode...<enter> to exit!")
-            sys.exit()
+def case_mac_addr_burn(board_ctx):
+    logger, dict_results_summary = board_ctx.logger, board_ctx.dict_results_summary
+    return_value = Err_ok
+    print ("\r\n" + "-" * 30 + "Burned and Read Mac Address" + r"-" * 30 + "\r\n")
+    # Burn Mac Address
+    burn_ma_str = mac_addr_burn(board_ctx.ser, board_ctx.board_config.str_mac_addr_burn)
+    if Err_timeout == burn_ma_str:
+        dict_results_summary["Test: burn_mac_addr"] = "fail"
+        logger.info("Test <burn_mac_addr> TimeOut...")
+        return_value = Err_timeout
+    else:
+        logger.info("Burned Mac Address %s" % burn_ma_str)
+    # Read Mac Address: read back until it shows the burned address, up to mac_burn_wait_max
+    read_ma_list = []
+
+    def mac_addr_probe():
+        read_ma_list.append(mac_addr_read(board_ctx.ser))
+        return Err_timeout == burn_ma_str or read_ma_list[-1] == burn_ma_str.lower()
+    ready_wait("mac_addr_burn", mac_addr_probe, board_ctx.board_config.mac_burn_wait_max)
+    read_ma_str = read_ma_list[-1] if read_ma_list else Err_timeout
+    if Err_timeout == read_ma_str:
+        dict_results_summary["Test: read_mac_addr_2"] = "fail"
+        logger.info("Test <read_mac_addr> TimeOut...")
+        return_value = Err_timeout
+    else:
+        logger.info("Read Mac Address %s" % read_ma_str)
+        results_store.board_info_set(mac_addr=read_ma_str)
+    return return_value
 
-        mode_str = base_str + '\n'
-        return_result = enter_test_mode(ser, init_str, mode_str, time_out_queue)
-        if return_result:
-            raw_input("TimeOut Error: Enter Test Mode Failed...<enter> to exit!")
-            sys.exit()
 
-        # --------------------------------------------------------------------------------read chip id
-        list_chip_info = read_chip_info(ser, time_out_queue)
-        if isinstance(list_chip_info, int):  # Err code returned
-            sys.exit()
-        chip_type_str = list_chip_info[0][1]  # "chip type", ****)
-        chip_id_str = list_chip_info[1][1]  # "chip id", ****)
-
-        log_name = board_lable + "_" + chip_id_str + "_" + chip_type_str + "_" + time_stamp
-        logger = logging.getLogger(sport_num)
-        logger.setLevel(logging.DEBUG)  # logging level: debug < info < warning < error < critical
-        logfile = log_folder + "\\" + log_name + ".log"
-        fh = logging.FileHandler(logfile, mode='a')
-        fh.setLevel(logging.DEBUG)  # file level
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.INFO)  # console level: DEBUG\INFO
-        formatter = logging.Formatter("%(asctime)s - %(levelname)s: %(message)s")
-        fh.setFormatter(formatter)
-        ch.setFormatter(formatter)
-        logger.addHandler(fh)
-        logger.addHandler(ch)
-
-        # Entry of Test
-        # --------------------------------------------------------------------------------efuse lock
-        print ("\r\n" + "-" * 30 + "Efuse Lock" + r"-" * 30 + "\r\n")
-        str_efuse_prog_lock = efuse_prog_bit_lock(ser, time_out_queue)
-        if Err_timeout == str_efuse_prog_lock:
-            dict_results_summary["Test: efuse_lock"] = "fail"
-            str_efuse_check_result = ("Test <efuse_lock> TimeOut...")
-        elif str_efuse_prog_lock == "00":
-            str_efuse_check_result = ("Efuse Program Done Bit already 1, Check Complete!")
-        elif str_efuse_prog_lock == "01":
-            str_efuse_check_result = ("Efuse Program Done Bit original 0, Write Bit 1, Lock Complete!")
-        else:
-            str_efuse_check_result = ("Return Value Error : %s , Please Check..." % str_efuse_prog_lock)
-        logger.info(str_efuse_check_result)
-
-        if tdsb_voltage_detection_flag:
-            print ("\r\n" + "-" * 30 + "TDSB Voltage Detection" + r"-" * 30 + "\r\n")
-
-            # for tdsb initial charge
-            tdsb_return_value = dut_charge_voltage_detection(ser, logger, time_out_queue, 2, 0)
-            if Err_fail == tdsb_return_value:
-                logger.info("TDSB Voltage Detection Failed")
-                dict_results_summary["Test: tdsb_voltage_detection"] = "fail"
-            elif Err_timeout == tdsb_return_value:
-                logger.info("TDSB Voltage Detection TimeOut")
-                dict_results_summary["Test: tdsb_voltage_detection"] = "fail"
-            else:
-                logger.info("TDSB Voltage Detection passed")
-
-        # --------------------------------------------------------------------------------vendor id set
-        if vendor_id_enable:
-            print ("\r\n" + "-" * 30 + "Vendor ID Set" + r"-" * 30 + "\r\n")
-            vid_return_value = vendor_id_set(ser, vendor_id, time_out_queue)
-            if Err_fail == vid_return_value:
-                dict_results_summary["Test: vendor_id_set"] = "fail"
-                str_vendor_id_set_result = ("Test <vendor_id_set> Failed...")
-            elif Err_timeout == vid_return_value:
-                dict_results_summary["Test: vendor_id_set"] = "fail"
-                str_vendor_id_set_result = ("Test <vendor_id_set> TimeOut...")
-            else:
-                str_vendor_id_set_result = ("Set vendor id: %s completes." % vendor_id)
-            logger.info(str_vendor_id_set_result)
+def case_noise_floor(board_ctx):
+    board_config, logger = board_ctx.board_config, board_ctx.logger
+    print ("\r\n" + "-"*30 + "Calculate Noise Floor" + r"-"*30 + "\r\n")
+    nf_list = []
+    for d_i in range(board_config.nf_detection_times):
+        if d_i:
+            time.sleep(board_config.nf_sample_spacing)  # no rf state read: fixed spacing of the samples
+        value_of_nf = noise_floor_sample(board_ctx.ser, board_config.nf_sample_wait_max)
+        if value_of_nf >= 0:
+            results_store.measure_add("noise_floor_sample", value_of_nf, "sample_%d" % (d_i + 1))
+        if value_of_nf > 0:
+            nf_list.append(value_of_nf)
+        elif Err_timeout == value_of_nf:
+            logger.info("Test <noise_floor_calculate> TimeOut...")
+            break
 
-        # --------------------------------------------------------------------------------read fw version, id info
-        # read vendor id, chip code, module type, chip mmid
-        try:
-            print ("\r\n" + "-" * 30 + "Read ID Info" + r"-" * 30 + "\r\n")
-            str_vendor_id = vendor_id_get(ser, time_out_queue)
-            logger.info(r"Read Vendor_id: %s" % str_vendor_id)
-            str_chip_code = chip_code_get(ser, time_out_queue)
-            logger.info(r"Read Chip_code: %s" % str_chip_code)
-            str_module_type = module_type_get(ser, time_out_queue)
-            logger.info(r"Read Module_type: %s" % DictModuleType.setdefault(str_module_type, "Null"))
-            str_chip_mmid = chip_mmid_get(ser, time_out_queue)
-            logger.info(r"Read Chip_mmid: %s" % str_chip_mmid)
-        except Exception, excp_info:
-            logger.info(str(excp_info))
-
-        if read_fw_ver_flag:
-            print ("\r\n" + "-" * 30 + "Read FW Version" + r"-" * 30 + "\r\n")
-            str_fw_ver = read_fw_ver(ser, time_out_queue)
-            if Err_timeout == str_fw_ver:
-                dict_results_summary["Test: read_fw_version"] = "fail"
-                logger.info("Test <read_fw_version> TimeOut...")
+    if board_config.nf_detection_times == len(nf_list):
+        min_nf_value = min(nf_list)
+        if Err_ok == limit_check(board_config.limit_table, [("noise_floor", min_nf_value)], logger):
+            logger.info("Value of Noise Floor is %d" % min_nf_value)
+            return Err_ok
+        board_ctx.dict_results_summary["Test: noise_floor_calculate"] = "fail"
+        logger.info("Test <noise_floor_calculate> Failed...")
+    else:
+        board_ctx.dict_results_summary["Test: noise_floor_calculate"] = "fail"
+    return Err_fail
+
+
+def case_global_nid_set(board_ctx):
+    # set global nid for txrx and sen/csr, they are skipped when it fails
+    logger = board_ctx.logger
+    print ("\r\n" + "-" * 30 + "Global Nid Set" + r"-" * 30 + "\r\n")
+    return_nid_value = global_nid_set(board_ctx.ser, board_ctx.board_config.global_nid)
+    if int(0xff) == return_nid_value:
+        logger.info("Set global nid failed, please check.")
+    elif Err_timeout == return_nid_value:
+        logger.info("Set global nid TimeOut, please check.")
+    else:
+        logger.info("Set global nid to %d for communication test." % return_nid_value)
+        return Err_ok
+    board_ctx.dict_results_summary["Test: global_nid_set"] = "fail"
+    return Err_fail
+
+
+def case_txrx(board_ctx, each_phase):
+    logger, dict_results_summary = board_ctx.logger, board_ctx.dict_results_summary
+    print("\r\n" + "-" * 30 + ("Channel %s Test" % each_phase) + "-" * 30 + "\r\n")
+    logger.info("-* " * 20)
+    logger.info("Channel %s TXRX Loopback Test" % each_phase)
+    logger.info("-* " * 20)
+
+    return_result = txrx_process(DictPhase[each_phase], board_ctx.data_trans_queue, board_ctx.board_config.gold_ppm,
+                                 logger, board_ctx.board_config.limit_table, "phase_%s" % each_phase)
+    if Err_timeout == return_result:
+        dict_results_summary["Test: txrx_loopback_phase_%s" % each_phase] = "fail"
+        logger.info("Test <txrx_loopback_phase_%s> TimeOut..." % each_phase)
+    elif Err_fail == return_result:
+        dict_results_summary["Test: txrx_loopback_phase_%s" % each_phase] = "fail"
+        logger.info("Test <txrx_loopback_phase_%s> Failed..." % each_phase)
+    return return_result
+
+
+def case_flatness(board_ctx, each_phase, gpio_value):
+    # flatness detection tx psg sof 3 a, one gpio status of the filter
+    board_config, logger, filter_gpio_num = board_ctx.board_config, board_ctx.logger, board_ctx.filter_gpio_num
+    dict_results_summary = board_ctx.dict_results_summary
+    if 0 == gpio_value:
+        print("\r\n" + "-" * 30 + ("Channel %s Test" % each_phase) + "-" * 30 + "\r\n")
+        print
+        logger.info("-* " * 20)
+        logger.info("Channel %s Flatness Detection Test" % each_phase)
+        logger.info("-* " * 20)
+
+    print
+    if board_config.filter_type:  # fixed 700K filter: 0 / dynamic filter(700K/2M): 1
+        phase_filter_gpio_control(board_ctx.ser, gpio_value, filter_gpio_num, logger)
+
+    return_flatness_test = flatness_test(board_ctx.ser, each_phase, DictPhase[each_phase], board_ctx.board_lable,
+                                         gpio_value, logger, board_ctx.log_folder, board_config)
+
+    if isinstance(return_flatness_test, list):
+        var_value_of_csi_dump = return_flatness_test[1]
+
+        # differentiate band 32-120: 700K and 2M spectrogram
+        cur_dict_band_result = dict_filter_data_info[gpio_value]
+        cur_var_80_120 = cur_dict_band_result["80_120"].var
+        cur_avg_32_40 = cur_dict_band_result["32_40"].avg
+        cur_avg_40_80 = cur_dict_band_result["40_80"].avg
+        cur_avg_80_120 = cur_dict_band_result["80_120"].avg
+
+        measure_item = "phase_%s_gpio_%d" % (each_phase, gpio_value)
+        for band_name, band_result in cur_dict_band_result.items():
+            results_store.measure_add("band_%s_avg" % band_name, band_result.avg, measure_item)
+            results_store.measure_add("band_%s_var" % band_name, band_result.var, measure_item)
+        results_store.measure_add("csi_dump_var", var_value_of_csi_dump, measure_item)
+
+        band_rising = cur_avg_32_40 < cur_avg_40_80 < cur_avg_80_120
+        if 0 == gpio_value:  # differentiate 700K filter
+            band_delta_metric, filter_type_value = "filter_700k_band_delta", "700"
+        else:  # differentiate 2M filter
+            band_delta_metric, filter_type_value = "filter_2m_band_delta", "2000"
+        dict_filter_limit_result = measurement_limits.limit_evaluate(
+            board_config.limit_table, [(band_delta_metric, cur_avg_80_120 - cur_avg_32_40),
+                                       ("filter_band_var", cur_var_80_120)])
+        for limit_result in dict_filter_limit_result.itervalues():
+            results_store.measure_limit_add(limit_result, measure_item)
+        if not (band_rising and measurement_limits.limit_all_passed(dict_filter_limit_result)):
+            filter_type_value = "Unknown "
+
+        logger.info("GPIO %d, Status: %d, Filter Type is %sK" %
+                    (filter_gpio_num, gpio_value, filter_type_value))
+        logger.info("Variance of Flatness Test is %f" % var_value_of_csi_dump)
+
+        # results summary
+        logger_flatness_info = ''
+        if not board_config.filter_type:  # 0 == filter_type  # fixed 700K filter
+            if "700" == filter_type_value:
+                logger_flatness_info = r"Differentiate 700K Filter ===> PASS!!!!"
             else:
-                logger.info(("fw version", str_fw_ver))
-                # fw version check
-                fw_version_pattern = re.match(r"(\w+)-(\w+)-(\d+.\d+.\d+.\d+)", str_fw_ver)
-                if fw_version_pattern:
-                    device_name = DictModuleType[DictDeviceTypeNumMapping[device_type]]
-                    read_module_type_ver_str = fw_version_pattern.group(2)
-                    read_software_ver_str = fw_version_pattern.group(3)
-                    if (software_version == read_software_ver_str and
-                            read_module_type_ver_str.find(device_name) > 0):
-                        logger.info(r"Software version <%s> <%s> check complete!" %
-                                    (device_name,
-                                     software_version))
-                    else:
-                        logger.info(r"Software version <%s> <%s> mismatched, please check..." %
-                                    (device_name,
-                                     software_version))
-                        sys.exit()
+                logger_flatness_info = r"Differentiate 700K Filter ===> FAIL!!!!"
+        else:  # 1 == filter_type  # dynamic filter(700K/2M)
+            if 0 == gpio_value:
+                if "700" == filter_type_value:
+                    logger_flatness_info = r"Differentiate 700K Filter ===> PASS!!!!"
                 else:
-                    logger.info(r"Fw version format <%s> mismatched, please check..." % str_fw_ver)
-                    sys.exit()
-            print
-
-        if read_chip_id_flag:
-            for each_chip_info in list_chip_info:
-                logger.info(each_chip_info)
-
-        # --------------------------------------------------------------------------------Read Original Mac Address
-        if read_mac_address_flag:
-            print ("\r\n" + "-"*30 + "Read Original Mac Address" + r"-"*30 + "\r\n")
-            read_origin_ma_str = mac_addr_read(ser, time_out_queue)
-            if Err_timeout == read_origin_ma_str:
-                dict_results_summary["Test: read_mac_addr_1"] = "fail"
-                logger.info("Test <read_mac_addr> TimeOut...")
-            else:
-                logger.info("Original Mac Address %s" % read_origin_ma_str)
-            time.sleep(0.5)
-
-        # --------------------------------------------------------------------------------Burned Mac Address
-        if burned_mac_address_flag:
-            print ("\r\n" + "-" * 30 + "Burned and Read Mac Address" + r"-" * 30 + "\r\n")
-            # Burn Mac Address
-            burn_ma_str = mac_addr_burn(ser, str_mac_addr_burn, time_out_queue)
-            if Err_timeout == burn_ma_str:
-                dict_results_summary["Test: burn_mac_addr"] = "fail"
-                logger.info("Test <burn_mac_addr> TimeOut...")
-            else:
-                logger.info("Burned Mac Address %s" % burn_ma_str)
-            time.sleep(0.5)
-            # Read Mac Address
-            read_ma_str = mac_addr_read(ser, time_out_queue)
-            if Err_timeout == read_ma_str:
-                dict_results_summary["Test: read_mac_addr_2"] = "fail"
-                logger.info("Test <read_mac_addr> TimeOut...")
-            else:
-                logger.info("Read Mac Address %s" % read_ma_str)
-            time.sleep(0.5)
-
-        # --------------------------------------------------------------------------------noise floor calculate
-        if noise_floor_detection_flag:
-            print ("\r\n" + "-"*30 + "Calculate Noise Floor" + r"-"*30 + "\r\n")
-            nf_list = []
-            for d_i in range(nf_detection_times):
-                value_of_nf = calc_noise_floor(ser, time_out_queue)
-                time.sleep(0.4)
-                if value_of_nf > 0:
-                    nf_list.append(value_of_nf)
-                elif Err_timeout == value_of_nf:
-                    logger.info("Test <noise_floor_calculate> TimeOut...")
-                    break
-
-            if nf_detection_times == len(nf_list):
-                min_nf_value = min(nf_list)
-                if noise_floor_threshold >= min_nf_value:
-                    logger.info("Value of Noise Floor is %d" % min_nf_value)
+                    logger_flatness_info = r"Differentiate 700K Filter ===> FAIL!!!!"
+            elif 1 == gpio_value:
+                if "2000" == filter_type_value:
+                    logger_flatness_info = r"Differentiate 2M Filter ===> PASS!!!!"
                 else:
-                    logger.info("Value of Noise Floor(%f) is large than %f" % (min_nf_value, noise_floor_threshold))
-                    dict_results_summary["Test: noise_floor_calculate"] = "fail"
-                    logger.info("Test <noise_floor_calculate> Failed...")
+                    logger_flatness_info = r"Differentiate 2M Filter ===> FAIL!!!!"
+
+        return_value = Err_ok
+        if logger_flatness_info.find(r"FAIL") >= 0:
+            dict_results_summary["Test: gpio_%d_status_%d_flatness_detection_phase_%s" %
+                                 (filter_gpio_num, gpio_value, each_phase)] = "fail"
+            logger.info("Test <gpio_%d_status_%d_flatness_detection_phase_%s> Failed..." %
+                        (filter_gpio_num, gpio_value, each_phase))
+            return_value = Err_fail
+        logger.info(logger_flatness_info)
+        return return_value
+
+    elif Err_fail == return_flatness_test:
+        dict_results_summary["Test: gpio_%d_status_%d_flatness_detection_phase_%s" %
+                             (filter_gpio_num, gpio_value, each_phase)] = "fail"
+        logger.info("Test <gpio_%d_status_%d_flatness_detection_phase_%s> Failed..." %
+                    (filter_gpio_num, gpio_value, each_phase))
+    elif Err_timeout == return_flatness_test:
+        dict_results_summary["Test: gpio_%d_status_%d_flatness_detection_phase_%s" %
+                             (filter_gpio_num, gpio_value, each_phase)] = "fail"
+        logger.info("Test <gpio_%d_status_%d_flatness_detection_phase_%s> TimeOut..." %
+                    (filter_gpio_num, gpio_value, each_phase))
+    return return_flatness_test
+
+
+def case_spectrogram_submit(board_ctx):
+    spectrogram_render.spectrogram_render_submit()  # all phases in, draw while the other tests run
+    return Err_ok
+
+
+def case_sen_csr(board_ctx, each_phase, tmi_value, phase_first_flag):
+    # sen/csr tx sg sof 4 a, one tmi
+    board_config, logger = board_ctx.board_config, board_ctx.logger
+    dict_results_summary = board_ctx.dict_results_summary
+    csr_retry_cnt = 3
+    if phase_first_flag:
+        print("\r\n" + "-" * 30 + ("Channel %s Test" % each_phase) + "-" * 30 + "\r\n")
+        print
+        logger.info("-* " * 20)
+        logger.info("Channel %s Sensitivity and Communication Success Rate Detection Test" % each_phase)
+        logger.info("-* " * 20)
+
+    if 4 == tmi_value:
+        csr_metric = "tmi4_csr"
+    else:  # 18
+        csr_metric = "ext_tmi3_csr"
+    csr_threshold = board_config.limit_table[csr_metric].lower
+
+    return_value = Err_fail
+    for retry_i in range(csr_retry_cnt):
+        if retry_i:
+            step_timing.step_retry()
+            time.sleep(board_config.csr_retry_settle_time)  # no rf state read: fixed settle before a retry
+        logger.info("CSR Test %d time, Down %d dB Power: %s" %
+                    (retry_i + 1, board_config.phy_power_att, DictTmi[tmi_value]))
+        value_of_sen_csr = sen_csr_detection(board_ctx.ser, DictPhase[each_phase], tmi_value,
+                                             board_config.phy_power_att)
+        if Err_timeout == value_of_sen_csr:
+            dict_results_summary["Test: sensitivity_csr_phase_%s" % each_phase] = "fail"
+            logger.info("Test <sensitivity_csr_phase_%s> TimeOut..." % each_phase)
+            return_value = Err_timeout
+            break
+        csr_result = measurement_limits.limit_value_check(board_config.limit_table, csr_metric, value_of_sen_csr)
+        results_store.measure_limit_add(csr_result, "phase_%s_try_%d" % (each_phase, retry_i + 1))
+        if not csr_result.passed:
+            if csr_retry_cnt == retry_i + 1:
+                dict_results_summary["Test: sensitivity_csr_phase_%s: %d%% less than %d%%" %
+                                     (each_phase, value_of_sen_csr, csr_threshold)] = "fail"
             else:
-                dict_results_summary["Test: noise_floor_calculate"] = "fail"
+                logger.info("Test: sensitivity_csr_phase_%s: %d%% less than %d%%" %
+                            (each_phase, value_of_sen_csr, csr_threshold))
+        else:
+            logger.info("Sensitivity and Communication Success Rate is %d%%" % value_of_sen_csr)
+            return_value = Err_ok
+            break
+    print
+    return return_value
 
-        # --------------------------------------------------------------------------------set global nid for txrx
-        print ("\r\n" + "-" * 30 + "Global Nid Set" + r"-" * 30 + "\r\n")
-        return_nid_value = global_nid_set(ser, global_nid, time_out_queue)
-        if int(0xff) == return_nid_value:
-            logger.info("Set global nid failed, please check.")
-            sys.exit()
-        elif Err_timeout == return_nid_value:
-            logger.info("Set global nid TimeOut, please check.")
-            sys.exit()
+
+def case_led_control(board_ctx):
+    # Tx Rx LED lights on and out
+    print ("\r\n" + "-" * 30 + "Tx Rx LED Contorl" + r"-" * 30 + "\r\n")
+    return_value = led_control(board_ctx.ser, board_ctx.logger, board_ctx.board_config.led_gpio_wait_max)
+    return Err_ok if Err_ok == return_value else Err_fail
+
+
+def case_zero_cross(board_ctx):
+    logger = board_ctx.logger
+    print ("\r\n" + "-" * 30 + "Zero Cross Detection" + r"-" * 30 + "\r\n")
+
+    zc_return_value = zero_cross_detection(board_ctx.ser)
+    if not zc_return_value:
+        logger.info("Zero Cross Detection passed")
+    elif Err_timeout == zc_return_value:
+        logger.info("Zero Cross Detection TimeOut")
+        board_ctx.dict_results_summary["Test: zero_cross_detection"] = "fail"
+    elif Err_fail == zc_return_value:
+        logger.info("Zero Cross Detection Failed")
+        board_ctx.dict_results_summary["Test: zero_cross_detection"] = "fail"
+    return zc_return_value
+
+
+def case_channel_voltage(board_ctx):
+    logger = board_ctx.logger
+    print ("\r\n" + "-" * 30 + "Channel Voltage Detection" + r"-" * 30 + "\r\n")
+
+    cv_return_value = channel_voltage_detection(board_ctx.ser, logger, board_ctx.board_config.limit_table)
+    if Err_fail == cv_return_value:
+        logger.info("Channel Voltage Detection Failed")
+        board_ctx.dict_results_summary["Test: channel_volatge_detection"] = "fail"
+    elif Err_timeout == cv_return_value:
+        logger.info("Channel Voltage Detection TimeOut")
+        board_ctx.dict_results_summary["Test: channel_volatge_detection"] = "fail"
+    else:
+        logger.info("Channel Voltage Detection passed")
+    return cv_return_value
+
+
+def case_gpio_status(board_ctx):
+    logger = board_ctx.logger
+    print ("\r\n" + "-" * 30 + "GPIO Status Detection" + r"-" * 30 + "\r\n")
+
+    gpio_return_value = low_voltage_pin_status_detection(board_ctx.ser, logger, board_ctx.board_config.device_type)
+    if Err_fail == gpio_return_value:
+        logger.info("GPIO Status Detection Failed")
+        board_ctx.dict_results_summary["Test: gpio_status_detection"] = "fail"
+    elif Err_timeout == gpio_return_value:
+        logger.info("GPIO Status Detection TimeOut")
+        board_ctx.dict_results_summary["Test: gpio_status_detection"] = "fail"
+    else:
+        logger.info("GPIO Status Detection passed")
+        gpio_return_value = Err_ok
+    return gpio_return_value
+
+
+def case_tdsb_charge_collect(board_ctx):
+    logger = board_ctx.logger
+    print ("\r\n" + "-" * 30 + "TDSB Voltage Detection" + r"-" * 30 + "\r\n")
+
+    tdsb_return_value = dut_charge_voltage_detection(board_ctx.ser, logger, board_ctx.board_config)
+    if Err_fail == tdsb_return_value:
+        logger.info("TDSB Voltage Detection Failed")
+        board_ctx.dict_results_summary["Test: tdsb_voltage_detection"] = "fail"
+    elif Err_timeout == tdsb_return_value:
+        logger.info("TDSB Voltage Detection TimeOut")
+        board_ctx.dict_results_summary["Test: tdsb_voltage_detection"] = "fail"
+    else:
+        logger.info("TDSB Voltage Detection passed")
+    return tdsb_return_value
+
+
+def case_psram_mem(board_ctx):
+    print ("\r\n" + "-" * 30 + "Psram Mem Detection" + r"-" * 30 + "\r\n")
+    psram_check_return_val = psram_mem_check(board_ctx.ser, board_ctx.logger, board_ctx.board_config.power_hold_time)
+    if psram_check_return_val:
+        board_ctx.dict_results_summary["Test: psram_mem_detection"] = "fail"
+    return psram_check_return_val
+
+
+def case_ktj_gpio(board_ctx):
+    print ("\r\n" + "-" * 30 + "KTJ GPIO Detection" + r"-" * 30 + "\r\n")
+    ktj_gpio_check_return_val = ktj_dut_gpio_check(board_ctx.ser, board_ctx.logger)
+    if ktj_gpio_check_return_val:
+        board_ctx.dict_results_summary["Test: ktj_gpio_detection"] = "fail"
+    return ktj_gpio_check_return_val
+
+
+def case_ktj_channel_voltage(board_ctx):
+    print ("\r\n" + "-" * 30 + "KTJ Channnel Voltage Detection" + r"-" * 30 + "\r\n")
+    ktj_channel_voltage_check_return_val = ktj_dut_channel_voltage_check(board_ctx.ser, board_ctx.logger,
+                                                                         board_ctx.board_config.limit_table)
+    if ktj_channel_voltage_check_return_val:
+        board_ctx.dict_results_summary["Test: ktj_channel_voltage_detection"] = "fail"
+    return ktj_channel_voltage_check_return_val
+
+
+def case_step_call(plan_node):
+    # every plan node is a timed step, the command functions it runs nest in it
+    return step_timing.step_call(plan_node.name, "case", plan_node.func, *plan_node.args)
+
+
+def board_plan_build(board_ctx, dict_id_info):
+    # every enabled test case as a plan node, added in the original test order which is also the run priority
+    board_config = board_ctx.board_config
+    plan = board_plan.BoardPlan(dut_state=["test_mode"], node_call=case_step_call)
+    dut_node = {"requires_state": ["test_mode"]}
+
+    plan.node_add("efuse_lock", case_efuse_lock, (board_ctx,), **dut_node)
+    if board_config.tdsb_voltage_detection_flag:
+        plan.node_add("tdsb_charge_start", case_tdsb_charge_start, (board_ctx,), **dut_node)
+    if board_config.tdsb_voltage_detection_flag:
+        # collected at the first node boundary after the charge deadline, the other tests run while it charges
+        plan.node_add("tdsb_voltage_detection", case_tdsb_charge_collect, (board_ctx,),
+                      prerequisites=["tdsb_charge_start"], ready_time=tdsb_charge_ready_time, **dut_node)
+    if board_config.vendor_id_enable:
+        plan.node_add("vendor_id_set", case_vendor_id_set, (board_ctx,), **dut_node)
+    plan.node_add("id_info_read", case_id_info_read, (board_ctx, dict_id_info), **dut_node)
+    if board_config.burned_mac_address_flag:
+        plan.node_add("mac_addr_burn", case_mac_addr_burn, (board_ctx,), prerequisites=["id_info_read"], **dut_node)
+    if board_config.noise_floor_detection_flag:
+        plan.node_add("noise_floor", case_noise_floor, (board_ctx,), resources=["rf"],
+                      settle_time=board_config.nf_sample_spacing, **dut_node)
+    plan.node_add("global_nid_set", case_global_nid_set, (board_ctx,), provides_state=["nid_set"], fatal=True,
+                  **dut_node)
+
+    # the dut has no rf state read: an rf test keeps "rf" busy rf_settle_time after it, non rf tests run then
+    if board_config.tx_rx_loopback_detection_flag:
+        for each_phase in board_config.phase_list:
+            plan.node_add("txrx_loopback_phase_%s" % each_phase, case_txrx, (board_ctx, each_phase),
+                          requires_state=["test_mode", "nid_set"], resources=["rf"],
+                          settle_time=board_config.rf_settle_time)
+    if board_config.flatness_detection_flag:
+        flatness_node_list = []
+        for each_phase in board_config.phase_list:
+            for gpio_value in range(2 if board_config.filter_type else 1):  # fixed filter: gpio status 0 only
+                flatness_node_list.append(plan.node_add(
+                    "flatness_detection_phase_%s_gpio_status_%d" % (each_phase, gpio_value), case_flatness,
+                    (board_ctx, each_phase, gpio_value), resources=["rf", "gpio"],
+                    settle_time={"rf": board_config.rf_settle_time}, **dut_node).name)
+        plan.node_add("spectrogram_render_submit", case_spectrogram_submit, (board_ctx,),
+                      prerequisites=flatness_node_list)
+    if board_config.sen_csr_detection_flag:
+        tmi_list = []
+        if board_config.tmi4_csr_enable:
+            tmi_list.append(4)
+        if board_config.ext_tmi3_csr_enable:
+            tmi_list.append(18)
+        for each_phase in board_config.phase_list:
+            for tmi_value in tmi_list:
+                plan.node_add("sensitivity_csr_phase_%s_tmi_%d" % (each_phase, tmi_value), case_sen_csr,
+                              (board_ctx, each_phase, tmi_value, tmi_value == tmi_list[0]),
+                              requires_state=["test_mode", "nid_set"], resources=["rf"],
+                              settle_time=board_config.csr_retry_settle_time)
+
+    if board_config.led_control_flag:
+        plan.node_add("led_control", case_led_control, (board_ctx,), resources=["gpio"], **dut_node)
+    if board_config.zero_cross_detection_flag:
+        plan.node_add("zero_cross_detection", case_zero_cross, (board_ctx,), **dut_node)
+    if board_config.channel_voltage_detection_flag:
+        plan.node_add("channel_voltage_detection", case_channel_voltage, (board_ctx,), resources=["power_board"],
+                      **dut_node)
+    if board_config.gpio_status_detection_flag:
+        plan.node_add("gpio_status_detection", case_gpio_status, (board_ctx,), resources=["gpio", "power_board"],
+                      **dut_node)
+    if board_config.psram_mem_detection_flag and board_config.device_type in [2, 3]:
+        # only CCO has psram for this detection, memtest.bin is loaded over the test mode firmware
+        plan.node_add("psram_mem_detection", case_psram_mem, (board_ctx,), consumes_state=["test_mode"], **dut_node)
+    if board_config.ktj_gpio_check_enable:
+        plan.node_add("ktj_gpio_detection", case_ktj_gpio, (board_ctx,), resources=["gpio"], **dut_node)
+    if board_config.ktj_channel_voltage_check_enable:
+        plan.node_add("ktj_channel_voltage_detection", case_ktj_channel_voltage, (board_ctx,), **dut_node)
+    return plan
+
+
+def serial_port_open(sport_num, board_config):
+    # replaced by the replay transport of uart_trace.py
+    return serial.Serial(port=board_config.serial_port_format % sport_num, baudrate=board_config.baudrate_value,
+                         timeout=0.3)
+
+
+def board_test_run(sport_num, board_lable, board_config=None):
+    # full production sequence on one serial port, returns the results summary dict (empty: all pass)
+    # board_config: production_config.BoardConfig snapshot, the whole board runs with it
+    global cur_gain_cnt, dict_filter_data_info, dump_data_str, first_cur_gain, pre_charge_voltage
+    global board_result_record, pro_charge_voltage, ser, tdsb_charge_deadline, voltage_rise
+
+    if board_config is None:
+        board_config = production_config.config_snapshot_get()
+    board_time_start, board_result_record = monotonic_time(), None
+    results_store.board_record_start(time_stamp=time.time(), lot=board_config.csi_record_lot,
+                                     board_label=board_lable, sport_num=sport_num,
+                                     config_file=board_config.config_file)
+
+    data_trans_queue = Queue.Queue(maxsize=10)
+    init_str = "entry_sbl_cli"
+    base_str = "bootm fw_mode=1"
+    dict_filter_data_info = collections.OrderedDict()
+    dict_results_summary, dump_data_str = {}, ''
+    cur_gain_cnt, first_cur_gain, return_result, tdsb_charge_deadline = 0, None, None, None
+    dict_wait_record.clear()
+    step_timing.board_step_start()
+    pre_charge_voltage, pro_charge_voltage, voltage_rise = None, None, None
+
+    filter_gpio_num = int(DictFilterGpio[board_config.device_type])
+
+    first_board_flag = optional_import_time is None
+    optional_module_import(board_config.flatness_detection_flag)
+
+    time_stamp = time.strftime("%Y-%m-%d %X")
+    time_stamp = time_stamp.replace(" ", "-")
+    time_stamp = time_stamp.replace(":", "-")
+
+    log_folder = r".\log_production_test" + "\\" + board_lable + "_" + time_stamp
+    if not os.path.exists(log_folder):
+        os.makedirs(log_folder)
+
+    try:
+        ser = serial_port_open(sport_num, board_config)
+    except Exception, ser_info:
+        print str(ser_info)
+        board_test_abort("Error open Serial Port COM%s!!! Press <enter> to Close it and retry..." % sport_num)
+    print("Serial port COM%s opened, please press <RST> button on the chip..." % sport_num)
+    if board_config.uart_trace_enable:  # every byte on the line, replay with uart_trace.py
+        ser = uart_trace.TraceSerial(ser, log_folder + "\\" + board_lable + "_" + time_stamp + ".utrace")
+
+    if board_config.reset_mode == "1":  # soft reset
+        if board_config.reboot_method == "1":
+            print ("Power Reboot...")
+            power_down_up(ser, board_config.power_hold_time)
         else:
-            logger.info("Set global nid to %d for communication test." % return_nid_value)
-
-        for each_phase in phase_list:
-            phase_str = DictPhase[each_phase]
-            print("\r\n" + "-" * 30 + ("Channel %s Test" % each_phase) + "-" * 30 + "\r\n")
-        # --------------------------------------------------------------------------------Tx Rx Loopback Test
-            if tx_rx_loopback_detection_flag:
-                logger.info("-* " * 20)
-                logger.info("Channel %s TXRX Loopback Test" % each_phase)
-                logger.info("-* " * 20)
-
-                return_result = txrx_process(phase_str, data_trans_queue, gold_ppm, logger, time_out_queue)
-                if Err_timeout == return_result:
-                    dict_results_summary["Test: txrx_loopback_phase_%s" % each_phase] = "fail"
-                    logger.info("Test <txrx_loopback_phase_%s> TimeOut..." % each_phase)
-                elif Err_fail == return_result:
-                    dict_results_summary["Test: txrx_loopback_phase_%s" % each_phase] = "fail"
-                    logger.info("Test <txrx_loopback_phase_%s> Failed..." % each_phase)
-                time.sleep(1)
-
-        for each_phase in phase_list:
-            phase_str = DictPhase[each_phase]
-            print("\r\n" + "-" * 30 + ("Channel %s Test" % each_phase) + "-" * 30 + "\r\n")
-        # ---------------------------------------------------------------------------flatness detection tx psg sof 3 a
-            if flatness_detection_flag:
-                print
-                logger.info("-* " * 20)
-                logger.info("Channel %s Flatness Detection Test" % each_phase)
-                logger.info("-* " * 20)
-
-                for gpio_value in range(2):  # 0 or 1
-                    print
-                    if filter_type:  # fixed 700K filter: 0 / dynamic filter(700K/2M): 1
-                        phase_filter_gpio_control(ser, gpio_value, filter_gpio_num, logger)
-
-                    return_flatness_test = flatness_test(ser, each_phase, phase_str, board_lable,
-                                                         gpio_value, logger, loop_times,
-                                                         time_out_queue, log_folder)
-
-                    if isinstance(return_flatness_test, list):
-                        var_value_of_csi_dump = return_flatness_test[1]
-
-                        # differentiate band 32-120: 700K and 2M spectrogram
-                        cur_filter_info_tuple = dict_filter_data_info[gpio_value]
-                        cur_var_80_120, cur_avg_32_40, cur_avg_40_80, cur_avg_80_120 = cur_filter_info_tuple
-
-                        if 0 == gpio_value:  # differentiate 700K filter
-                            if ((hpf_700k_threshold <= cur_avg_80_120 - cur_avg_32_40 <= hpf_2m_threshold) and
-                                    (hpf_flat_threshold >= cur_var_80_120) and
-                                    (cur_avg_32_40 < cur_avg_40_80 < cur_avg_80_120)):
-                                filter_type_value = "700"
-                            else:
-                                filter_type_value = "Unknown "
-
-                        else:  # differentiate 2M filter
-                            if ((hpf_2m_threshold <= cur_avg_80_120 - cur_avg_32_40) and
-                                    (hpf_flat_threshold >= cur_var_80_120) and
-                                    (cur_avg_32_40 < cur_avg_40_80 < cur_avg_80_120)):
-                                filter_type_value = "2000"
-                            else:
-                                filter_type_value = "Unknown "
-
-                        logger.info("GPIO %d, Status: %d, Filter Type is %sK" %
-                                    (filter_gpio_num, gpio_value, filter_type_value))
-                        logger.info("Variance of Flatness Test is %f" % var_value_of_csi_dump)
-
-                        # results summary
-                        logger_flatness_info = ''
-                        if not filter_type:  # 0 == filter_type  # fixed 700K filter
-                            if "700" == filter_type_value:
-                                logger_flatness_info = r"Differentiate 700K Filter ===> PASS!!!!"
-                            else:
-                                logger_flatness_info = r"Differentiate 700K Filter ===> FAIL!!!!"
-                        else:  # 1 == filter_type  # dynamic filter(700K/2M)
-                            if 0 == gpio_value:
-                                if "700" == filter_type_value:
-                                    logger_flatness_info = r"Differentiate 700K Filter ===> PASS!!!!"
-                                else:
-                                    logger_flatness_info = r"Differentiate 700K Filter ===> FAIL!!!!"
-                            elif 1 == gpio_value:
-                                if "2000" == filter_type_value:
-                                    logger_flatness_info = r"Differentiate 2M Filter ===> PASS!!!!"
-                                else:
-                                    logger_flatness_info = r"Differentiate 2M Filter ===> FAIL!!!!"
-
-                        if logger_flatness_info.find(r"FAIL") >= 0:
-                            dict_results_summary["Test: gpio_%d_status_%d_flatness_detection_phase_%s" %
-                                                 (filter_gpio_num, gpio_value, each_phase)] = "fail"
-                            logger.info("Test <gpio_%d_status_%d_flatness_detection_phase_%s> Failed..." %
-                                        (filter_gpio_num, gpio_value, each_phase))
-                        logger.info(logger_flatness_info)
-
-                    elif Err_fail == return_flatness_test:
-                        dict_results_summary["Test: gpio_%d_status_%d_flatness_detection_phase_%s" %
-                                             (filter_gpio_num, gpio_value, each_phase)] = "fail"
-                        logger.info("Test <gpio_%d_status_%d_flatness_detection_phase_%s> Failed..." %
-                                    (filter_gpio_num, gpio_value, each_phase))
-                    elif Err_timeout == return_flatness_test:
-                        dict_results_summary["Test: gpio_%d_status_%d_flatness_detection_phase_%s" %
-                                             (filter_gpio_num, gpio_value, each_phase)] = "fail"
-                        logger.info("Test <gpio_%d_status_%d_flatness_detection_phase_%s> TimeOut..." %
-                                    (filter_gpio_num, gpio_value, each_phase))
-                    else:
-                        pass
-
-                    if not filter_type:  # Only test once when fixed filter
-                        break
-                    time.sleep(1)
-
-        for each_phase in phase_list:
-            tmi_list = []
-            phase_str = DictPhase[each_phase]
-            print("\r\n" + "-" * 30 + ("Channel %s Test" % each_phase) + "-" * 30 + "\r\n")
-        # --------------------------------------------------------------------------------sen/csr tx sg sof 4 a
-            if sen_csr_detection_flag:
-                print
-                logger.info("-* " * 20)
-                logger.info("Channel %s Sensitivity and Communication Success Rate Detection Test" % each_phase)
-                logger.info("-* " * 20)
-
-                if tmi4_csr_enable:
-                    tmi_list.append(4)
-                if ext_tmi3_csr_enable:
-                    tmi_list.append(18)
-
-                for tmi_value in tmi_list:
-                    if 4 == tmi_value:
-                        csr_threshold = tmi4_csr_threshold
-                    elif 18 == tmi_value:
-                        csr_threshold = ext_tmi3_csr_threshold
-
-                    for retry_i in range(csr_retry_cnt):
-                        logger.info("CSR Test %d time, Down %d dB Power: %s" %
-                                    (retry_i + 1, phy_power_att, DictTmi[tmi_value]))
-                        time.sleep(0.5)
-                        value_of_sen_csr = sen_csr_detection(ser, phase_str, tmi_value, phy_power_att, time_out_queue)
-                        if Err_timeout == value_of_sen_csr:
-                            dict_results_summary["Test: sensitivity_csr_phase_%s" % each_phase] = "fail"
-                            logger.info("Test <sensitivity_csr_phase_%s> TimeOut..." % each_phase)
-                            break
-                        elif csr_threshold > value_of_sen_csr:
-                            if csr_retry_cnt == retry_i + 1:
-                                dict_results_summary["Test: sensitivity_csr_phase_%s: %d%% less than %d%%" %
-                                                     (each_phase, value_of_sen_csr, csr_threshold)] = "fail"
-                            else:
-                                logger.info("Test: sensitivity_csr_phase_%s: %d%% less than %d%%" %
-                                            (each_phase, value_of_sen_csr, csr_threshold))
-                        else:
-                            logger.info("Sensitivity and Communication Success Rate is %d%%" % value_of_sen_csr)
-                            break
-                    print
-
-        # --------------------------------------------------------------------------------Tx Rx LED lights on and out
-        if led_control_flag:
-            print ("\r\n" + "-" * 30 + "Tx Rx LED Contorl" + r"-" * 30 + "\r\n")
-            led_control(ser, logger)
-
-        # --------------------------------------------------------------------------------zero cross detection
-        if zero_cross_detection_flag:
-            print ("\r\n" + "-" * 30 + "Zero Cross Detection" + r"-" * 30 + "\r\n")
-
-            zc_return_value = zero_cross_detection(ser, time_out_queue)
-            if not zc_return_value:
-                logger.info("Zero Cross Detection passed")
-            elif Err_timeout == zc_return_value:
-                logger.info("Zero Cross Detection TimeOut")
-                dict_results_summary["Test: zero_cross_detection"] = "fail"
-            elif Err_fail == zc_return_value:
-                logger.info("Zero Cross Detection Failed")
-                dict_results_summary["Test: zero_cross_detection"] = "fail"
-
-        # --------------------------------------------------------------------------------channel voltage detection
-        if channel_voltage_detection_flag:
-            print ("\r\n" + "-" * 30 + "Channel Voltage Detection" + r"-" * 30 + "\r\n")
-
-            cv_return_value = channel_voltage_detection(ser, logger, time_out_queue)
-            if Err_fail == cv_return_value:
-                logger.info("Channel Voltage Detection Failed")
-                dict_results_summary["Test: channel_volatge_detection"] = "fail"
-            elif Err_timeout == cv_return_value:
-                logger.info("Channel Voltage Detection TimeOut")
-                dict_results_summary["Test: channel_volatge_detection"] = "fail"
-            else:
-                logger.info("Channel Voltage Detection passed")
-
-        # --------------------------------------------------------------------------------gpio status detection
-        if gpio_status_detection_flag:
-            print ("\r\n" + "-" * 30 + "GPIO Status Detection" + r"-" * 30 + "\r\n")
-
-            gpio_return_value = low_voltage_pin_status_detection(ser, logger)
-            if Err_fail == gpio_return_value:
-                logger.info("GPIO Status Detection Failed")
-                dict_results_summary["Test: gpio_status_detection"] = "fail"
-            elif Err_timeout == gpio_return_value:
-                logger.info("GPIO Status Detection TimeOut")
-                dict_results_summary["Test: gpio_status_detection"] = "fail"
-            else:
-                logger.info("GPIO Status Detection passed")
-
-        # --------------------------------------------------------------------------------tdsb voltage detection
-        if tdsb_voltage_detection_flag:
-            print ("\r\n" + "-" * 30 + "TDSB Voltage Detection" + r"-" * 30 + "\r\n")
-
-            tdsb_return_value = dut_charge_voltage_detection(ser, logger, time_out_queue)
-            if Err_fail == tdsb_return_value:
-                logger.info("TDSB Voltage Detection Failed")
-                dict_results_summary["Test: tdsb_voltage_detection"] = "fail"
-            elif Err_timeout == tdsb_return_value:
-                logger.info("TDSB Voltage Detection TimeOut")
-                dict_results_summary["Test: tdsb_voltage_detection"] = "fail"
-            else:
-                logger.info("TDSB Voltage Detection passed")
-
-        # --------------------------------------------------------------------------------Psram Mem detection
-        if psram_mem_detection_flag:
-            print ("\r\n" + "-" * 30 + "Psram Mem Detection" + r"-" * 30 + "\r\n")
-            if device_type in [2, 3]:  # only CCO has psram for this detection
-                psram_check_return_val = psram_mem_check(ser, time_out_queue, logger)
-                if psram_check_return_val:
-                    dict_results_summary["Test: psram_mem_detection"] = "fail"
-        
-        # --------------------------------------------------------------------------------KTJ dut detection
-        if ktj_gpio_check_enable:
-            print ("\r\n" + "-" * 30 + "KTJ GPIO Detection" + r"-" * 30 + "\r\n")
-            ktj_gpio_check_return_val = ktj_dut_gpio_check(ser, time_out_queue, logger)
-            if ktj_gpio_check_return_val:
-                dict_results_summary["Test: ktj_gpio_detection"] = "fail"
-
-        if ktj_channel_voltage_check_enable:
-            print ("\r\n" + "-" * 30 + "KTJ Channnel Voltage Detection" + r"-" * 30 + "\r\n")
-            ktj_channel_voltage_check_return_val = ktj_dut_channel_voltage_check(ser, time_out_queue, logger)
-            if ktj_channel_voltage_check_return_val:
-                dict_results_summary["Test: ktj_channel_voltage_detection"] = "fail"
-
-        print ("\r\n" + "#" * 100 + "\r\n")
-        print ("#" * 4 + " " * 40 + r"Test Summary" + " " * 40 + "#" * 4)
-        print ("\r\n" + "#" * 100)
-        if not dict_results_summary:
-            logger.info("Pass: Production Test all pass!")
-            pass_printer()
+            print ("Soft Reset...")
+            rst_low_high(ser, board_config.power_hold_time)
+    elif board_config.reset_mode == "0":  # hard reset
+        print ("Hard Reset, Please Press <RST> Button On The Chip To Continue The Operation...")
+    else:
+        board_test_abort("Please specified the reset mode...<enter> to exit!")
+
+    mode_str = base_str + '\n'
+    return_result = enter_test_mode(ser, init_str, mode_str)
+    if return_result:
+        board_test_abort("TimeOut Error: Enter Test Mode Failed...<enter> to exit!")
+
+    # --------------------------------------------------------------------------------read chip id and id info
+    dict_id_info = id_info_batch_read(ser, id_info_name_list_get(board_config))
+    list_chip_info = dict_id_info["chip_info"]
+    if isinstance(list_chip_info, int):  # Err code returned
+        sys.exit()
+    chip_type_str = list_chip_info[0][1]  # "chip type", ****)
+    chip_id_str = list_chip_info[1][1]  # "chip id", ****)
+    results_store.board_info_set(chip_id=chip_id_str, chip_type=chip_type_str)
+
+    log_name = board_lable + "_" + chip_id_str + "_" + chip_type_str + "_" + time_stamp
+    if board_config.csi_raw_data_mode:
+        csi_dump_record.csi_record_open(csi_dump_record.csi_record_path_get(board_config.csi_record_lot, sport_num),
+                                        board_lable, chip_id_str)
+    logger = logging.getLogger(sport_num)
+    log_level = logging.DEBUG if board_config.log_debug_enable else logging.INFO
+    logger.setLevel(log_level)  # logging level: debug < info < warning < error < critical
+    logfile = log_folder + "\\" + log_name + ".log"
+    fh = logging.FileHandler(logfile, mode='a', delay=True)
+    fh.setLevel(log_level)  # file level
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)  # console level: DEBUG\INFO
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s: %(message)s")
+    fh.setFormatter(formatter)
+    ch.setFormatter(formatter)
+    log_handler = log_writer.QueueHandler([fh, ch])  # file and console written by the log writer thread
+    logger.addHandler(log_handler)
+    if first_board_flag:
+        logger.debug("Startup time: %.3fs to first board log, optional imports (numpy: %s) %.3fs" %
+                     (time.time() - time_script_start, np is not None, optional_import_time))
+
+    # Entry of Test
+    board_ctx = BoardContext(sport_num, board_lable, board_config, ser, logger, log_folder, filter_gpio_num,
+                             data_trans_queue, dict_results_summary)
+    plan = board_plan_build(board_ctx, dict_id_info)
+
+    def plan_node_skip(plan_node):
+        dict_results_summary["Test: %s" % plan_node.name] = "skip"
+        logger.info("Test <%s> skipped, prerequisite or dut state not met" % plan_node.name)
+
+    plan.run(plan_node_skip)
+    run_node_list = [plan_node for plan_node in plan.node_list if plan_node.time_start is not None]
+    for plan_node in sorted(run_node_list, key=lambda run_node: run_node.time_start):  # in run order
+        logger.debug("Test plan node %s: %s, %.3fs", plan_node.name, plan_node.status, plan_node.time_cost)
+    wait_record_log(logger)
+    step_timing.board_step_write(log_folder + "\\" + log_name + "_timing.csv")  # per step breakdown
+
+    spectrogram_render.spectrogram_render_flush(logger)
+
+    log_handler.flush()  # board log on the console before the summary
+    print ("\r\n" + "#" * 100 + "\r\n")
+    print ("#" * 4 + " " * 40 + r"Test Summary" + " " * 40 + "#" * 4)
+    print ("\r\n" + "#" * 100)
+    if not dict_results_summary:
+        logger.info("Pass: Production Test all pass!")
+        pass_printer()
+    else:
+        logger.info("Fail: Production Test fail!")
+        fail_printer()
+        for key_str in dict_results_summary.keys():
+            logger.info("   >>> %s : %s" % (key_str, dict_results_summary[key_str]))
+
+    print
+    log_handler.close()
+    logger.removeHandler(log_handler)
+    serial_dispatcher_stop(ser)
+    ser.close()
+
+    results_store.board_info_set(passed=int(not dict_results_summary), time_cost=monotonic_time() - board_time_start)
+    board_result_record = results_store.board_record_get(
+        [(plan_node.name, plan_node.status, plan_node.time_cost) for plan_node in plan.node_list],
+        dict_results_summary, step_timing.board_step_list)
+    return dict_results_summary
+
+
+def board_result_store(board_config, board_record_list):
+    # boards of a station round in one transaction, aborted boards (None) have no record
+    board_record_list = [board_record for board_record in board_record_list if board_record is not None]
+    if not board_config.results_db_file or not board_record_list:
+        return
+    try:
+        board_id_list = results_store.board_record_batch_write(board_config.results_db_file, board_record_list)
+    except results_store.StoreError, e_info:
+        print ("Results database %s: %s, %d boards not stored" % (board_config.results_db_file, str(e_info),
+                                                                 len(board_record_list)))
+        return
+    for board_record, board_id in zip(board_record_list, board_id_list):
+        if isinstance(board_id, results_store.StoreError):
+            print ("Results database %s: board %s not stored, %s" % (board_config.results_db_file,
+                                                                    board_record.board_info.get("board_label"),
+                                                                    str(board_id)))
+
+
+def station_worker(sport_num, board_lable, board_config, result_queue):
+    signal.signal(signal.SIGINT, signal_exit)
+    signal.signal(signal.SIGTERM, signal_exit)
+    try:
+        dict_results_summary = board_test_run(sport_num, board_lable, board_config)
+    except SystemExit:
+        dict_results_summary = Err_fail
+    except Exception, excp_info:
+        print ("COM%s test aborted: %s" % (sport_num, str(excp_info)))
+        dict_results_summary = Err_fail
+    result_queue.put((sport_num, dict_results_summary, list(step_timing.board_step_list), board_result_record))
+
+
+def station_test_run(sport_num_list, dict_board_lable, board_config):
+    # one process per port: each dut gets its own serial port, module state, logger and log folder
+    result_queue = multiprocessing.Queue()
+    worker_list = []
+    for sport_num in sport_num_list:
+        worker = multiprocessing.Process(target=station_worker, name="station_com%s" % sport_num,
+                                         args=(sport_num, dict_board_lable[sport_num], board_config, result_queue))
+        worker.start()
+        worker_list.append(worker)
+
+    dict_station_summary = collections.OrderedDict((sport_num, Err_fail) for sport_num in sport_num_list)
+    board_record_list = []
+    for _ in worker_list:
+        sport_num, dict_results_summary, step_list, board_record = result_queue.get()
+        dict_station_summary[sport_num] = dict_results_summary
+        step_timing.station_step_add(step_list)
+        board_record_list.append(board_record)
+    for worker in worker_list:
+        worker.join()
+    board_result_store(board_config, board_record_list)
+
+    print ("\r\n" + "#" * 100 + "\r\n")
+    print ("#" * 4 + " " * 39 + r"Station Summary" + " " * 38 + "#" * 4)
+    print ("\r\n" + "#" * 100)
+    for sport_num, dict_results_summary in dict_station_summary.items():
+        if isinstance(dict_results_summary, int):
+            print ("   >>> COM%s <%s> : aborted" % (sport_num, dict_board_lable[sport_num]))
+        elif not dict_results_summary:
+            print ("   >>> COM%s <%s> : pass" % (sport_num, dict_board_lable[sport_num]))
         else:
-            logger.info("Fail: Production Test fail!")
-            fail_printer()
+            print ("   >>> COM%s <%s> : fail" % (sport_num, dict_board_lable[sport_num]))
             for key_str in dict_results_summary.keys():
-                logger.info("   >>> %s : %s" % (key_str, dict_results_summary[key_str]))
+                print ("         %s : %s" % (key_str, dict_results_summary[key_str]))
+    print
+    return dict_station_summary
 
-        print
-        fh.close()
-        ch.close()
-        logger.removeHandler(fh)
-        logger.removeHandler(ch)
-        ser.close()
+
+def station_timing_report(summary_file=r".\log_production_test\station_step_timing.csv"):
+    # p50 / p95 of the last boards per step, slowest steps on the console, all of them in summary_file
+    step_summary_list = step_timing.station_step_summary()
+    if not step_summary_list:
+        return
+    if os.path.exists(os.path.dirname(summary_file)):
+        step_timing.station_step_write(summary_file)
+    print ("Slowest steps of the last %d boards (p50 / p95):" % max(each_summary[1] for each_summary in
+                                                                    step_summary_list))
+    for step, board_cnt, p50_time, p95_time in step_summary_list[:5]:
+        print ("   >>> %s : %.3fs / %.3fs" % (step, p50_time, p95_time))
+    print
+
+
+if __name__ == '__main__':
+
+    loop_times = 0
+    dict_board_lable = {}
+    main_board_config = None
+
+    while 1:
+
+        signal.signal(signal.SIGINT, signal_exit)
+        signal.signal(signal.SIGTERM, signal_exit)
+
+        # parsed again only when the file changed since the last board
+        try:
+            cur_board_config = production_config.config_snapshot_get(r"config_production_test.ini")
+        except production_config.ConfigError, config_info:
+            if main_board_config is None:
+                print ("Config Error: %s" % str(config_info))
+                sys.exit()
+            print ("Config Error: %s, previous config kept." % str(config_info))
+            cur_board_config = main_board_config
+        if main_board_config is not None and cur_board_config is not main_board_config:
+            print ("Config file changed, reloaded.")
+        main_board_config = cur_board_config
+        sport_num_list = main_board_config.sport_num_list  # single port, eg. 47 / station mode, eg. 47, 48, 49
+        label_enable = main_board_config.label_enable
+        loop_mode = main_board_config.loop_mode
+
+        if 1 <= loop_times and 2 == loop_mode:  # loop mode only enable 1st time label here
+            pass
+        else:
+            for sport_num in sport_num_list:
+                if label_enable and 1 == len(sport_num_list):
+                    dict_board_lable[sport_num] = raw_input("Test starts...\nPlease input board label: ")
+                elif label_enable:
+                    dict_board_lable[sport_num] = raw_input("Test starts...\nPlease input board label of COM%s: " %
+                                                            sport_num)
+                elif 1 == len(sport_num_list):
+                    dict_board_lable[sport_num] = "test"
+                else:
+                    dict_board_lable[sport_num] = "test_com" + sport_num
+
+        if 1 == len(sport_num_list):
+            board_test_run(sport_num_list[0], dict_board_lable[sport_num_list[0]], main_board_config)
+            step_timing.station_step_add(step_timing.board_step_list)
+            board_result_store(main_board_config, [board_result_record])
+        else:
+            station_test_run(sport_num_list, dict_board_lable, main_board_config)
+        station_timing_report()
 
         if 1 == loop_mode:
             raw_input("Test completes...\nPress <Enter> to continue and <Ctrl Z + Ctrl C> + <Enter> to exit...\r\n")
-            plt.clf()
-            plt.close()
             loop_times += 1
         elif 2 == loop_mode:
-            if label_enable:
-                board_lable = raw_input("Test starts...\nPlease input board label: ")
-            else:
-                board_lable = "test"
-            plt.clf()
-            plt.close()
+            for sport_num in sport_num_list:
+                if label_enable and 1 == len(sport_num_list):
+                    dict_board_lable[sport_num] = raw_input("Test starts...\nPlease input board label: ")
+                elif label_enable:
+                    dict_board_lable[sport_num] = raw_input("Test starts...\nPlease input board label of COM%s: " %
+                                                            sport_num)
             loop_times += 1
             print ("   ------------>>>   Loop time %d...\n" % loop_times)
         elif 3 == loop_mode:
-            plt.clf()
-            plt.close()
+            spectrogram_render.spectrogram_render_close()
             break
         else:
-            plt.clf()
-            plt.close()
+            spectrogram_render.spectrogram_render_close()
             print ("Error loop mode, please check...\n")
             sys.exit()
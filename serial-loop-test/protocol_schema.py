@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Declarative schema of the production test protocol.
+# frame: 2323 | addr 12B | module id u16 | crc u16 | message id u32 | length u32 | payload | 4040
+# dut (module 3) payload: cmd id u16 | total len u16 | data len u16 | data
+# power board (module 4) payload: data
+# Every message lists its request data fields and response data fields, encoders and decoders are
+# generated once at import as precompiled struct.Struct objects.
+
+import binascii
+import collections
+import struct
+
+FrameHead = struct.Struct("<2s12sHHII")  # 2323 | addr 12B | module id | crc | message id | length
+CommandDataHead = struct.Struct("<HHH")  # cmd id | total len | data len
+frame_tail = "\x40\x40"
+
+# request field: (name, struct format, constant value or None for a call parameter)
+# response field: (name, struct format) or (name, struct format, [(bit field name, bit width, signed), ...]),
+#                 bit fields are packed from the LSB, the container field itself is not in the record
+MessageSchema = collections.namedtuple("MessageSchema", ["name", "module_id", "msg_id", "cmd_id", "request",
+                                                         "rsp_cmd_id", "response", "rsp_len_check"])
+
+ProtocolSchema = collections.OrderedDict()  # message name -> MessageSchema
+
+
+def message_define(name, module_id, msg_id, cmd_id=None, request=(), response=None, rsp_cmd_id=None,
+                   rsp_len_check=True):
+    # request None: variable length data given to CommandSpec.build_data()
+    # response None: no fixed layout, the caller handles the raw data
+    ProtocolSchema[name] = MessageSchema(name, module_id, msg_id, cmd_id, request,
+                                         cmd_id if rsp_cmd_id is None else rsp_cmd_id, response, rsp_len_check)
+
+
+# ---------------------------------------------------------------------------------------------power board
+message_define("power_down", 4, 0x00)
+message_define("power_up", 4, 0x01)
+message_define("rst_high", 4, 0x03)
+message_define("rst_low", 4, 0x04)
+message_define("channel_voltage_get", 4, 0x0a, rsp_cmd_id=0x10,
+               response=[("ch0_adc_12v_mv", "H"), ("ch1_adc_3_3v_mv", "H"),
+                         ("ch2_adc_1_2v_mv", "H"), ("ch3_adc_5v_mv", "H")])
+message_define("low_voltage_pin_set", 4, 0x0b, rsp_cmd_id=0x0b,
+               request=[("device_type", "B", None), ("level", "B", None)],
+               response=[("device_type", "B"), ("level", "B")])
+message_define("low_voltage_pin_get", 4, 0x0c, rsp_cmd_id=0x0c,
+               request=[("gpio_num", "B", None), ("gpio_port", "B", None)],
+               response=[("level", "B")])
+
+# ---------------------------------------------------------------------------------------------dut
+message_define("reg_read", 3, 0x02, 0x02,
+               request=[("reg_addr", "I", None), ("read_len", "H", 4)],
+               response=[("reg_value", "I")])
+message_define("dtest_txrx", 3, 0x04, 0x04,
+               request=[("phase", "B", None), ("dtest_param", "8s", "\x10\x01\x00\x02\x00\x00\x00\x10"),
+                        ("gold_ppm", "h", None)],
+               response=[("w_character", "B"), ("q_character", "B"), ("accurate_indication", "B"),
+                         ("tx_gain", "B"), ("tx_adc_power", "B"), ("tx_dc", "b"), ("tx_ppm", "h"),
+                         ("tx_snr", "b"), ("rx_phase", "B"), ("rx_gain", "B"), ("rx_adc_power", "B"),
+                         ("rx_dc_byte", "B", [("rx_dc", 5, True), ("reserver", 3, True)]),
+                         ("rx_ppm", "b"), ("rx_snr", "b"), ("dut_real_ppm", "h")],
+               rsp_len_check=False)
+message_define("dtest_flatness", 3, 0x04, 0x04,
+               request=[("phase", "B", None), ("dtest_param", "8s", "\x10\x01\x00\x03\x00\x00\x00\x10")])
+message_define("dtest_sen_csr", 3, 0x04, 0x04,
+               request=[("phase", "B", None), ("dtest_param", "7s", "\x10\x01\x00\x04\x00\x00\x00"),
+                        ("tmi", "B", None), ("power_att", "B", None)],
+               response=[("csr", "B")])
+message_define("noise_floor_scan", 3, 0x0a, 0x0a,
+               request=[("scan_start", "B", 0x08), ("scan_end", "B", 0x0e)],
+               response=[("noise_floor", "B")])
+message_define("gpio_level_set", 3, 0x21, 0x21,
+               request=[("gpio_num", "B", None), ("level", "B", None)],
+               response=[("gpio_num", "B"), ("level", "B")])
+message_define("gpio_level_get", 3, 0x22, 0x22, request=None)  # gpio num list, response: (gpio num, level) pairs
+message_define("chip_info_get", 3, 0x25, 0x25,
+               response=[("mac_addr_1", "B"), ("mac_addr_2", "B"), ("mac_addr_3", "B"),
+                         ("ver_byte", "B", [("ver_pkg_flash", 1, False), ("ver_pkg_lic", 1, False),
+                                            ("ver_pkg_bumping", 2, False), ("ver_reserved", 4, False)]),
+                         ("wafer_byte", "B", [("ver_wafer", 4, False), ("not_used_4bits", 4, False)])])
+message_define("fw_ver_get", 3, 0x26, 0x26)  # response: version string
+message_define("mac_addr_burn", 3, 0x27, 0x27,
+               request=[("mac_addr", "6s", None)],
+               response=[("mac_addr", "6s")])
+message_define("mac_addr_get", 3, 0x2b, 0x2b, response=[("mac_addr", "6s")])
+message_define("efuse_prog_bit_lock", 3, 0x2d, 0x2d, response=[("lock_status", "B")])
+message_define("module_type_get", 3, 0x30, 0x30, response=[("module_type", "B")])
+message_define("vendor_id_set", 3, 0x31, 0x31,
+               request=[("vendor_id", "2s", None)],
+               response=[("result", "B")])
+message_define("chip_code_get", 3, 0x33, 0x33, response=[("chip_code", "2s")])
+message_define("global_nid_set", 3, 0x35, 0x35,
+               request=[("nid", "B", None)],
+               response=[("nid", "B")])
+message_define("vendor_id_get", 3, 0x37, 0x37, response=[("vendor_id", "2s")])
+message_define("chip_mmid_get", 3, 0x38, 0x38, response=[("mmid", "24s")])
+message_define("zero_cross_get", 3, 0x39, 0x39, response=[("zero_cross", "B")])
+message_define("gpio_rst_enable", 3, 0x3a, 0x3a,
+               request=[("enable", "B", None)],  # 0: disable, 1: enable
+               response=[("enable", "B")])
+message_define("tdsb_charge_voltage_get", 3, 0x3b, 0x3b,
+               request=[("charge_mode", "B", None), ("charge_timespan", "B", None)],
+               response=[("voltage", "i"), ("charge_status", "B")])
+message_define("ktj_adc_voltage_get", 3, 0x42, 0x42,
+               request=[("adc_channel", "I", None)],
+               response=[("voltage", "i")])
+
+
+class CommandSpec(object):
+    """Request encoder of one message, the constant part of the frame is built once and call parameters
+    packed by a precompiled struct."""
+    __slots__ = ("name", "module_id", "msg_id", "cmd_id", "rsp_cmd_id", "rsp_data_len",
+                 "data_struct", "data_value_list", "param_index_list", "frame_head", "frame")
+
+    def __init__(self, msg_schema, rsp_data_len):
+        self.name = msg_schema.name
+        self.module_id = msg_schema.module_id
+        self.msg_id = msg_schema.msg_id
+        self.cmd_id = msg_schema.cmd_id  # None: power board frame, data follows the frame head directly
+        self.rsp_cmd_id = msg_schema.rsp_cmd_id
+        self.rsp_data_len = rsp_data_len
+        self.frame_head, self.frame = None, None
+        if msg_schema.request is None:
+            self.data_struct, self.data_value_list, self.param_index_list = None, None, None
+            return
+        self.data_struct = struct.Struct("<" + "".join(each_field[1] for each_field in msg_schema.request))
+        self.data_value_list = [each_field[2] for each_field in msg_schema.request]
+        self.param_index_list = [each_index for each_index, each_value in enumerate(self.data_value_list)
+                                 if each_value is None]
+        self.frame_head = self.frame_head_pack(self.data_struct.size)
+        if not self.param_index_list:
+            self.frame = self.frame_head + self.data_struct.pack(*self.data_value_list) + frame_tail
+
+    def frame_head_pack(self, data_len):
+        if self.cmd_id is None:
+            return FrameHead.pack("\x23\x23", "\x00" * 12, self.module_id, 0, self.msg_id, data_len)
+        return (FrameHead.pack("\x23\x23", "\x00" * 12, self.module_id, 0, self.msg_id,
+                               CommandDataHead.size + data_len) +
+                CommandDataHead.pack(self.cmd_id, data_len, data_len))
+
+    def build(self, *param):
+        if self.frame is not None:
+            return self.frame
+        data_value_list = list(self.data_value_list)
+        for each_index, each_param in zip(self.param_index_list, param):
+            data_value_list[each_index] = each_param
+        return self.frame_head + self.data_struct.pack(*data_value_list) + frame_tail
+
+    def build_data(self, data_str):
+        return self.frame_head_pack(len(data_str)) + data_str + frame_tail
+
+    def __repr__(self):
+        return "CommandSpec(%s, module %d, msg 0x%02x, cmd %s, rsp cmd %s, rsp len %s%s)" % (
+            self.name, self.module_id, self.msg_id, "None" if self.cmd_id is None else "0x%02x" % self.cmd_id,
+            "None" if self.rsp_cmd_id is None else "0x%02x" % self.rsp_cmd_id, self.rsp_data_len,
+            "" if self.frame is None else ", frame " + binascii.b2a_hex(self.frame))
+
+
+class ResponseDecoder(object):
+    """Response data decoder of one message: a single unpack into a namedtuple record, bit fields are
+    split out of their container bytes."""
+    __slots__ = ("name", "record_type", "data_struct", "bitfield_plan")
+
+    def __init__(self, msg_schema):
+        self.name = msg_schema.name
+        self.data_struct = struct.Struct("<" + "".join(each_field[1] for each_field in msg_schema.response))
+        record_field_list, self.bitfield_plan = [], None
+        for each_index, each_field in enumerate(msg_schema.response):
+            if 2 == len(each_field):
+                record_field_list.append(each_field[0])
+                continue
+            if self.bitfield_plan is None:
+                self.bitfield_plan = []
+            bit_shift, bit_list = 0, []
+            for bit_name, bit_width, bit_signed in each_field[2]:
+                record_field_list.append(bit_name)
+                bit_list.append((bit_shift, (1 << bit_width) - 1, (1 << (bit_width - 1)) if bit_signed else 0))
+                bit_shift += bit_width
+            self.bitfield_plan.append((each_index, bit_list))
+        record_name = "".join(each_word.capitalize() for each_word in self.name.split("_")) + "Record"
+        self.record_type = collections.namedtuple(record_name, record_field_list)
+
+    def decode(self, data_str):
+        if len(data_str) != self.data_struct.size:  # short data padded with zero, extra data ignored
+            data_str = data_str[0:self.data_struct.size].ljust(self.data_struct.size, "\x00")
+        value_tuple = self.data_struct.unpack(data_str)
+        if self.bitfield_plan is None:
+            return self.record_type._make(value_tuple)
+
+        value_list, value_start = [], 0
+        for each_index, bit_list in self.bitfield_plan:
+            value_list.extend(value_tuple[value_start:each_index])
+            container_value = value_tuple[each_index]
+            for bit_shift, bit_mask, bit_sign in bit_list:
+                bit_value = (container_value >> bit_shift) & bit_mask
+                if bit_sign and bit_value & bit_sign:  # sign extend
+                    bit_value -= bit_sign << 1
+                value_list.append(bit_value)
+            value_start = each_index + 1
+        value_list.extend(value_tuple[value_start:])
+        return self.record_type._make(value_list)
+
+
+# generated once at import
+DictCommandSpec = collections.OrderedDict()  # message name -> CommandSpec
+DictResponseDecoder = collections.OrderedDict()  # message name -> ResponseDecoder
+for each_schema in ProtocolSchema.values():
+    if each_schema.response is not None:
+        DictResponseDecoder[each_schema.name] = ResponseDecoder(each_schema)
+    each_rsp_data_len = None
+    if each_schema.response is not None and each_schema.rsp_len_check:
+        each_rsp_data_len = DictResponseDecoder[each_schema.name].data_struct.size
+    DictCommandSpec[each_schema.name] = CommandSpec(each_schema, each_rsp_data_len)
+
+
+def response_decode(msg_name, data_str):
+    return DictResponseDecoder[msg_name].decode(data_str)
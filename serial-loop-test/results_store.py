@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Board results database: per board its ids, every measured value (with limit result where it has limits), the
+# status of every test plan step, the failed summary items and the step timings.
+# SQLite in WAL mode, the boards of a station round are written in one transaction, by the test process only;
+# station workers hand their board record back with the results summary. Each board is a savepoint in it, a
+# board failing to store is rolled back alone.
+# Lookups by chip id, mac address, board label and time:
+#     python results_store.py chip <chip id> | mac <mac address> | label <board label> [database file]
+
+import collections
+import os
+import sqlite3
+import sys
+import time
+
+BoardRecord = collections.namedtuple("BoardRecord", ["board_info", "measure_list", "step_result_list",
+                                                     "failure_list", "step_list"])
+MeasureRecord = collections.namedtuple("MeasureRecord", ["metric", "item", "value", "passed", "margin"])
+
+StoreError = sqlite3.Error
+
+# board field -> column type, in column order
+ListBoardField = [
+    ("time_stamp", "REAL"), ("lot", "TEXT"), ("board_label", "TEXT"), ("sport_num", "TEXT"), ("chip_id", "TEXT"),
+    ("chip_type", "TEXT"), ("mac_addr", "TEXT"), ("vendor_id", "TEXT"), ("chip_code", "TEXT"),
+    ("module_type", "TEXT"), ("chip_mmid", "TEXT"), ("fw_ver", "BLOB"), ("passed", "INTEGER"),
+    ("time_cost", "REAL"), ("config_file", "TEXT"),
+]
+
+store_schema = """
+CREATE TABLE IF NOT EXISTS board (board_id INTEGER PRIMARY KEY, %s);
+CREATE TABLE IF NOT EXISTS measurement (board_id INTEGER NOT NULL, metric TEXT, item TEXT, value REAL,
+                                        passed INTEGER, margin REAL);
+CREATE TABLE IF NOT EXISTS step_result (board_id INTEGER NOT NULL, step TEXT, status TEXT, time_cost REAL);
+CREATE TABLE IF NOT EXISTS failure (board_id INTEGER NOT NULL, item TEXT, result TEXT);
+CREATE TABLE IF NOT EXISTS step_timing (board_id INTEGER NOT NULL, step TEXT, kind TEXT, depth INTEGER,
+                                        time_start REAL, time_cost REAL, write_time REAL, first_byte_time REAL,
+                                        frame_time REAL, request_cnt INTEGER, retry_cnt INTEGER, result INTEGER);
+CREATE INDEX IF NOT EXISTS board_chip_id ON board (chip_id);
+CREATE INDEX IF NOT EXISTS board_mac_addr ON board (mac_addr);
+CREATE INDEX IF NOT EXISTS board_label ON board (board_label);
+CREATE INDEX IF NOT EXISTS board_time_stamp ON board (time_stamp);
+CREATE INDEX IF NOT EXISTS measurement_board ON measurement (board_id);
+CREATE INDEX IF NOT EXISTS step_result_board ON step_result (board_id);
+CREATE INDEX IF NOT EXISTS failure_board ON failure (board_id);
+CREATE INDEX IF NOT EXISTS step_timing_board ON step_timing (board_id);
+""" % ", ".join("%s %s" % each_field for each_field in ListBoardField)
+
+dict_board_info = {}  # board field -> value of the board under test
+board_measure_list = []  # MeasureRecord of the board under test, in measuring order
+
+dict_store_connection = {}  # database file -> open connection of this process
+
+
+def board_record_start(**board_info):
+    dict_board_info.clear()
+    dict_board_info.update(board_info)
+    del board_measure_list[:]
+
+
+def board_info_set(**board_info):
+    dict_board_info.update(board_info)
+
+
+def measure_add(metric, value, item="", passed=None, margin=None):
+    # item: eg. phase or tmi the value was measured at, passed / margin: None for values without limits
+    # numpy scalars to python types, sqlite3 binds those only
+    board_measure_list.append(MeasureRecord(metric, item, float(value), None if passed is None else int(passed),
+                                            None if margin is None else float(margin)))
+
+
+def measure_limit_add(limit_result, item=""):
+    measure_add(limit_result.metric, limit_result.value, item, limit_result.passed, limit_result.margin)
+
+
+def board_record_get(step_result_list, dict_results_summary, step_list):
+    # step_result_list: [(step, status, time cost), ...], step_list: step_timing.StepRecord list of the board
+    failure_list = [(item, str(result)) for item, result in dict_results_summary.items()] \
+        if isinstance(dict_results_summary, dict) else []
+    return BoardRecord(dict(dict_board_info), list(board_measure_list), list(step_result_list), failure_list,
+                       list(step_list))
+
+
+def board_field_value(field_value):
+    # dut strings are raw bytes, sqlite3 binds non utf-8 byte strings only as blob
+    if isinstance(field_value, str):
+        try:
+            field_value.decode("utf-8")
+        except UnicodeDecodeError:
+            return sqlite3.Binary(field_value)
+    return field_value
+
+
+def store_open(db_path):
+    store_connection = dict_store_connection.get(db_path)
+    if store_connection is not None:
+        return store_connection
+    db_folder = os.path.dirname(db_path)
+    if db_folder and not os.path.exists(db_folder):
+        os.makedirs(db_folder)
+    # autocommit: transactions and savepoints are issued by board_record_batch_write()
+    store_connection = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    store_connection.execute("PRAGMA journal_mode=WAL")
+    store_connection.execute("PRAGMA synchronous=NORMAL")  # WAL: durable at checkpoint, never corrupt
+    store_connection.executescript(store_schema)
+    dict_store_connection[db_path] = store_connection
+    return store_connection
+
+
+def store_close(db_path):
+    store_connection = dict_store_connection.pop(db_path, None)
+    if store_connection is not None:
+        store_connection.close()
+
+
+def board_record_insert(store_connection, board_record):
+    board_cursor = store_connection.execute(
+        "INSERT INTO board (%s) VALUES (%s)" % (", ".join(each_field[0] for each_field in ListBoardField),
+                                                ", ".join("?" * len(ListBoardField))),
+        [board_field_value(board_record.board_info.get(each_field[0])) for each_field in ListBoardField])
+    board_id = board_cursor.lastrowid
+    store_connection.executemany("INSERT INTO measurement VALUES (?, ?, ?, ?, ?, ?)",
+                                 [(board_id,) + tuple(measure_record) for measure_record in board_record.measure_list])
+    store_connection.executemany("INSERT INTO step_result VALUES (?, ?, ?, ?)",
+                                 [(board_id,) + tuple(step_result) for step_result in board_record.step_result_list])
+    store_connection.executemany("INSERT INTO failure VALUES (?, ?, ?)",
+                                 [(board_id,) + tuple(failure) for failure in board_record.failure_list])
+    store_connection.executemany("INSERT INTO step_timing VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [(board_id,) + tuple(step_record) for step_record in board_record.step_list])
+    return board_id
+
+
+def board_record_batch_write(db_path, board_record_list):
+    # all boards in one transaction, returns per board its board id, or the StoreError it was not stored for
+    store_connection = store_open(db_path)
+    board_id_list = []
+    store_connection.execute("BEGIN")
+    try:
+        for board_record in board_record_list:
+            store_connection.execute("SAVEPOINT board_record")
+            try:
+                board_id_list.append(board_record_insert(store_connection, board_record))
+            except StoreError, e_info:
+                store_connection.execute("ROLLBACK TO board_record")  # this board only
+                board_id_list.append(e_info)
+            store_connection.execute("RELEASE board_record")
+        store_connection.execute("COMMIT")
+    except:
+        store_connection.execute("ROLLBACK")
+        raise
+    return board_id_list
+
+
+def board_history(db_path, field_name, field_value):
+    # boards by chip_id / mac_addr / board_label, newest first: [{board field: value}, ...]
+    if field_name not in ("chip_id", "mac_addr", "board_label"):
+        raise ValueError("no index on %s" % field_name)
+    board_cursor = store_open(db_path).execute("SELECT board_id, %s FROM board WHERE %s = ? ORDER BY time_stamp DESC"
+                                               % (", ".join(each_field[0] for each_field in ListBoardField),
+                                                  field_name), (field_value,))
+    column_list = [each_column[0] for each_column in board_cursor.description]
+    return [dict(zip(column_list, board_row)) for board_row in board_cursor]
+
+
+def board_time_range(db_path, time_start, time_end):
+    return [board_row[0] for board_row in store_open(db_path).execute(
+        "SELECT board_id FROM board WHERE time_stamp BETWEEN ? AND ? ORDER BY time_stamp", (time_start, time_end))]
+
+
+def board_measure_get(db_path, board_id):
+    return [MeasureRecord(*measure_row) for measure_row in store_open(db_path).execute(
+        "SELECT metric, item, value, passed, margin FROM measurement WHERE board_id = ?", (board_id,))]
+
+
+def board_failure_get(db_path, board_id):
+    return store_open(db_path).execute("SELECT item, result FROM failure WHERE board_id = ?",
+                                       (board_id,)).fetchall()
+
+
+if __name__ == '__main__':
+    DictQueryField = {"chip": "chip_id", "mac": "mac_addr", "label": "board_label"}
+    if len(sys.argv) < 3 or sys.argv[1] not in DictQueryField:
+        print ("Usage: python results_store.py chip <chip id> | mac <mac address> | label <board label> "
+               "[database file]")
+        sys.exit()
+    arg_db_path = sys.argv[3] if len(sys.argv) > 3 else r".\log_production_test\production_results.db"
+    query_start = time.time()
+    board_row_list = board_history(arg_db_path, DictQueryField[sys.argv[1]], sys.argv[2])
+    for board_row in board_row_list:
+        print ("%s  %-16s %-12s %-20s %s  %s" %
+               (time.strftime("%Y-%m-%d %X", time.localtime(board_row["time_stamp"] or 0)), board_row["board_label"],
+                board_row["chip_id"], board_row["mac_addr"], "pass" if board_row["passed"] else "fail",
+                ", ".join("%s: %s" % each_failure for each_failure in board_failure_get(arg_db_path,
+                                                                                         board_row["board_id"]))))
+    print ("%d boards, %.1fms" % (len(board_row_list), (time.time() - query_start) * 1000))
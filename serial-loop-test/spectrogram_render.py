@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Flatness spectrogram rendering off the test path.
+# The test only queues curves (phase, gpio, tone range, amplitude array) per picture, the pictures are
+# drawn by a background render process once all phases of a board are in, and flushed at end of board.
+
+import multiprocessing
+import os
+
+
+DictLineShape = {
+    "A": 'b-',
+    "B": 'r--',
+    "C": 'c-.'
+}
+
+render_pool = None  # test process: background render process, created on first use
+dict_pending_picture = {}  # test process: picture path -> curve list not submitted yet
+list_render_result = []  # test process: submitted renders not flushed yet
+
+render_figure = None  # render process: one figure reused for every picture
+
+
+def spectrogram_picture_path(f_log, s_label, gpio_cnt):
+    pic_folder = f_log + r".\rx_filter_spectrogram"
+    return pic_folder + "\\" + r"csi_dump_" + s_label + "_" + r"_GPIO_" + str(gpio_cnt) + r".png"
+
+
+def spectrogram_curve_add(pic_path, s_phase, x_lim_start, x_lim_end, amp_array):
+    # curves of one picture are drawn together, eg. phase A/B/C of one gpio status
+    dict_pending_picture.setdefault(pic_path, []).append((s_phase, x_lim_start, x_lim_end, amp_array))
+
+
+def spectrogram_draw(pic_path, curve_list, x_name="Tone_number", y_name="Amp_avg(db)"):
+    # runs in the render process, agg canvas only, no pyplot state
+    global render_figure
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if render_figure is None:
+        render_figure = Figure(figsize=(10, 10), dpi=150)
+        FigureCanvasAgg(render_figure)
+    render_figure.clf()
+
+    pic_folder = os.path.dirname(pic_path)
+    if pic_folder and not os.path.exists(pic_folder):
+        os.makedirs(pic_folder)
+
+    axes = render_figure.add_subplot(1, 1, 1)
+    axes.set_xlabel(x_name)
+    axes.set_ylabel(y_name)
+    axes.set_ylim(0, 100)
+    axes.set_title('CSI Flatness Dump Spectrogram')
+    for s_phase, x_lim_start, x_lim_end, amp_array in curve_list:
+        data_x = np.arange(x_lim_start, x_lim_end + 1)
+        pic_legend_str = "Channel: %s | Max : %s , Min : %s , Var : %s " % \
+                         (s_phase, str(amp_array.max()), str(amp_array.min()), str(np.var(amp_array)))
+        axes.plot(data_x, amp_array, DictLineShape[s_phase], label=pic_legend_str)
+    axes.legend(loc='upper left')
+    axes.grid()
+    render_figure.savefig(pic_path)
+    return pic_path
+
+
+def spectrogram_render_submit():
+    # hand every pending picture to the render process, the caller goes on testing
+    global render_pool
+    if not dict_pending_picture:
+        return
+    if render_pool is None:
+        # one render process: pictures are drawn in submit order and the figure is reused
+        render_pool = multiprocessing.Pool(processes=1)
+    for pic_path, curve_list in dict_pending_picture.items():
+        list_render_result.append(render_pool.apply_async(spectrogram_draw, (pic_path, curve_list)))
+    dict_pending_picture.clear()
+
+
+def spectrogram_render_flush(logger_printer=None, time_out=60):
+    # end of board: submit what is left and wait for every picture of the board to be written
+    spectrogram_render_submit()
+    while list_render_result:
+        render_result = list_render_result.pop(0)
+        try:
+            pic_path = render_result.get(time_out)
+        except Exception, e_info:
+            if logger_printer is not None:
+                logger_printer.info("Spectrogram render failed: %s" % str(e_info))
+            continue
+        if logger_printer is not None:
+            logger_printer.debug("Spectrogram saved: %s" % pic_path)
+
+
+def spectrogram_render_close():
+    global render_pool
+    dict_pending_picture.clear()
+    del list_render_result[:]
+    if render_pool is not None:
+        render_pool.close()
+        render_pool.join()
+        render_pool = None
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Step timing of a board run: every command function (timeout_set) and every test case of the board plan is a
+# step, commands nest in the case running them. Per step: time cost, time in write(), time to the first byte
+# and to the complete response frame of its first request, requests sent and retries.
+# The board breakdown is written into the board log folder, the station keeps the per board step time of the
+# last boards and reports p50 / p95 per step.
+
+import collections
+import math
+import threading
+
+from monotonic_clock import monotonic_time
+
+# result: Err code of the step (< 0), 0 otherwise
+StepRecord = collections.namedtuple("StepRecord", ["step", "kind", "depth", "time_start", "time_cost", "write_time",
+                                                   "first_byte_time", "frame_time", "request_cnt", "retry_cnt",
+                                                   "result"])
+
+step_local = threading.local()  # per thread stack of running steps
+board_step_list = []  # finished steps of the current board, in end order
+board_step_lock = threading.Lock()
+
+station_board_window = 50  # boards kept for the station percentiles
+dict_station_step = collections.OrderedDict()  # step -> deque of per board step time
+
+
+class StepTimer(object):
+    __slots__ = ("step", "kind", "time_start", "write_time", "first_byte_time", "frame_time", "request_cnt",
+                 "retry_cnt")
+
+    def __init__(self, step, kind):
+        self.step = step
+        self.kind = kind
+        self.time_start = monotonic_time()
+        self.write_time = 0.0
+        self.first_byte_time = None
+        self.frame_time = None
+        self.request_cnt = 0
+        self.retry_cnt = 0
+
+
+def step_stack_get():
+    s_stack = getattr(step_local, "stack", None)
+    if s_stack is None:
+        s_stack = step_local.stack = []
+    return s_stack
+
+
+def board_step_start():
+    with board_step_lock:
+        del board_step_list[:]
+
+
+def step_begin(step, kind="command"):
+    step_stack_get().append(StepTimer(step, kind))
+
+
+def step_end(result=None):
+    s_stack = step_stack_get()
+    step_timer = s_stack.pop()
+    step_record = StepRecord(step_timer.step, step_timer.kind, len(s_stack), step_timer.time_start,
+                             monotonic_time() - step_timer.time_start, step_timer.write_time,
+                             step_timer.first_byte_time, step_timer.frame_time, step_timer.request_cnt,
+                             step_timer.retry_cnt, result if isinstance(result, (int, long)) and result < 0 else 0)
+    with board_step_lock:
+        board_step_list.append(step_record)
+    return step_record
+
+
+def step_call(step, kind, func, *args):
+    step_begin(step, kind)
+    result = None
+    try:
+        result = func(*args)
+    finally:
+        step_end(result)
+    return result
+
+
+def step_request(time_write_start, time_write_end):
+    # a request written: counted by every running step, write time too
+    for step_timer in step_stack_get():
+        step_timer.request_cnt += 1
+        step_timer.write_time += time_write_end - time_write_start
+
+
+def step_response(time_write_start, time_first_byte, time_frame):
+    # response of a request received, kept for the first request of each running step only
+    for step_timer in step_stack_get():
+        if step_timer.frame_time is None:
+            if time_first_byte is not None:
+                step_timer.first_byte_time = time_first_byte - time_write_start
+            step_timer.frame_time = time_frame - time_write_start
+
+
+def step_retry(retry_cnt=1):
+    for step_timer in step_stack_get():
+        step_timer.retry_cnt += retry_cnt
+
+
+def time_str(time_value):
+    return "" if time_value is None else "%.4f" % time_value
+
+
+def board_step_write(timing_file):
+    with board_step_lock:
+        step_list = sorted(board_step_list, key=lambda step_record: step_record.time_start)
+    if not step_list:
+        return
+    time_base = step_list[0].time_start
+    with open(timing_file, "w") as f_timing:
+        f_timing.write("step,kind,depth,start,time_cost,write_time,first_byte_time,frame_time,request_cnt,"
+                       "retry_cnt,result\n")
+        for step_record in step_list:
+            f_timing.write("%s,%s,%d,%s,%s,%s,%s,%s,%d,%d,%d\n" %
+                           (step_record.step, step_record.kind, step_record.depth,
+                            time_str(step_record.time_start - time_base), time_str(step_record.time_cost),
+                            time_str(step_record.write_time), time_str(step_record.first_byte_time),
+                            time_str(step_record.frame_time), step_record.request_cnt, step_record.retry_cnt,
+                            step_record.result))
+
+
+def board_step_total(step_list):
+    # step -> time of all its calls in one board
+    dict_step_total = collections.OrderedDict()
+    for step_record in step_list:
+        dict_step_total[step_record.step] = dict_step_total.get(step_record.step, 0) + step_record.time_cost
+    return dict_step_total
+
+
+def station_step_add(step_list):
+    for step, step_total in board_step_total(step_list).items():
+        if step not in dict_station_step:
+            dict_station_step[step] = collections.deque(maxlen=station_board_window)
+        dict_station_step[step].append(step_total)
+
+
+def percentile(sorted_list, percent):
+    # nearest rank
+    rank = int(math.ceil(percent / 100.0 * len(sorted_list)))
+    return sorted_list[max(rank, 1) - 1]
+
+
+def station_step_summary():
+    # [(step, boards, p50, p95), ...] slowest p95 first
+    step_summary_list = []
+    for step, step_time_deque in dict_station_step.items():
+        sorted_list = sorted(step_time_deque)
+        step_summary_list.append((step, len(sorted_list), percentile(sorted_list, 50), percentile(sorted_list, 95)))
+    step_summary_list.sort(key=lambda step_summary: step_summary[3], reverse=True)
+    return step_summary_list
+
+
+def station_step_write(summary_file):
+    with open(summary_file, "w") as f_summary:
+        f_summary.write("step,boards,p50,p95\n")
+        for step, board_cnt, p50_time, p95_time in station_step_summary():
+            f_summary.write("%s,%d,%.4f,%.4f\n" % (step, board_cnt, p50_time, p95_time))
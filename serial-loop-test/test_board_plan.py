@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# BoardPlan scheduling with stub node functions on a fake clock.
+#     python -m unittest discover -p "test_*.py"
+
+import unittest
+
+import board_plan
+
+
+class FakeClock(object):
+    """monotonic_time() / time.sleep() of board_plan, sleep only moves the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic_time(self):
+        return self.now
+
+    def sleep(self, time_interval):
+        self.now += time_interval
+
+
+class BoardPlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.monotonic_time, self.time = board_plan.monotonic_time, board_plan.time
+        board_plan.monotonic_time, board_plan.time = self.clock.monotonic_time, self.clock
+        self.run_list = []
+        self.skip_list = []
+        self.plan = board_plan.BoardPlan(dut_state=["test_mode"])
+
+    def tearDown(self):
+        board_plan.monotonic_time, board_plan.time = self.monotonic_time, self.time
+
+    def node_func(self, name, result=0, time_cost=0.0):
+        def stub_func():
+            self.run_list.append(name)
+            self.clock.sleep(time_cost)
+            return result
+        return stub_func
+
+    def node_add(self, name, result=0, time_cost=0.0, **node_option):
+        return self.plan.node_add(name, self.node_func(name, result, time_cost), **node_option)
+
+    def plan_run(self):
+        return self.plan.run(lambda plan_node: self.skip_list.append(plan_node.name))
+
+    def node_status(self, name):
+        return self.plan.dict_node[name].status
+
+    def test_plan_order(self):
+        for name in ["efuse_lock", "id_info_read", "noise_floor"]:
+            self.node_add(name, requires_state=["test_mode"])
+        self.plan_run()
+        self.assertEqual(self.run_list, ["efuse_lock", "id_info_read", "noise_floor"])
+        self.assertEqual([plan_node.status for plan_node in self.plan.node_list], [board_plan.node_pass] * 3)
+
+    def test_state_provider_first(self):
+        self.node_add("txrx_loopback_phase_A", requires_state=["test_mode", "nid_set"])
+        self.node_add("global_nid_set", provides_state=["nid_set"])
+        self.plan_run()
+        self.assertEqual(self.run_list, ["global_nid_set", "txrx_loopback_phase_A"])
+
+    def test_fatal_failure_skips(self):
+        self.node_add("global_nid_set", result=-1, provides_state=["nid_set"], fatal=True)
+        self.node_add("txrx_loopback_phase_A", requires_state=["nid_set"])
+        self.node_add("nid_check", prerequisites=["global_nid_set"])
+        self.node_add("led_control")
+        self.plan_run()
+        self.assertEqual(self.run_list, ["global_nid_set", "led_control"])
+        self.assertEqual(self.node_status("global_nid_set"), board_plan.node_fail)
+        self.assertEqual(sorted(self.skip_list), ["nid_check", "txrx_loopback_phase_A"])
+
+    def test_skip_propagation(self):
+        self.node_add("flatness_detection", result=-1, fatal=True)
+        self.node_add("spectrogram_render_submit", prerequisites=["flatness_detection"])
+        self.node_add("spectrogram_check", prerequisites=["spectrogram_render_submit"])
+        self.plan_run()
+        self.assertEqual(self.run_list, ["flatness_detection"])
+        self.assertEqual(self.skip_list, ["spectrogram_render_submit", "spectrogram_check"])
+
+    def test_non_fatal_failure_runs_dependents(self):
+        self.node_add("tdsb_charge_start", result=-1)
+        self.node_add("tdsb_voltage_detection", prerequisites=["tdsb_charge_start"])
+        self.plan_run()
+        self.assertEqual(self.run_list, ["tdsb_charge_start", "tdsb_voltage_detection"])
+        self.assertEqual(self.skip_list, [])
+
+    def test_consumes_state_last(self):
+        # psram test leaves test mode, the ktj tests added after it still need it
+        self.node_add("psram_mem_detection", consumes_state=["test_mode"], requires_state=["test_mode"])
+        self.node_add("ktj_gpio_detection", requires_state=["test_mode"])
+        self.node_add("ktj_channel_voltage_detection", requires_state=["test_mode"])
+        self.plan_run()
+        self.assertEqual(self.run_list, ["ktj_gpio_detection", "ktj_channel_voltage_detection",
+                                         "psram_mem_detection"])
+        self.assertNotIn("test_mode", self.plan.dut_state)
+
+    def test_ready_time_interleaving(self):
+        # tdsb collect waits for the charge time, the other tests run meanwhile
+        charge_deadline = []
+
+        def charge_start():
+            self.run_list.append("tdsb_charge_start")
+            charge_deadline.append(self.clock.now + 2.0)
+            return 0
+        self.plan.node_add("tdsb_charge_start", charge_start)
+        self.node_add("tdsb_voltage_detection", prerequisites=["tdsb_charge_start"],
+                      ready_time=lambda: charge_deadline[0])
+        for test_i in range(6):
+            self.node_add("rf_test_%d" % test_i, time_cost=0.5)
+        self.plan_run()
+        self.assertEqual(self.run_list, ["tdsb_charge_start", "rf_test_0", "rf_test_1", "rf_test_2", "rf_test_3",
+                                         "tdsb_voltage_detection", "rf_test_4", "rf_test_5"])
+        self.assertTrue(self.plan.dict_node["tdsb_voltage_detection"].time_start >= charge_deadline[0])
+
+    def test_ready_time_waits_when_idle(self):
+        self.node_add("tdsb_voltage_detection", ready_time=lambda: 1003.0)
+        self.plan_run()
+        self.assertEqual(self.run_list, ["tdsb_voltage_detection"])
+        self.assertEqual(self.clock.now, 1003.0)
+
+    def test_settle_time_interleaving(self):
+        # an rf test keeps "rf" busy for its settle time, the non rf tests run in the gap
+        self.node_add("txrx_loopback_phase_A", resources=["rf"], settle_time=1.0)
+        self.node_add("txrx_loopback_phase_B", resources=["rf"], settle_time=1.0)
+        self.node_add("led_control", resources=["gpio"], time_cost=0.3)
+        self.node_add("zero_cross_detection", time_cost=0.3)
+        self.plan_run()
+        self.assertEqual(self.run_list, ["txrx_loopback_phase_A", "led_control", "zero_cross_detection",
+                                         "txrx_loopback_phase_B"])
+        self.assertEqual(self.plan.dict_node["txrx_loopback_phase_B"].time_start, 1001.0)
+
+    def test_settle_time_per_resource(self):
+        # a flatness test settles "rf" only, the gpio tests run during the rf settle
+        self.node_add("flatness_detection_phase_A_gpio_status_0", resources=["rf", "gpio"], settle_time={"rf": 1.0})
+        self.node_add("flatness_detection_phase_B_gpio_status_0", resources=["rf", "gpio"], settle_time={"rf": 1.0})
+        self.node_add("led_control", resources=["gpio"], time_cost=0.3)
+        self.plan_run()
+        self.assertEqual(self.run_list, ["flatness_detection_phase_A_gpio_status_0", "led_control",
+                                         "flatness_detection_phase_B_gpio_status_0"])
+        self.assertEqual(self.plan.dict_node["led_control"].time_start, 1000.0)
+        self.assertEqual(self.plan.dict_node["flatness_detection_phase_B_gpio_status_0"].time_start, 1001.0)
+
+    def test_circular_requirement_skips(self):
+        self.node_add("node_a", requires_state=["state_b"], provides_state=["state_a"])
+        self.node_add("node_b", requires_state=["state_a"], provides_state=["state_b"])
+        self.node_add("efuse_lock")
+        self.plan_run()
+        self.assertEqual(self.run_list, ["efuse_lock"])
+        self.assertEqual(sorted(self.skip_list), ["node_a", "node_b"])
+
+    def test_node_add_check(self):
+        self.node_add("efuse_lock")
+        self.assertRaises(ValueError, self.node_add, "efuse_lock")
+        self.assertRaises(ValueError, self.node_add, "mac_addr_burn", prerequisites=["id_info_read"])
+
+    def test_node_call(self):
+        call_list = []
+        self.plan.node_call = lambda plan_node: call_list.append(plan_node.name) or plan_node.func()
+        self.node_add("efuse_lock")
+        self.plan_run()
+        self.assertEqual(call_list, ["efuse_lock"])
+        self.assertEqual(self.run_list, ["efuse_lock"])
+
+
+if __name__ == '__main__':
+    unittest.main()
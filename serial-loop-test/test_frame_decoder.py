@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# FrameDecoder on split, concatenated and noisy byte streams.
+#     python -m unittest discover -p "test_*.py"
+
+import struct
+import unittest
+
+from production_test_auto import FrameDecoder, ProtocolFrame
+
+
+def frame_pack(payload, module_id=3, msg_id=1, addr="\x00" * 12, tail="\x40\x40"):
+    return "\x23\x23" + addr + struct.pack("<HHII", module_id, 0, msg_id, len(payload)) + payload + tail
+
+
+def frame_pop_all(decoder):
+    frame_list = []
+    r_frame = decoder.frame_pop()
+    while r_frame is not None:
+        frame_list.append(r_frame)
+        r_frame = decoder.frame_pop()
+    return frame_list
+
+
+class FrameDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = FrameDecoder()
+        self.payload_a = struct.pack("<HHH", 0x1004, 8, 2) + "\x41\x42"
+        self.payload_b = struct.pack("<HHH", 0x1011, 6, 0)
+        self.frame_a = ProtocolFrame(3, 1, 0x1004, self.payload_a)
+        self.frame_b = ProtocolFrame(3, 1, 0x1011, self.payload_b)
+
+    def test_single_frame(self):
+        self.decoder.feed(frame_pack(self.payload_a))
+        self.assertEqual(frame_pop_all(self.decoder), [self.frame_a])
+        self.assertEqual(len(self.decoder.buffer), 0)
+
+    def test_byte_by_byte(self):
+        frame_list = []
+        for each_byte in frame_pack(self.payload_a) + frame_pack(self.payload_b):
+            self.decoder.feed(each_byte)
+            frame_list.extend(frame_pop_all(self.decoder))
+        self.assertEqual(frame_list, [self.frame_a, self.frame_b])
+
+    def test_concatenated(self):
+        self.decoder.feed(frame_pack(self.payload_a) + frame_pack(self.payload_b) + frame_pack(self.payload_a))
+        self.assertEqual(frame_pop_all(self.decoder), [self.frame_a, self.frame_b, self.frame_a])
+
+    def test_garbage_before_head(self):
+        # cli text, a lone 0x23 and a cut frame head before the frame
+        self.decoder.feed("WQKL> dtest\r\n#" + "\x23\x23\x00\x00" + frame_pack(self.payload_a) + "noise")
+        self.assertEqual(frame_pop_all(self.decoder), [self.frame_a])
+
+    def test_head_split_after_first_byte(self):
+        # the 0x23 at the end of a read is kept for the next one
+        frame_str = frame_pack(self.payload_a)
+        self.decoder.feed("text" + frame_str[:1])
+        self.assertEqual(frame_pop_all(self.decoder), [])
+        self.assertEqual(len(self.decoder.buffer), 1)
+        self.decoder.feed(frame_str[1:])
+        self.assertEqual(frame_pop_all(self.decoder), [self.frame_a])
+
+    def test_bad_tail(self):
+        self.decoder.feed(frame_pack(self.payload_a, tail="\x40\x41") + frame_pack(self.payload_b))
+        self.assertEqual(frame_pop_all(self.decoder), [self.frame_b])
+
+    def test_non_zero_address(self):
+        self.decoder.feed(frame_pack(self.payload_a, addr="\x01" + "\x00" * 11) + frame_pack(self.payload_b))
+        self.assertEqual(frame_pop_all(self.decoder), [self.frame_b])
+
+    def test_length_over_max(self):
+        bad_head = "\x23\x23" + "\x00" * 12 + struct.pack("<HHII", 3, 0, 1, FrameDecoder.payload_len_max + 1)
+        self.decoder.feed(bad_head + frame_pack(self.payload_b))
+        self.assertEqual(frame_pop_all(self.decoder), [self.frame_b])
+
+    def test_bad_length_under_max(self):
+        # a corrupted length field must not swallow the responses after it
+        bad_head = "\x23\x23" + "\x00" * 12 + struct.pack("<HHII", 3, 0, 1, FrameDecoder.payload_len_max - 1)
+        self.decoder.feed(bad_head + "\x16\x00" + frame_pack(self.payload_a))
+        self.assertEqual(frame_pop_all(self.decoder), [self.frame_a])
+        self.decoder.feed(frame_pack(self.payload_b))
+        self.assertEqual(frame_pop_all(self.decoder), [self.frame_b])
+        self.assertEqual(len(self.decoder.buffer), 0)
+
+    def test_incomplete_frame_waits(self):
+        frame_str = frame_pack(self.payload_a)
+        self.decoder.feed(frame_str[:-3])
+        self.assertEqual(frame_pop_all(self.decoder), [])
+        self.decoder.feed(frame_str[-3:])
+        self.assertEqual(frame_pop_all(self.decoder), [self.frame_a])
+
+    def test_short_payload(self):
+        self.decoder.feed(frame_pack("\x01", module_id=4, msg_id=7))
+        self.assertEqual(frame_pop_all(self.decoder), [ProtocolFrame(4, 7, None, "\x01")])
+
+
+if __name__ == '__main__':
+    unittest.main()
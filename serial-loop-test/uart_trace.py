@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# Raw uart capture and replay of a board run.
+# TraceSerial wraps the opened serial.Serial and records every chunk written and read with its monotonic time
+# into a binary trace: head | records | index | footer, the index is written on close, a trace cut by a crash
+# is read by a scan instead. ReplaySerial plays a trace back as the serial port of a board run: the reads of
+# the trace are released at their original delay after the write before them (divided by speed, 0: at once),
+# so the same code paths run against the recorded line without hardware. The sleeps of the code under test
+# (settle times, power hold, tdsb charge wait) run on a ReplayClock, shortened by the same speed.
+#     python uart_trace.py dump <trace file> [start time, s]
+#     python uart_trace.py parse <trace file>                  # frame decoder throughput on the read bytes
+#     python uart_trace.py replay <trace file> [speed] [board label]
+
+import binascii
+import collections
+import struct
+import sys
+import threading
+import time
+
+from monotonic_clock import monotonic_time
+
+TraceHead = struct.Struct("<4sBd")  # magic, version, wall clock time of the first record
+RecordHead = struct.Struct("<BIH")  # direction, time since the first record in us (wraps at 2^32), data len
+IndexEntry = struct.Struct("<IQ")  # time in us of the record, file offset of the record
+TraceFooter = struct.Struct("<4sIQ")  # magic, index entry count, file offset of the index
+trace_magic, index_magic, trace_version = "UTRC", "UIDX", 1
+record_data_max = 0xffff  # longer chunks are split into several records
+trace_index_step = 256  # records per index entry
+
+DIRECTION_WRITE, DIRECTION_READ = 0, 1
+DictDirectionName = {DIRECTION_WRITE: "W", DIRECTION_READ: "R"}
+
+TraceRecord = collections.namedtuple("TraceRecord", ["direction", "time", "data"])  # time: s since first record
+
+
+class TraceSerial(object):
+    """serial.Serial wrapper recording the bytes written and read, attributes not defined here go to the port."""
+
+    def __init__(self, pser, trace_path):
+        self.pser = pser
+        self.trace_lock = threading.Lock()
+        self.f_trace = open(trace_path, "wb")
+        self.f_trace.write(TraceHead.pack(trace_magic, trace_version, time.time()))
+        self.time_base = monotonic_time()
+        self.record_cnt = 0
+        self.index_list = []
+
+    def __getattr__(self, attr_name):
+        return getattr(self.pser, attr_name)
+
+    @property
+    def timeout(self):
+        return self.pser.timeout
+
+    @timeout.setter
+    def timeout(self, time_out):
+        self.pser.timeout = time_out
+
+    def record_add(self, direction, data):
+        time_us = int((monotonic_time() - self.time_base) * 1e6) & 0xffffffff
+        with self.trace_lock:
+            if self.f_trace is None:
+                return
+            for data_index in range(0, len(data), record_data_max):
+                if 0 == self.record_cnt % trace_index_step:
+                    self.index_list.append((time_us, self.f_trace.tell()))
+                record_data = data[data_index:data_index + record_data_max]
+                self.f_trace.write(RecordHead.pack(direction, time_us, len(record_data)) + record_data)
+                self.record_cnt += 1
+
+    def write(self, data):
+        self.record_add(DIRECTION_WRITE, data)
+        return self.pser.write(data)
+
+    def read(self, size=1):
+        read_bytes = self.pser.read(size)
+        if read_bytes:
+            self.record_add(DIRECTION_READ, read_bytes)
+        return read_bytes
+
+    def inWaiting(self):
+        return self.pser.inWaiting()
+
+    def trace_close(self):
+        with self.trace_lock:
+            if self.f_trace is None:
+                return
+            index_offset = self.f_trace.tell()
+            for time_us, record_offset in self.index_list:
+                self.f_trace.write(IndexEntry.pack(time_us, record_offset))
+            self.f_trace.write(TraceFooter.pack(index_magic, len(self.index_list), index_offset))
+            self.f_trace.close()
+            self.f_trace = None
+
+    def close(self):
+        self.trace_close()
+        self.pser.close()
+
+
+def trace_index_read(f_trace):
+    # [(time us, file offset), ...] and the end of the records, ([], None): no index, trace not closed
+    f_trace.seek(0, 2)
+    file_size = f_trace.tell()
+    if file_size < TraceHead.size + TraceFooter.size:
+        return [], None
+    f_trace.seek(file_size - TraceFooter.size)
+    magic, entry_cnt, index_offset = TraceFooter.unpack(f_trace.read(TraceFooter.size))
+    if index_magic != magic or index_offset + entry_cnt * IndexEntry.size + TraceFooter.size != file_size:
+        return [], None
+    f_trace.seek(index_offset)
+    index_str = f_trace.read(entry_cnt * IndexEntry.size)
+    return [IndexEntry.unpack_from(index_str, i * IndexEntry.size) for i in range(entry_cnt)], index_offset
+
+
+def trace_read(trace_path, time_start=0):
+    # TraceRecord of every record from time_start (s) on, the index picks the first record to read
+    with open(trace_path, "rb") as f_trace:
+        magic, version, wall_time = TraceHead.unpack(f_trace.read(TraceHead.size))
+        if trace_magic != magic:
+            raise ValueError("%s is not a uart trace" % trace_path)
+        index_list, records_end = trace_index_read(f_trace)
+
+        # index times are not unwrapped, seek only within the first 2^32 us
+        record_offset, time_last, time_wrap = TraceHead.size, 0, 0
+        for time_us, entry_offset in index_list:
+            if time_us < time_last or time_us / 1e6 > time_start:
+                break
+            record_offset, time_last = entry_offset, time_us
+        f_trace.seek(record_offset)
+
+        while records_end is None or f_trace.tell() < records_end:
+            head_str = f_trace.read(RecordHead.size)
+            if len(head_str) < RecordHead.size:
+                return  # trace cut by a crash
+            direction, time_us, data_len = RecordHead.unpack(head_str)
+            data = f_trace.read(data_len)
+            if len(data) < data_len or direction not in DictDirectionName:
+                return
+            if time_us < time_last:
+                time_wrap += 1 << 32
+            time_last = time_us
+            record_time = (time_wrap + time_us) / 1e6
+            if record_time >= time_start:
+                yield TraceRecord(direction, record_time, data)
+
+
+class ReplaySerial(object):
+    """serial.Serial stand-in playing back a trace. The n-th write of the replay stands for the n-th write of the
+    trace, a read of the trace is released at its original delay after that write, divided by speed."""
+
+    def __init__(self, trace_path, speed=1.0, port="replay", timeout=0.3):
+        self.port = port
+        self.timeout = timeout
+        self.speed = speed
+        self.record_list = list(trace_read(trace_path))
+        self.record_index = 0
+        self.trace_write_list = [trace_record.data for trace_record in self.record_list
+                                 if DIRECTION_WRITE == trace_record.direction]
+        self.rx_buffer = ""
+        self.replay_cond = threading.Condition()
+        self.write_time_list = []  # replay time of every write
+        self.trace_write_cnt = 0  # writes of the trace passed
+        self.write_mismatch_cnt = 0  # writes with other bytes than the trace
+        # anchor: replay time and trace time of the last write passed, the trace start at first
+        self.anchor_replay_time, self.anchor_trace_time = monotonic_time(), 0.0
+
+    def release(self, time_now):
+        # move trace reads due by time_now into rx_buffer, returns the replay time of the next read or None
+        while self.record_index < len(self.record_list):
+            trace_record = self.record_list[self.record_index]
+            if DIRECTION_WRITE == trace_record.direction:
+                if self.trace_write_cnt >= len(self.write_time_list):
+                    return None  # waits for the write of the code under test
+                self.anchor_replay_time = self.write_time_list[self.trace_write_cnt]
+                self.anchor_trace_time = trace_record.time
+                self.trace_write_cnt += 1
+            else:
+                release_time = self.anchor_replay_time
+                if self.speed:
+                    release_time += (trace_record.time - self.anchor_trace_time) / self.speed
+                if release_time > time_now:
+                    return release_time
+                self.rx_buffer += trace_record.data
+            self.record_index += 1
+        return None
+
+    def write(self, data):
+        with self.replay_cond:
+            write_index = len(self.write_time_list)
+            self.write_time_list.append(monotonic_time())
+            if write_index >= len(self.trace_write_list) or self.trace_write_list[write_index] != data:
+                self.write_mismatch_cnt += 1
+            self.replay_cond.notify_all()
+        return len(data)
+
+    def read(self, size=1):
+        time_expire = None if self.timeout is None else monotonic_time() + self.timeout
+        with self.replay_cond:
+            while 1:
+                time_now = monotonic_time()
+                release_time = self.release(time_now)
+                if self.rx_buffer or (time_expire is not None and time_now >= time_expire):
+                    break
+                wait_until = time_expire
+                if release_time is not None and (wait_until is None or release_time < wait_until):
+                    wait_until = release_time
+                self.replay_cond.wait(None if wait_until is None else max(wait_until - time_now, 0.0005))
+            read_bytes, self.rx_buffer = self.rx_buffer[:size], self.rx_buffer[size:]
+        return read_bytes
+
+    def inWaiting(self):
+        with self.replay_cond:
+            self.release(monotonic_time())
+            return len(self.rx_buffer)
+
+    def flushInput(self):
+        with self.replay_cond:
+            self.release(monotonic_time())
+            self.rx_buffer = ""
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayClock(object):
+    """time module stand-in of the code under test: sleep() lasts time_interval / speed (0: no wait) and moves
+    monotonic_time() ahead by the time skipped, deadlines and ready times expire as in the captured run."""
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.time_skipped = 0.0
+        self.clock_lock = threading.Lock()
+
+    def __getattr__(self, attr_name):
+        return getattr(time, attr_name)
+
+    def monotonic_time(self):
+        return monotonic_time() + self.time_skipped
+
+    def sleep(self, time_interval):
+        sleep_time = time_interval / self.speed if self.speed else 0.0
+        if sleep_time:
+            time.sleep(sleep_time)
+        with self.clock_lock:
+            self.time_skipped += time_interval - sleep_time
+
+
+def trace_dump(trace_path, time_start=0):
+    for trace_record in trace_read(trace_path, time_start):
+        print ("%12.6f %s %5d %s" % (trace_record.time, DictDirectionName[trace_record.direction],
+                                     len(trace_record.data), binascii.b2a_hex(trace_record.data)))
+
+
+def trace_parse(trace_path):
+    # frame decoder throughput on the read chunks of the trace, as fast as possible
+    import production_test_auto
+
+    read_list = [trace_record.data for trace_record in trace_read(trace_path)
+                 if DIRECTION_READ == trace_record.direction]
+    decoder = production_test_auto.FrameDecoder()
+    frame_cnt = 0
+    time_start = monotonic_time()
+    for read_bytes in read_list:
+        decoder.feed(read_bytes)
+        r_frame = decoder.frame_pop()
+        while r_frame is not None:
+            frame_cnt += 1
+            r_frame = decoder.frame_pop()
+    time_cost = max(monotonic_time() - time_start, 1e-9)
+    byte_cnt = sum(len(read_bytes) for read_bytes in read_list)
+    print ("%d bytes in %d reads, %d frames, %.4fs: %.0f bytes/s, %.0f frames/s" %
+           (byte_cnt, len(read_list), frame_cnt, time_cost, byte_cnt / time_cost, frame_cnt / time_cost))
+
+
+def trace_replay(trace_path, speed=1.0, board_lable="replay"):
+    # board run of production_test_auto.py on the trace, config_production_test.ini as in the captured run
+    import board_plan
+    import production_test_auto
+    import step_timing
+
+    list_replay_serial = []
+    replay_clock = ReplayClock(speed)
+    for replay_module in (production_test_auto, board_plan, step_timing):
+        replay_module.monotonic_time = replay_clock.monotonic_time
+    production_test_auto.time = board_plan.time = replay_clock
+
+    def replay_port_open(sport_num, board_config):
+        list_replay_serial.append(ReplaySerial(trace_path, speed))
+        return list_replay_serial[-1]
+
+    production_test_auto.serial_port_open = replay_port_open
+    time_start = monotonic_time()
+    dict_results_summary = production_test_auto.board_test_run("0", board_lable)
+    print ("Replay %.2fs at speed %s, %d writes of the code differ from the trace, result: %s" %
+           (monotonic_time() - time_start, str(speed),
+            list_replay_serial[0].write_mismatch_cnt if list_replay_serial else 0, str(dict_results_summary)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in ("dump", "parse", "replay"):
+        print ("Usage: python uart_trace.py dump <trace file> [start time, s]\n"
+               "       python uart_trace.py parse <trace file>\n"
+               "       python uart_trace.py replay <trace file> [speed, 0: no delay] [board label]")
+        sys.exit()
+    if "dump" == sys.argv[1]:
+        trace_dump(sys.argv[2], float(sys.argv[3]) if len(sys.argv) > 3 else 0)
+    elif "parse" == sys.argv[1]:
+        trace_parse(sys.argv[2])
+    else:
+        trace_replay(sys.argv[2], float(sys.argv[3]) if len(sys.argv) > 3 else 1.0,
+                     sys.argv[4] if len(sys.argv) > 4 else "replay")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+# XMODEM sender for loading test images (memtest.bin) over the dut serial port.
+# The start character of the receiver picks the mode:
+#   "C": XMODEM-1K, CRC-16, 1024 byte blocks, a short tail in 128 byte blocks when fewer bytes go on the wire
+#   "G": XMODEM-1K-G, the same blocks streamed without waiting for an ACK per block, receiver cancels on error
+#   NAK: original XMODEM, 128 byte blocks with 8 bit checksum
+# Reads block on the port timeout and return as soon as the receiver answers, no polling sleeps.
+
+import binascii
+import collections
+import os
+import struct
+
+from monotonic_clock import monotonic_time
+
+SOH = "\x01"
+STX = "\x02"
+EOT = "\x04"
+ACK = "\x06"
+NAK = "\x15"
+CAN = "\x18"
+block_pad = "\x1a"
+
+DictStartMode = {"C": "xmodem1k", "G": "xmodem1k-g", NAK: "xmodem"}
+
+TransferStat = collections.namedtuple("TransferStat", ["mode", "byte_cnt", "block_cnt", "retry_cnt", "time_cost",
+                                                       "error"])
+
+dict_image_cache = {}  # image path -> ((mtime, size), image bytes)
+
+
+def image_load(image_path):
+    # read from disk once, again only when the file changed; IOError / OSError to the caller
+    file_stat = os.stat(image_path)
+    file_version = (file_stat.st_mtime, file_stat.st_size)
+    image_cache = dict_image_cache.get(image_path)
+    if image_cache is not None and file_version == image_cache[0]:
+        return image_cache[1]
+    with open(image_path, "rb") as f_image:
+        image_data = f_image.read()
+    dict_image_cache[image_path] = (file_version, image_data)
+    return image_data
+
+
+def block_build(block_num, block_data, block_size, crc_flag):
+    block_data = block_data.ljust(block_size, block_pad)
+    block_head = (STX if 1024 == block_size else SOH) + chr(block_num & 0xff) + chr(0xff - (block_num & 0xff))
+    if crc_flag:
+        return block_head + block_data + struct.pack(">H", binascii.crc_hqx(block_data, 0))
+    return block_head + block_data + chr(sum(bytearray(block_data)) & 0xff)
+
+
+def block_list_build(image_data, block_1k_flag, crc_flag):
+    block_list, data_index, block_num = [], 0, 1
+    while data_index < len(image_data):
+        data_left = len(image_data) - data_index
+        # 1024 byte block: 1029 bytes on the wire, 128 byte block: 133 (132 with checksum)
+        if block_1k_flag and data_left > 7 * 128:
+            block_size = 1024
+        else:
+            block_size = 128
+        block_list.append(block_build(block_num, image_data[data_index:data_index + block_size], block_size,
+                                      crc_flag))
+        data_index += block_size
+        block_num += 1
+    return block_list
+
+
+def reply_read(pser, reply_timeout, reply_set):
+    # first byte of reply_set within reply_timeout, anything else (eg. repeated "C") is skipped, None: timeout
+    reply_expire = monotonic_time() + reply_timeout
+    while monotonic_time() < reply_expire:
+        reply_char = pser.read(1)
+        if reply_char in reply_set:
+            return reply_char
+    return None
+
+
+def xmodem_send(pser, image_data, start_char=None, start_timeout=10, reply_timeout=2, retry_max=10):
+    # start_char: start character the caller has already read from the receiver, eg. "C" of init_send
+    transfer_start = monotonic_time()
+    if start_char not in DictStartMode:
+        start_char = reply_read(pser, start_timeout, DictStartMode.keys())
+        if start_char is None:
+            return TransferStat(None, 0, 0, 0, monotonic_time() - transfer_start, "no start character")
+    mode = DictStartMode[start_char]
+    pser.flushInput()  # start characters repeated while waiting
+
+    block_list = block_list_build(image_data, NAK != start_char, NAK != start_char)
+    retry_cnt = 0
+    if "G" == start_char:  # streaming: the receiver only answers with CAN on error
+        for each_block in block_list:
+            pser.write(each_block)
+            if pser.inWaiting() and CAN in pser.read(pser.inWaiting()):
+                return TransferStat(mode, 0, len(block_list), 0, monotonic_time() - transfer_start, "cancelled")
+    else:
+        for block_index, each_block in enumerate(block_list):
+            for retry_i in range(retry_max):
+                pser.write(each_block)
+                reply_char = reply_read(pser, reply_timeout, (ACK, NAK, CAN))
+                if ACK == reply_char:
+                    break
+                if CAN == reply_char:
+                    return TransferStat(mode, 0, block_index, retry_cnt, monotonic_time() - transfer_start,
+                                        "cancelled")
+                retry_cnt += 1
+            else:
+                return TransferStat(mode, 0, block_index, retry_cnt, monotonic_time() - transfer_start,
+                                    "block %d not acknowledged" % (block_index + 1))
+
+    for retry_i in range(retry_max):
+        pser.write(EOT)
+        if ACK == reply_read(pser, reply_timeout, (ACK, NAK)):
+            return TransferStat(mode, len(image_data), len(block_list), retry_cnt, monotonic_time() - transfer_start,
+                                None)
+        retry_cnt += 1
+    return TransferStat(mode, 0, len(block_list), retry_cnt, monotonic_time() - transfer_start,
+                        "end of transmission not acknowledged")
+
+
+def transfer_stat_info(transfer_stat):
+    throughput = transfer_stat.byte_cnt / transfer_stat.time_cost if transfer_stat.time_cost else 0
+    return ("%s: %d bytes in %d blocks, %.2fs, %.0f bytes/s, %d retries" %
+            (transfer_stat.mode, transfer_stat.byte_cnt, transfer_stat.block_cnt, transfer_stat.time_cost,
+             throughput, transfer_stat.retry_cnt))